@@ -1,22 +1,32 @@
 # app.py
 from flask import Flask, jsonify, request
 from pydantic import ValidationError
-from werkzeug.exceptions import BadRequest, MethodNotAllowed
+from werkzeug.exceptions import BadRequest, MethodNotAllowed, RequestEntityTooLarge
 
 # Import extensions from the app package (__init__.py)
-from extensions import db, migrate
+from extensions import db, init_migrate
 from flask_cors import CORS
 
 from config import Config
 from logging_config import setup_logging # Import the setup function
 from utils.auth import api_key_auth # NEW: Import api_key_auth
+from utils.rate_limit import setup_rate_limiting
+from utils.availability_events import setup_availability_events
+from utils.circulation_log import setup_circulation_log
+from utils.profiling import setup_profiling
+from commands import register_commands
+from utils.startup import StartupTimer, running_from_cli, prewarm_connections
 
 def create_app(config_class=Config):
     """
     Application Factory: Creates and configures the Flask application.
     """
+    timer = StartupTimer()
     app = Flask(__name__)
     app.config.from_object(config_class)
+    if not app.config.get('SQLALCHEMY_DATABASE_URI'):
+        raise ValueError("Database credentials are not fully set in .env file.")
+    timer.mark('config')
 
     # NEW: Initialize CORS to allow cross-origin requests for all API routes
     CORS(app, resources={r"/api/*": {"origins": "*"}})
@@ -24,10 +34,23 @@ def create_app(config_class=Config):
     # --- Setup Logging ---
     # This should be one of the first things to configure
     setup_logging(app)
+    timer.mark('cors_and_logging')
 
     # Initialize extensions with the app
     db.init_app(app)
-    migrate.init_app(app, db)
+    # Flask-Migrate imports Alembic; only the `flask db` commands need it
+    if running_from_cli():
+        init_migrate(app)
+    timer.mark('extensions')
+
+    # Broker for the real-time availability stream
+    with app.app_context():
+        setup_availability_events(app, db.engine)
+        # Background writer for the append-only circulation event log
+        setup_circulation_log(app, db.engine)
+        # Opt-in cProfile capture; registered first so it covers the other request hooks
+        setup_profiling(app, db.engine)
+    timer.mark('availability_events')
 
     # --- Register Request Handler ---
     @app.before_request
@@ -40,18 +63,34 @@ def create_app(config_class=Config):
             request.remote_addr
         )
 
+    # --- Rate Limiting & Load Shedding ---
+    # Registered before authentication so floods are rejected without any DB work
+    setup_rate_limiting(app)
+    timer.mark('request_hooks')
+
     # Import models here to avoid circular import at top level
-    from models import book, borrowing, category
+    from models import book, borrowing, borrowing_archive, category, circulation_event, circulation_stats, idempotency_key, overdue_loan
+    timer.mark('models')
 
     # Import and register blueprints
     from routes.books import books_bp
     from routes.categories import categories_bp
     from routes.borrowings import borrowings_bp
+    from routes.stats import stats_bp
+    from routes.batch import batch_bp
+    from routes.circulation_events import circulation_events_bp
     
     # Register blueprints with standardized URL prefixes (no trailing slashes)
     app.register_blueprint(books_bp, url_prefix='/api/books')
     app.register_blueprint(categories_bp, url_prefix='/api/categories')
     app.register_blueprint(borrowings_bp, url_prefix='/api/borrowings')
+    app.register_blueprint(stats_bp, url_prefix='/api/stats')
+    app.register_blueprint(batch_bp, url_prefix='/api/batch')
+    app.register_blueprint(circulation_events_bp, url_prefix='/api/circulation-events')
+    timer.mark('blueprints')
+
+    # Register maintenance CLI commands
+    register_commands(app)
 
     # --- API Key Authentication ---
     # Register the API key authentication function from utils/auth.py
@@ -66,6 +105,16 @@ def create_app(config_class=Config):
         )
         return jsonify({"error": e.description}), 400
 
+    @app.errorhandler(RequestEntityTooLarge)
+    def handle_request_entity_too_large(e):
+        """Handle 413 errors for bodies larger than MAX_CONTENT_LENGTH."""
+        app.logger.warning(
+            f"Request body too large for {request.path} from {request.remote_addr}"
+        )
+        return jsonify({
+            "error": f"Request body exceeds the limit of {app.config['MAX_CONTENT_LENGTH']} bytes."
+        }), 413
+
     @app.errorhandler(MethodNotAllowed) # <--- 新增這整個區塊
     def handle_method_not_allowed(e):
         """Handle 405 Method Not Allowed errors."""
@@ -108,5 +157,17 @@ def create_app(config_class=Config):
         if db.session.is_active:
             db.session.rollback()
         return jsonify({"error": "An unexpected internal error occurred."}), 500
+    timer.mark('error_handlers')
+
+    # Optionally open pooled connections in the background before the first request
+    prewarm = app.config.get('DB_PREWARM_CONNECTIONS', 0)
+    if prewarm > 0 and not running_from_cli():
+        with app.app_context():
+            prewarm_connections(app, db.engine, prewarm)
 
+    # Reported by benchmarks/bench_startup.py
+    app.extensions['startup_timings'] = timer.steps
+    app.logger.debug(
+        'Startup: ' + ', '.join(f'{step} {ms:.1f} ms' for step, ms in timer.steps)
+    )
     return app
@@ -0,0 +1,113 @@
+# benchmarks/bench_startup.py
+"""
+Cold-start profile: import time, per-step create_app time and first
+requests, each measured in a fresh interpreter like a Passenger spawn.
+
+Usage:
+    python -m benchmarks.bench_startup --runs 5 --budget-ms 800
+    python -m benchmarks.bench_startup --imports 25
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs in the child interpreter; prints one JSON line
+CHILD = """
+import json, time
+started = time.perf_counter()
+from app import create_app
+from config import BenchmarkConfig
+imported = time.perf_counter()
+app = create_app(BenchmarkConfig)
+created = time.perf_counter()
+result = {
+    "import_ms": (imported - started) * 1000,
+    "create_app_ms": (created - imported) * 1000,
+    "steps": app.extensions['startup_timings'],
+}
+if FIRST_REQUEST:
+    from extensions import db
+    with app.app_context():
+        db.create_all()
+    client = app.test_client()
+    for name, method, path, body in [
+        ('get_categories', 'GET', '/api/categories', None),
+        ('borrow_validation', 'POST', '/api/borrowings/borrow',
+         {"book_id": 0, "borrower_name": "x", "borrower_room_number": "1", "borrower_hotel": "x"}),
+    ]:
+        t = time.perf_counter()
+        client.open(path, method=method, json=body, headers={'Api-Key': app.config['API_KEY']})
+        result[name + '_ms'] = (time.perf_counter() - t) * 1000
+print(json.dumps(result))
+"""
+
+
+def run_child(first_request):
+    env = dict(os.environ)
+    # In-memory database: cold starts should not depend on a server
+    env.setdefault('BENCHMARK_DATABASE_URL', 'sqlite://')
+    output = subprocess.run(
+        [sys.executable, '-c', f"FIRST_REQUEST = {first_request}\n" + CHILD],
+        cwd=PROJECT_DIR, env=env, capture_output=True, text=True, check=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def slowest_imports(limit):
+    """Return the `limit` modules that take longest to import themselves (excluding their imports)."""
+    stderr = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'from app import create_app'],
+        cwd=PROJECT_DIR, capture_output=True, text=True, check=True,
+    ).stderr
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        head, cumulative_us, name = line.split('|')
+        rows.append((int(head.split(':')[1]), int(cumulative_us), name.strip()))
+    return sorted(rows, reverse=True)[:limit]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--budget-ms', type=float, default=None,
+                        help="Exit with status 1 if the median import + create_app time exceeds this")
+    parser.add_argument('--imports', type=int, default=0, help="Also list the N slowest imports")
+    parser.add_argument('--no-first-request', action='store_true')
+    args = parser.parse_args()
+
+    runs = [run_child(not args.no_first_request) for _ in range(args.runs)]
+
+    def median(key):
+        return statistics.median(run[key] for run in runs)
+
+    print(f"{args.runs} cold starts (median)")
+    print(f"  imports:              {median('import_ms'):8.1f} ms")
+    print(f"  create_app:           {median('create_app_ms'):8.1f} ms")
+    for index, (step, _ms) in enumerate(runs[0]['steps']):
+        print(f"    {step:<20} {statistics.median(run['steps'][index][1] for run in runs):8.1f} ms")
+    for key in ('get_categories_ms', 'borrow_validation_ms'):
+        if key in runs[0]:
+            print(f"  first {key[:-3]:<15} {median(key):8.1f} ms")
+
+    if args.imports:
+        print("slowest imports (self / cumulative):")
+        for self_us, cumulative_us, name in slowest_imports(args.imports):
+            print(f"  {self_us / 1000:8.1f} ms {cumulative_us / 1000:8.1f} ms  {name}")
+
+    total = median('import_ms') + median('create_app_ms')
+    if args.budget_ms is not None:
+        if total > args.budget_ms:
+            print(f"OVER BUDGET: cold start {total:.1f} ms > {args.budget_ms:.1f} ms")
+            sys.exit(1)
+        print(f"within budget: cold start {total:.1f} ms <= {args.budget_ms:.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
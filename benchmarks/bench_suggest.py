@@ -0,0 +1,92 @@
+# benchmarks/bench_suggest.py
+"""
+Memory footprint and latency of the typeahead PrefixIndex.
+
+Usage:
+    python -m benchmarks.bench_suggest --books 100000 --queries 5000
+"""
+import argparse
+import random
+import statistics
+import time
+import tracemalloc
+
+from services.suggest_service import PrefixIndex
+
+WORDS = (
+    "the of and a in to night war peace house garden river city shadow light "
+    "king queen dragon secret history island ocean winter summer star moon "
+    "journey silent lost last first little great dark golden glass paper iron "
+    "murder mystery love letters road home stone fire wind memory dream"
+).split()
+SURNAMES = "smith chen wang lee garcia martin tanaka muller rossi dubois kim lin".split()
+
+
+def generate_books(count, seed):
+    rng = random.Random(seed)
+    for book_id in range(1, count + 1):
+        title = ' '.join(rng.choice(WORDS) for _ in range(rng.randint(2, 6))).title()
+        author = f"{rng.choice(WORDS).title()} {rng.choice(SURNAMES).title()}"
+        isbn = f"978{rng.randrange(10**10):010d}"
+        yield book_id, title, author, isbn
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--books', type=int, default=100000)
+    parser.add_argument('--queries', type=int, default=5000)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    books = list(generate_books(args.books, args.seed))
+
+    started = time.perf_counter()
+    index = PrefixIndex()
+    index.build(books)
+    build_seconds = time.perf_counter() - started
+
+    # Measured on a second build: tracing allocations slows the build down
+    del index
+    tracemalloc.start()
+    index = PrefixIndex()
+    index.build(books)
+    memory_bytes, _peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    rng = random.Random(args.seed + 1)
+    queries = []
+    for _ in range(args.queries):
+        _id, title, author, isbn = rng.choice(books)
+        source = rng.choice([title, author, isbn])
+        queries.append(source[:rng.randint(2, min(8, len(source)))])
+
+    latencies = []
+    for query in queries:
+        started = time.perf_counter()
+        index.search(query, 10)
+        latencies.append((time.perf_counter() - started) * 1e6)
+
+    single = rng.choice(books)
+    started = time.perf_counter()
+    for i in range(1000):
+        index.add(args.books + i + 1, *single[1:])
+    add_us = (time.perf_counter() - started) * 1e6 / 1000
+
+    print(f"books:          {args.books}")
+    print(f"build:          {build_seconds:.2f} s")
+    print(f"memory:         {memory_bytes / 1024 / 1024:.1f} MiB "
+          f"({memory_bytes / args.books:.0f} B/book)")
+    print(f"incremental add: {add_us:.1f} us/book")
+    print(f"query latency:  p50 {percentile(latencies, 50):.1f} us, "
+          f"p95 {percentile(latencies, 95):.1f} us, "
+          f"p99 {percentile(latencies, 99):.1f} us, "
+          f"mean {statistics.mean(latencies):.1f} us")
+
+
+if __name__ == '__main__':
+    main()
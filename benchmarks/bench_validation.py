@@ -0,0 +1,62 @@
+# benchmarks/bench_validation.py
+"""
+Throughput of bulk book validation: json.loads + model validation (what
+flask_pydantic's @validate() does) against the cached TypeAdapter parsing
+raw bytes with validate_json (what @validate_bulk does). Both build one
+model per item, which dominates, so expect a ratio close to 1.0x; this
+checks that reporting every invalid item does not cost throughput.
+
+Usage:
+    python -m benchmarks.bench_validation --sizes 1000 10000 100000
+"""
+import argparse
+import json
+import random
+import time
+
+from routes.pydantic_models import BookCreate, BookCreateList
+from utils.validation import _bulk_adapter
+
+
+def generate_payload(count, seed):
+    rng = random.Random(seed)
+    books = [{
+        "title": f"Book {i}",
+        "author": f"Author {rng.randrange(1000)}",
+        "isbn": f"978{rng.randrange(10**10):010d}",
+        "total_quantity": rng.randint(1, 10),
+        "category_id": rng.randint(1, 20),
+        "image_url": None,
+    } for i in range(count)]
+    return json.dumps({"books": books}).encode('utf-8')
+
+
+def best_of(repeat, func):
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    adapter = _bulk_adapter(BookCreateList, 'books', BookCreate, max(args.sizes))
+
+    print(f"{'items':>8}  {'json.loads+model':>18}  {'validate_json':>14}  {'ratio':>7}")
+    for size in args.sizes:
+        payload = generate_payload(size, args.seed)
+        baseline = best_of(args.repeat, lambda: BookCreateList(**json.loads(payload)))
+        fast = best_of(args.repeat, lambda: adapter.validate_json(payload))
+        print(f"{size:>8}  {size / baseline:>12,.0f} it/s  {size / fast:>9,.0f} it/s  "
+              f"{baseline / fast:>6.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+# benchmarks/seed.py
+"""
+Deterministic dataset generator for the benchmark suite.
+
+The same arguments always produce the same rows, so runs against a saved
+baseline measure the code rather than the data.
+"""
+import random
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import insert, text
+
+from extensions import db
+from models.book import Book
+from models.borrowing import Borrowing
+from models.category import Category
+from benchmarks.bench_suggest import WORDS, generate_books
+
+
+def _insert_chunks(table, rows, chunk_size):
+    for start in range(0, len(rows), chunk_size):
+        db.session.execute(insert(table), rows[start:start + chunk_size])
+
+
+def seed_database(categories=20, books=10000, borrowings=50000, hotels=5,
+                  active_days=14, hot_fraction=0.01, hot_share=0.2,
+                  seed=42, chunk_size=5000):
+    """
+    Drop every table and seed categories, books and borrowings with bulk
+    inserts. `hot_share` of the borrowings go to the first `hot_fraction`
+    of the books. Loans from the last `active_days` days stay active while
+    copies are available, and available_quantity is derived from them, so
+    the result satisfies chk_available_quantity. Returns the row counts.
+    """
+    rng = random.Random(seed)
+    now = datetime.now(timezone.utc).replace(microsecond=0)
+
+    db.drop_all()
+    db.create_all()
+
+    category_rows = [{"id": i, "name": f"{WORDS[i % len(WORDS)].title()} {i}"}
+                     for i in range(1, categories + 1)]
+
+    book_rows = []
+    for book_id, title, author, isbn in generate_books(books, seed):
+        total = rng.randint(1, 5)
+        book_rows.append({
+            "id": book_id, "title": title, "author": author, "isbn": isbn,
+            "total_quantity": total, "available_quantity": total,
+            "category_id": rng.randint(1, categories),
+            "created_at": now, "updated_at": now,
+        })
+
+    hot_books = max(1, int(books * hot_fraction))
+    borrowed_ats = sorted(now - timedelta(seconds=rng.randrange(365 * 86400))
+                          for _ in range(borrowings))
+    active_since = now - timedelta(days=active_days)
+    borrowing_rows = []
+    for borrowing_id, borrowed_at in enumerate(borrowed_ats, start=1):
+        book_id = rng.randint(1, hot_books) if rng.random() < hot_share else rng.randint(1, books)
+        book = book_rows[book_id - 1]
+        active = borrowed_at >= active_since and book["available_quantity"] > 0 and rng.random() < 0.5
+        if active:
+            book["available_quantity"] -= 1
+        borrowing_rows.append({
+            "id": borrowing_id,
+            "book_id": book_id,
+            "borrower_name": f"Guest {rng.randrange(100000)}",
+            "borrower_email": None,
+            "borrower_phone": None,
+            "borrower_room_number": str(rng.randint(100, 999)),
+            "borrower_hotel": f"Hotel {rng.randint(1, hotels)}",
+            "borrowed_at": borrowed_at,
+            "returned_at": None if active else min(now, borrowed_at + timedelta(hours=rng.randint(1, 168))),
+            "is_returned": not active,
+        })
+
+    _insert_chunks(Category.__table__, category_rows, chunk_size)
+    _insert_chunks(Book.__table__, book_rows, chunk_size)
+    _insert_chunks(Borrowing.__table__, borrowing_rows, chunk_size)
+
+    if db.engine.dialect.name == 'postgresql':
+        # Explicit ids leave the sequences behind
+        for table in ('categories', 'books', 'borrowings'):
+            db.session.execute(text(
+                f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+                f"(SELECT COALESCE(MAX(id), 1) FROM {table}))"
+            ))
+    db.session.commit()
+
+    if db.engine.dialect.name == 'postgresql':
+        from services.stats_service import rebuild_stats_service
+        rebuild_stats_service()
+
+    return {"categories": len(category_rows), "books": len(book_rows),
+            "borrowings": len(borrowing_rows)}
@@ -0,0 +1,108 @@
+# commands.py
+import click
+
+
+def register_commands(app):
+    """Register maintenance commands on the Flask CLI (`flask <command>`)."""
+
+    @app.cli.command('purge-idempotency-keys')
+    def purge_idempotency_keys_command():
+        """Delete expired Idempotency-Key records."""
+        from utils.idempotency import purge_expired_idempotency_keys
+
+        deleted = purge_expired_idempotency_keys()
+        click.echo(f"Deleted {deleted} expired idempotency keys.")
+
+    @app.cli.command('check-query-plans')
+    @click.option('--allow-seqscan', is_flag=True,
+                  help="Let the planner choose sequential scans (plans then depend on seeded data size).")
+    @click.option('--seed', 'seed_data', is_flag=True,
+                  help="Drop every table and seed a small deterministic dataset first. Scratch databases only.")
+    def check_query_plans_command(allow_seqscan, seed_data):
+        """EXPLAIN every read and write query and fail if any falls back to a full scan."""
+        from utils.query_plans import check_query_plans, missing_data
+
+        if seed_data:
+            from benchmarks.seed import seed_database
+            counts = seed_database(categories=5, books=500, borrowings=2000)
+            click.echo(f"Seeded {counts}.")
+        empty = missing_data()
+        if empty:
+            click.echo(f"Missing {', '.join(empty)}. Seed the database first, or pass --seed "
+                       "on a scratch database.", err=True)
+            raise SystemExit(2)
+
+        failures = check_query_plans(disable_seqscan=not allow_seqscan)
+        for failure in failures:
+            click.echo(f"FAIL {failure}")
+        if failures:
+            raise SystemExit(1)
+        click.echo("All query plans use indexes.")
+
+    @app.cli.command('archive-borrowings')
+    @click.option('--older-than-days', type=int, default=None,
+                  help="Archive loans returned more than this many days ago "
+                       "(defaults to BORROWINGS_ARCHIVE_AFTER_DAYS, and may not be less).")
+    @click.option('--batch-size', type=int, default=1000, show_default=True)
+    @click.option('--max-batches', type=int, default=None, help="Stop after this many batches.")
+    @click.option('--pause', type=float, default=0.1, show_default=True,
+                  help="Seconds to sleep between batches.")
+    def archive_borrowings_command(older_than_days, batch_size, max_batches, pause):
+        """Move old returned borrowings to borrowings_archive in bounded batches."""
+        from services.archive_service import archive_returned_borrowings
+
+        minimum = app.config['BORROWINGS_ARCHIVE_AFTER_DAYS']
+        if older_than_days is None:
+            older_than_days = minimum
+        elif older_than_days < minimum:
+            # Listings only read the archive for ranges older than that horizon
+            raise click.BadParameter(
+                f"must be at least BORROWINGS_ARCHIVE_AFTER_DAYS ({minimum})", param_hint='--older-than-days'
+            )
+        archived = archive_returned_borrowings(older_than_days, batch_size, max_batches, pause)
+        click.echo(f"Archived {archived} borrowing records.")
+
+    @app.cli.command('flag-overdue-loans')
+    @click.option('--loan-days', type=int, default=None,
+                  help="Loan period in days (defaults to LOAN_PERIOD_DAYS).")
+    @click.option('--batch-size', type=int, default=1000, show_default=True)
+    @click.option('--pause', type=float, default=0.0, show_default=True,
+                  help="Seconds to sleep between batches.")
+    def flag_overdue_loans_command(loan_days, batch_size, pause):
+        """Flag active loans past the loan period for GET /api/borrowings/overdue."""
+        from services.overdue_service import flag_overdue_loans
+
+        if loan_days is None:
+            loan_days = app.config['LOAN_PERIOD_DAYS']
+        result = flag_overdue_loans(loan_days, batch_size, pause)
+        click.echo(f"Flagged {result['flagged']} overdue loans, cleared {result['cleared']} returned ones "
+                   f"(scanned up to {result['watermark'].isoformat()}).")
+
+    @app.cli.command('rebuild-stats')
+    def rebuild_stats_command():
+        """Recompute the circulation summary tables from the full borrowing history."""
+        from services.stats_service import rebuild_stats_service
+
+        rebuild_stats_service()
+        click.echo("Circulation statistics rebuilt.")
+
+    @app.cli.command('list-profiles')
+    @click.option('--limit', type=int, default=20, show_default=True)
+    def list_profiles_command(limit):
+        """Show the newest request profiles in PROFILE_DIR."""
+        from utils.profiling import list_profiles
+
+        for summary in list_profiles(app.config['PROFILE_DIR'])[:limit]:
+            click.echo(f"{summary['id']}  {summary['method']} {summary['path']} -> {summary['status']}  "
+                       f"{summary['duration_ms']:.1f} ms, {summary['query_count']} queries, "
+                       f"{summary['db_ms']:.1f} ms in DB")
+
+    @app.cli.command('online-upgrade')
+    @click.option('--revision', default='head', show_default=True)
+    def online_upgrade_command(revision):
+        """Upgrade the database with short lock timeouts and retries, reporting each step."""
+        from utils.online_migrations import run_online_upgrade
+
+        for step, seconds, detail in run_online_upgrade(app, revision):
+            click.echo(f"  {step:<40} {seconds:8.2f} s  {detail}")
+        click.echo("Database migration completed successfully.")
@@ -16,10 +16,12 @@ class Config:
     DB_PORT = os.environ.get('DB_PORT', 5432)
     DB_NAME = os.environ.get('DB_NAME')
 
-    if not all([DB_USER, DB_PASSWORD, DB_HOST, DB_NAME]):
-        raise ValueError("Database credentials are not fully set in .env file.")
-
-    SQLALCHEMY_DATABASE_URI = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+    # Built only when the credentials are set, so subclasses such as
+    # BenchmarkConfig can be imported without them; create_app checks it
+    SQLALCHEMY_DATABASE_URI = (
+        f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+        if all([DB_USER, DB_PASSWORD, DB_HOST, DB_NAME]) else None
+    )
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     
     # --- Logging Configuration ---
@@ -35,3 +37,122 @@ class Config:
 
     # --- API Key for restricted endpoints ---
     API_KEY = os.environ.get('API_KEY')
+
+    # --- Request Size Limits ---
+    # Largest accepted request body in bytes; larger bodies get 413 before parsing
+    MAX_CONTENT_LENGTH = int(os.environ.get('MAX_CONTENT_LENGTH', 10 * 1024 * 1024))
+    # Most items accepted in one bulk request (e.g. POST /api/books)
+    BULK_MAX_ITEMS = int(os.environ.get('BULK_MAX_ITEMS', 10000))
+
+    # --- Startup ---
+    # Connections to open in the background when a worker starts, so the first
+    # request after a cold spawn does not wait for them; 0 connects lazily
+    DB_PREWARM_CONNECTIONS = int(os.environ.get('DB_PREWARM_CONNECTIONS', 0))
+
+    # --- Online Migrations ---
+    # Used by `python upgrade_db.py --online` / `flask online-upgrade` and the
+    # helpers in utils/online_migrations.py. DDL gives up after the lock
+    # timeout instead of queueing traffic behind it, then retries with
+    # exponential backoff; backfills update this many rows per transaction.
+    MIGRATION_LOCK_TIMEOUT_MS = int(os.environ.get('MIGRATION_LOCK_TIMEOUT_MS', 2000))
+    MIGRATION_LOCK_RETRIES = int(os.environ.get('MIGRATION_LOCK_RETRIES', 5))
+    MIGRATION_RETRY_BACKOFF_SECONDS = float(os.environ.get('MIGRATION_RETRY_BACKOFF_SECONDS', 1))
+    MIGRATION_BACKFILL_BATCH_SIZE = int(os.environ.get('MIGRATION_BACKFILL_BATCH_SIZE', 1000))
+    MIGRATION_BACKFILL_PAUSE_SECONDS = float(os.environ.get('MIGRATION_BACKFILL_PAUSE_SECONDS', 0.1))
+
+    # --- Batch Requests ---
+    # Most sub-requests accepted in one POST /api/batch
+    BATCH_MAX_OPERATIONS = int(os.environ.get('BATCH_MAX_OPERATIONS', 100))
+
+    # --- Borrowings Archive ---
+    # Returned loans older than this many days are moved to borrowings_archive
+    # by `flask archive-borrowings` and only read when history is requested
+    BORROWINGS_ARCHIVE_AFTER_DAYS = int(os.environ.get('BORROWINGS_ARCHIVE_AFTER_DAYS', 180))
+
+    # --- Overdue Loans ---
+    # Loans still out this many days after borrowing are flagged by `flask flag-overdue-loans`
+    LOAN_PERIOD_DAYS = int(os.environ.get('LOAN_PERIOD_DAYS', 14))
+
+    # --- Circulation Statistics ---
+    # Hotel, daily and category counters are spread over this many rows each, so borrows
+    # of different books rarely wait on the same counter row lock
+    STATS_COUNTER_SHARDS = int(os.environ.get('STATS_COUNTER_SHARDS', 16))
+
+    # --- Idempotency Keys ---
+    # How long a stored response can be replayed for a given Idempotency-Key
+    IDEMPOTENCY_TTL_SECONDS = int(os.environ.get('IDEMPOTENCY_TTL_SECONDS', 86400))
+    # How long a request may hold a key unfinished before a retry takes it over
+    # (e.g. after the worker was killed mid-request); keep it above the slowest request
+    IDEMPOTENCY_LEASE_SECONDS = int(os.environ.get('IDEMPOTENCY_LEASE_SECONDS', 60))
+
+    # --- Optimistic Concurrency ---
+    # When True, PATCH /api/books/<id> must send If-Match with the book's ETag
+    REQUIRE_IF_MATCH = os.environ.get('REQUIRE_IF_MATCH', 'False').lower() in ['true', '1', 't']
+
+    # --- Typeahead Suggestions ---
+    # How often each worker pulls book changes made by other workers into its index
+    SUGGEST_REFRESH_SECONDS = int(os.environ.get('SUGGEST_REFRESH_SECONDS', 60))
+
+    # --- Catalog Snapshot ---
+    # Serve GET /api/books from an in-memory copy of the books table kept per worker
+    CATALOG_SNAPSHOT_ENABLED = os.environ.get('CATALOG_SNAPSHOT_ENABLED', 'False').lower() in ['true', '1', 't']
+    # How long the snapshot is served before it is checked against the database again
+    CATALOG_SNAPSHOT_MAX_AGE_SECONDS = float(os.environ.get('CATALOG_SNAPSHOT_MAX_AGE_SECONDS', 2))
+
+    # --- Availability Event Stream (SSE) ---
+    # 'memory' fans out within one worker; 'postgres' uses LISTEN/NOTIFY across workers
+    AVAILABILITY_BROKER = os.environ.get('AVAILABILITY_BROKER', 'memory')
+    SSE_HEARTBEAT_SECONDS = int(os.environ.get('SSE_HEARTBEAT_SECONDS', 15))
+    # Events buffered per connection before the oldest are dropped
+    SSE_BUFFER_SIZE = int(os.environ.get('SSE_BUFFER_SIZE', 100))
+    # Open streams per worker; each one occupies a worker thread
+    SSE_MAX_SUBSCRIBERS = int(os.environ.get('SSE_MAX_SUBSCRIBERS', 50))
+
+    # --- Circulation Event Log ---
+    # Borrow/return/stock events are queued per worker and written by a
+    # background thread in multi-row INSERTs of up to BATCH_SIZE rows, at
+    # most FLUSH_SECONDS after the first queued event. 0 writes inline.
+    CIRCULATION_LOG_QUEUE_SIZE = int(os.environ.get('CIRCULATION_LOG_QUEUE_SIZE', 10000))
+    CIRCULATION_LOG_BATCH_SIZE = int(os.environ.get('CIRCULATION_LOG_BATCH_SIZE', 500))
+    CIRCULATION_LOG_FLUSH_SECONDS = float(os.environ.get('CIRCULATION_LOG_FLUSH_SECONDS', 1))
+    # GET /api/circulation-events only returns events logged at least this long
+    # ago, so a reader never skips an id whose INSERT had not committed yet
+    CIRCULATION_EVENTS_SETTLE_SECONDS = float(os.environ.get('CIRCULATION_EVENTS_SETTLE_SECONDS', 2))
+
+    # --- Request Profiling ---
+    # Requests sent with `X-Profile: <PROFILE_KEY>` are profiled with cProfile and
+    # get a summary in response headers; PROFILE_SAMPLE_RATE (0-1) profiles that
+    # share of all requests silently. Both unset turns profiling off entirely.
+    PROFILE_KEY = os.environ.get('PROFILE_KEY')
+    PROFILE_SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE', 0))
+    # Captures are kept as pstats + JSON files; only the newest MAX_FILES are kept
+    PROFILE_DIR = os.environ.get('PROFILE_DIR', 'profiles')
+    PROFILE_MAX_FILES = int(os.environ.get('PROFILE_MAX_FILES', 100))
+
+    # --- Rate Limiting & Load Shedding ---
+    # Token buckets are keyed by API key plus remote address (or the address alone)
+    # and kept per worker. Rates are tokens per second (> 0); bursts are the bucket size (>= 1).
+    RATELIMIT_ENABLED = os.environ.get('RATELIMIT_ENABLED', 'False').lower() in ['true', '1', 't']
+    RATELIMIT_DEFAULT_RATE = float(os.environ.get('RATELIMIT_DEFAULT_RATE', 10))
+    RATELIMIT_DEFAULT_BURST = int(os.environ.get('RATELIMIT_DEFAULT_BURST', 40))
+    # Budget for full dumps (per_page=0), searches and other expensive endpoints
+    RATELIMIT_EXPENSIVE_RATE = float(os.environ.get('RATELIMIT_EXPENSIVE_RATE', 1))
+    RATELIMIT_EXPENSIVE_BURST = int(os.environ.get('RATELIMIT_EXPENSIVE_BURST', 5))
+    # Max requests handled at once per worker; 0 disables load shedding
+    MAX_CONCURRENT_REQUESTS = int(os.environ.get('MAX_CONCURRENT_REQUESTS', 0))
+    LOAD_SHED_RETRY_AFTER = int(os.environ.get('LOAD_SHED_RETRY_AFTER', 1))
+
+
+class BenchmarkConfig(Config):
+    """
+    Configuration for the API benchmark suite (benchmarks/bench_api.py).
+    The suite drops and re-seeds every table, so point BENCHMARK_DATABASE_URL
+    at a dedicated database. Without it a local SQLite file is used, which is
+    only good for smoke runs.
+    """
+    SQLALCHEMY_DATABASE_URI = os.environ.get('BENCHMARK_DATABASE_URL', 'sqlite:///benchmark.db')
+    API_KEY = 'benchmark'
+    LOG_LEVEL = 'WARNING'
+    LOG_FILE = None
+    LOG_TO_STDOUT = False
+    RATELIMIT_ENABLED = False
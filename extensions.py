@@ -1,6 +1,46 @@
 # extensions.py
+from contextlib import contextmanager
+
 from flask_sqlalchemy import SQLAlchemy
-from flask_migrate import Migrate
 
 db = SQLAlchemy()
-migrate = Migrate()
+
+
+def init_migrate(app):
+    """
+    Set up Flask-Migrate and its `flask db` commands. Imported here rather
+    than at module level because it pulls in Alembic, which only migrations
+    need; create_app calls this for CLI runs.
+    """
+    from flask_migrate import Migrate
+    return Migrate(app, db)
+
+
+@contextmanager
+def outer_transaction(engine):
+    """
+    Yield (connection, transaction) for sessions bound with
+    join_transaction_mode='create_savepoint', such as the atomic batch; the
+    caller commits or rolls back the transaction.
+
+    On SQLite, pysqlite starts transactions itself, only before DML, and
+    commits implicitly, so rolling back would not undo the writes made
+    inside. For this connection only, that handling is switched off and
+    BEGIN is emitted explicitly; the setting is restored before the
+    connection goes back to the pool. Other connections keep pysqlite's
+    handling, where a read never holds the database lock between requests.
+    """
+    with engine.connect() as connection:
+        dbapi_connection = connection.connection.driver_connection
+        sqlite = engine.dialect.name == 'sqlite'
+        if sqlite:
+            isolation_level = dbapi_connection.isolation_level
+            dbapi_connection.isolation_level = None
+        try:
+            transaction = connection.begin()
+            if sqlite:
+                connection.exec_driver_sql('BEGIN')
+            yield connection, transaction
+        finally:
+            if sqlite:
+                dbapi_connection.isolation_level = isolation_level
@@ -94,9 +94,17 @@ def run_migrations_online():
     if conf_args.get("process_revision_directives") is None:
         conf_args["process_revision_directives"] = process_revision_directives
 
+    # Online mode (utils/online_migrations.py): one transaction per revision,
+    # short lock_timeout and per-revision timings
+    online = current_app.extensions.get('online_migration')
+    if online is not None:
+        conf_args = dict(conf_args, **online.configure_args())
+
     connectable = get_engine()
 
     with connectable.connect() as connection:
+        if online is not None:
+            online.prepare(connection)
         context.configure(
             connection=connection,
             target_metadata=get_metadata(),
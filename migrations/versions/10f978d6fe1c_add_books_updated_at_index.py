@@ -0,0 +1,26 @@
+"""Add books.updated_at index for catalog snapshot checks
+
+Revision ID: 10f978d6fe1c
+Revises: f43e53e6d63d
+Create Date: 2026-10-19 20:48:05.664290
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from utils.online_migrations import create_index_concurrently, drop_index_concurrently
+
+
+# revision identifiers, used by Alembic.
+revision = '10f978d6fe1c'
+down_revision = 'f43e53e6d63d'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    create_index_concurrently('idx_books_updated_at', 'books', ['updated_at'])
+
+
+def downgrade():
+    drop_index_concurrently('idx_books_updated_at', 'books')
@@ -0,0 +1,28 @@
+"""Add partial index for active loans by hotel and room
+
+Revision ID: 124d406d671b
+Revises: 862fde594631
+Create Date: 2026-10-19 12:40:09.118265
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from utils.online_migrations import create_index_concurrently, drop_index_concurrently
+
+
+# revision identifiers, used by Alembic.
+revision = '124d406d671b'
+down_revision = '862fde594631'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    create_index_concurrently('idx_borrowings_active_hotel_room', 'borrowings',
+                              ['borrower_hotel', 'borrower_room_number'], unique=False,
+                              postgresql_where=sa.text('is_returned = false'))
+
+
+def downgrade():
+    drop_index_concurrently('idx_borrowings_active_hotel_room', 'borrowings')
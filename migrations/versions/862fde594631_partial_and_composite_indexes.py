@@ -0,0 +1,49 @@
+"""Partial and composite indexes tuned to query shapes
+
+Revision ID: 862fde594631
+Revises: 0c23136b61ff
+Create Date: 2026-10-19 11:24:53.774105
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from utils.online_migrations import create_index_concurrently, drop_index_concurrently
+
+
+# revision identifiers, used by Alembic.
+revision = '862fde594631'
+down_revision = '0c23136b61ff'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Built concurrently so writes are never blocked; the helpers drop an
+    # INVALID index left by an interrupted build before retrying it
+    create_index_concurrently('idx_borrowings_active', 'borrowings',
+                              [sa.text('borrowed_at DESC'), 'id'], unique=False,
+                              postgresql_where=sa.text('is_returned = false'))
+    create_index_concurrently('idx_borrowings_borrowed_at_id', 'borrowings',
+                              [sa.text('borrowed_at DESC'), 'id'], unique=False)
+    create_index_concurrently('idx_books_category_id_title', 'books',
+                              ['category_id', 'title'], unique=False)
+    create_index_concurrently('idx_books_available_title', 'books',
+                              ['title'], unique=False,
+                              postgresql_where=sa.text('available_quantity > 0'))
+
+    # Superseded by the indexes above
+    drop_index_concurrently('idx_borrowings_is_returned', 'borrowings')
+    drop_index_concurrently('idx_borrowings_borrowed_at', 'borrowings')
+    drop_index_concurrently('idx_books_category_id', 'books')
+
+
+def downgrade():
+    create_index_concurrently('idx_books_category_id', 'books', ['category_id'], unique=False)
+    create_index_concurrently('idx_borrowings_borrowed_at', 'borrowings', ['borrowed_at'], unique=False)
+    create_index_concurrently('idx_borrowings_is_returned', 'borrowings', ['is_returned'], unique=False)
+
+    drop_index_concurrently('idx_books_available_title', 'books')
+    drop_index_concurrently('idx_books_category_id_title', 'books')
+    drop_index_concurrently('idx_borrowings_borrowed_at_id', 'borrowings')
+    drop_index_concurrently('idx_borrowings_active', 'borrowings')
@@ -0,0 +1,37 @@
+"""Add per-category copy counters to the circulation stats
+
+Revision ID: b5e2c7d41f09
+Revises: 683f7131ccc0
+Create Date: 2026-10-19 23:41:06.112874
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b5e2c7d41f09'
+down_revision = '683f7131ccc0'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('category_circulation_stats',
+    sa.Column('category_id', sa.Integer(), nullable=False),
+    sa.Column('shard', sa.SmallInteger(), autoincrement=False, nullable=False),
+    sa.Column('total_quantity', sa.Integer(), nullable=False),
+    sa.Column('on_loan', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['category_id'], ['categories.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('category_id', 'shard')
+    )
+    # Existing copies become shard 0; one pass over books, while the table is new
+    op.execute(
+        "INSERT INTO category_circulation_stats (category_id, shard, total_quantity, on_loan) "
+        "SELECT category_id, 0, SUM(total_quantity), SUM(total_quantity - available_quantity) "
+        "FROM books WHERE category_id IS NOT NULL GROUP BY category_id"
+    )
+
+
+def downgrade():
+    op.drop_table('category_circulation_stats')
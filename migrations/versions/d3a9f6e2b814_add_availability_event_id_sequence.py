@@ -0,0 +1,24 @@
+"""Add the shared sequence for availability event ids
+
+Revision ID: d3a9f6e2b814
+Revises: b5e2c7d41f09
+Create Date: 2026-10-20 00:18:52.640317
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd3a9f6e2b814'
+down_revision = 'b5e2c7d41f09'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute(sa.schema.CreateSequence(sa.Sequence('book_availability_event_ids')))
+
+
+def downgrade():
+    op.execute(sa.schema.DropSequence(sa.Sequence('book_availability_event_ids')))
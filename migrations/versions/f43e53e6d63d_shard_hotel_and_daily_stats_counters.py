@@ -0,0 +1,60 @@
+"""Shard hotel and daily circulation stats counters
+
+Revision ID: f43e53e6d63d
+Revises: a9ac945e6dd3
+Create Date: 2026-10-19 20:12:37.518402
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f43e53e6d63d'
+down_revision = 'a9ac945e6dd3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Existing counters become shard 0
+    with op.batch_alter_table('hotel_circulation_stats', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('shard', sa.SmallInteger(), server_default='0', nullable=False))
+        batch_op.drop_constraint('hotel_circulation_stats_pkey', type_='primary')
+        batch_op.create_primary_key('hotel_circulation_stats_pkey', ['borrower_hotel', 'shard'])
+        batch_op.alter_column('shard', server_default=None)
+
+    with op.batch_alter_table('daily_circulation_stats', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('shard', sa.SmallInteger(), server_default='0', nullable=False))
+        batch_op.drop_constraint('daily_circulation_stats_pkey', type_='primary')
+        batch_op.create_primary_key('daily_circulation_stats_pkey', ['day', 'shard'])
+        batch_op.alter_column('shard', server_default=None)
+
+
+def downgrade():
+    # Fold the shards back into one row per hotel and per day
+    op.execute(
+        "CREATE TEMPORARY TABLE hotel_totals AS "
+        "SELECT borrower_hotel, SUM(active_loans) AS active_loans, SUM(borrow_count) AS borrow_count "
+        "FROM hotel_circulation_stats GROUP BY borrower_hotel"
+    )
+    op.execute("DELETE FROM hotel_circulation_stats")
+    with op.batch_alter_table('hotel_circulation_stats', schema=None) as batch_op:
+        batch_op.drop_constraint('hotel_circulation_stats_pkey', type_='primary')
+        batch_op.drop_column('shard')
+        batch_op.create_primary_key('hotel_circulation_stats_pkey', ['borrower_hotel'])
+    op.execute("INSERT INTO hotel_circulation_stats (borrower_hotel, active_loans, borrow_count) SELECT borrower_hotel, active_loans, borrow_count FROM hotel_totals")
+    op.execute("DROP TABLE hotel_totals")
+
+    op.execute(
+        "CREATE TEMPORARY TABLE daily_totals AS "
+        "SELECT day, SUM(borrow_count) AS borrow_count, SUM(return_count) AS return_count "
+        "FROM daily_circulation_stats GROUP BY day"
+    )
+    op.execute("DELETE FROM daily_circulation_stats")
+    with op.batch_alter_table('daily_circulation_stats', schema=None) as batch_op:
+        batch_op.drop_constraint('daily_circulation_stats_pkey', type_='primary')
+        batch_op.drop_column('shard')
+        batch_op.create_primary_key('daily_circulation_stats_pkey', ['day'])
+    op.execute("INSERT INTO daily_circulation_stats (day, borrow_count, return_count) SELECT day, borrow_count, return_count FROM daily_totals")
+    op.execute("DROP TABLE daily_totals")
@@ -1,7 +1,7 @@
 # models/book.py
 from extensions import db
 from sqlalchemy.sql import func
-from sqlalchemy import Index, CheckConstraint
+from sqlalchemy import Index, CheckConstraint, text
 
 class Book(db.Model):
     __tablename__ = 'books'
@@ -18,17 +18,34 @@ class Book(db.Model):
     
     created_at = db.Column(db.TIMESTAMP(timezone=True), nullable=False, server_default=func.now())
     updated_at = db.Column(db.TIMESTAMP(timezone=True), nullable=False, server_default=func.now(), onupdate=func.now())
+    # Incremented by the ORM on every UPDATE; exposed to clients as the ETag
+    version_id = db.Column(db.Integer, nullable=False, server_default='1')
     
     # Relationships
-    category = db.relationship('Category', back_populates='books')
-    borrowings = db.relationship('Borrowing', back_populates='book', cascade="all, delete-orphan")
+    # lazy='raise_on_sql': queries must choose a loader (joinedload, contains_eager, ...);
+    # a forgotten one raises instead of issuing a query per row
+    category = db.relationship('Category', back_populates='books', lazy='raise_on_sql')
+    # passive_deletes: delete_book removes the loan history with one DELETE
+    # instead of loading it, so it is never loaded just to cascade
+    borrowings = db.relationship('Borrowing', back_populates='book', cascade="all, delete-orphan",
+                                 lazy='raise_on_sql', passive_deletes=True)
+
+    # Optimistic concurrency: UPDATEs match on the loaded version and raise StaleDataError otherwise
+    __mapper_args__ = {
+        'version_id_col': version_id,
+    }
 
     # Table arguments for indexes and constraints
     __table_args__ = (
         CheckConstraint('available_quantity >= 0 AND available_quantity <= total_quantity', name='chk_available_quantity'),
         Index('idx_books_title', 'title'),
         Index('idx_books_author', 'author'),
-        Index('idx_books_category_id', 'category_id'),
+        # Category filter with the title ordering used by the list endpoint
+        Index('idx_books_category_id_title', 'category_id', 'title'),
+        # available=true filter, ordered by title
+        Index('idx_books_available_title', 'title', postgresql_where=text('available_quantity > 0')),
+        # Rows changed since the catalog snapshot's last check
+        Index('idx_books_updated_at', 'updated_at'),
     )
 
     def to_dict(self):
@@ -44,5 +61,6 @@ class Book(db.Model):
             "category_id": self.category_id,
             "category_name": self.category.name if self.category else None,
             "created_at": self.created_at.isoformat(),
-            "updated_at": self.updated_at.isoformat()
+            "updated_at": self.updated_at.isoformat(),
+            "version": self.version_id
         }
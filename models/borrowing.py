@@ -1,7 +1,7 @@
 # models/borrowing.py
 from extensions import db
 from sqlalchemy.sql import func
-from sqlalchemy import Index
+from sqlalchemy import Index, text
 
 class Borrowing(db.Model):
     __tablename__ = 'borrowings'
@@ -18,14 +18,20 @@ class Borrowing(db.Model):
     is_returned = db.Column(db.Boolean, nullable=False, default=False)
 
     # Relationships
-    book = db.relationship('Book', back_populates='borrowings')
+    book = db.relationship('Book', back_populates='borrowings', lazy='raise_on_sql')
 
     # Table arguments for indexes
     __table_args__ = (
         Index('idx_borrowings_book_id', 'book_id'),
-        Index('idx_borrowings_is_returned', 'is_returned'),
         Index('idx_borrowings_borrower_room_number', 'borrower_room_number'),
-        Index('idx_borrowings_borrowed_at', 'borrowed_at'),
+        # Matches the list ordering (borrowed_at DESC, id) used for pagination
+        Index('idx_borrowings_borrowed_at_id', borrowed_at.desc(), id),
+        # Active loans are a small slice of the table; index only those rows
+        Index('idx_borrowings_active', borrowed_at.desc(), id,
+              postgresql_where=text('is_returned = false')),
+        # Front-desk lookups: what does this hotel room currently have out?
+        Index('idx_borrowings_active_hotel_room', 'borrower_hotel', 'borrower_room_number',
+              postgresql_where=text('is_returned = false')),
     )
 
     def to_dict(self):
@@ -8,7 +8,8 @@ class Category(db.Model):
     name = db.Column(db.String(100), nullable=False, unique=True)
     
     # Relationship to books
-    books = db.relationship('Book', back_populates='category')
+    # Never loaded implicitly; books.category_id is set to NULL by the database on delete
+    books = db.relationship('Book', back_populates='category', lazy='raise_on_sql', passive_deletes=True)
 
     def to_dict(self):
         """Converts the model to a dictionary."""
@@ -0,0 +1,39 @@
+# models/circulation_event.py
+from extensions import db
+from sqlalchemy.sql import func
+
+class CirculationEvent(db.Model):
+    """
+    Append-only log of borrows, returns and stock changes, written in batches
+    by the background writer in utils/circulation_log.py. Consumers read it
+    in id order. There are no foreign keys so history outlives deleted books.
+    """
+    __tablename__ = 'circulation_events'
+
+    # BIGINT on Postgres; SQLite only auto-increments INTEGER primary keys
+    id = db.Column(db.BigInteger().with_variant(db.Integer, 'sqlite'), primary_key=True)
+    # 'borrow', 'return' or 'quantity_change'
+    event_type = db.Column(db.String(20), nullable=False)
+    book_id = db.Column(db.Integer, nullable=False)
+    borrowing_id = db.Column(db.Integer, nullable=True)
+    borrower_hotel = db.Column(db.String(255), nullable=True)
+    # The book's quantities right after the event
+    total_quantity = db.Column(db.Integer, nullable=False)
+    available_quantity = db.Column(db.Integer, nullable=False)
+    # When the change was made (captured before its commit) and when the writer stored it
+    occurred_at = db.Column(db.TIMESTAMP(timezone=True), nullable=False)
+    logged_at = db.Column(db.TIMESTAMP(timezone=True), nullable=False, server_default=func.now())
+
+    def to_dict(self):
+        """Converts the model to a dictionary."""
+        return {
+            "id": self.id,
+            "event_type": self.event_type,
+            "book_id": self.book_id,
+            "borrowing_id": self.borrowing_id,
+            "borrower_hotel": self.borrower_hotel,
+            "total_quantity": self.total_quantity,
+            "available_quantity": self.available_quantity,
+            "occurred_at": self.occurred_at.isoformat(),
+            "logged_at": self.logged_at.isoformat()
+        }
@@ -0,0 +1,51 @@
+# models/circulation_stats.py
+from extensions import db
+from sqlalchemy import Index
+
+class BookCirculationStats(db.Model):
+    """Running borrow/return totals per book, maintained by the borrowing services."""
+    __tablename__ = 'book_circulation_stats'
+
+    book_id = db.Column(db.Integer, db.ForeignKey('books.id', ondelete='CASCADE'), primary_key=True)
+    borrow_count = db.Column(db.Integer, nullable=False, default=0)
+    return_count = db.Column(db.Integer, nullable=False, default=0)
+
+    # Table arguments for indexes
+    __table_args__ = (
+        # Top-N most borrowed without sorting the whole table
+        Index('idx_book_circulation_stats_borrow_count', borrow_count.desc()),
+    )
+
+class CategoryCirculationStats(db.Model):
+    """
+    Copies owned and on loan per category, sharded like HotelCirculationStats.
+    Catalog edits move total_quantity; borrows and returns move on_loan.
+    """
+    __tablename__ = 'category_circulation_stats'
+
+    category_id = db.Column(db.Integer, db.ForeignKey('categories.id', ondelete='CASCADE'), primary_key=True)
+    shard = db.Column(db.SmallInteger, primary_key=True, autoincrement=False, default=0)
+    total_quantity = db.Column(db.Integer, nullable=False, default=0)
+    on_loan = db.Column(db.Integer, nullable=False, default=0)
+
+class HotelCirculationStats(db.Model):
+    """
+    Active loans and lifetime borrow count per hotel, split over
+    STATS_COUNTER_SHARDS rows so concurrent borrows rarely update the same
+    row; a hotel's figures are the sums over its shards.
+    """
+    __tablename__ = 'hotel_circulation_stats'
+
+    borrower_hotel = db.Column(db.String(255), primary_key=True)
+    shard = db.Column(db.SmallInteger, primary_key=True, autoincrement=False, default=0)
+    active_loans = db.Column(db.Integer, nullable=False, default=0)
+    borrow_count = db.Column(db.Integer, nullable=False, default=0)
+
+class DailyCirculationStats(db.Model):
+    """Borrow and return counts per UTC day, sharded like HotelCirculationStats."""
+    __tablename__ = 'daily_circulation_stats'
+
+    day = db.Column(db.Date, primary_key=True)
+    shard = db.Column(db.SmallInteger, primary_key=True, autoincrement=False, default=0)
+    borrow_count = db.Column(db.Integer, nullable=False, default=0)
+    return_count = db.Column(db.Integer, nullable=False, default=0)
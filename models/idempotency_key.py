@@ -0,0 +1,25 @@
+# models/idempotency_key.py
+from extensions import db
+from sqlalchemy.sql import func
+from sqlalchemy import Index
+
+class IdempotencyKey(db.Model):
+    __tablename__ = 'idempotency_keys'
+
+    # SHA-256 of client, method, path and the Idempotency-Key header value
+    key = db.Column(db.String(64), primary_key=True)
+    # SHA-256 of the request body, used to detect a key reused for another request
+    request_hash = db.Column(db.String(64), nullable=False)
+    # NULL while the original request is still being processed
+    status_code = db.Column(db.Integer, nullable=True)
+    response_body = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.TIMESTAMP(timezone=True), nullable=False, server_default=func.now())
+    # When the request now processing the key started; a retry may take over
+    # an unfinished claim once it is older than IDEMPOTENCY_LEASE_SECONDS
+    claimed_at = db.Column(db.TIMESTAMP(timezone=True), nullable=False, server_default=func.now())
+    expires_at = db.Column(db.TIMESTAMP(timezone=True), nullable=False)
+
+    # Table arguments for indexes
+    __table_args__ = (
+        Index('idx_idempotency_keys_expires_at', 'expires_at'),
+    )
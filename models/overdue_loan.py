@@ -0,0 +1,33 @@
+# models/overdue_loan.py
+from extensions import db
+from sqlalchemy import Index
+
+class OverdueLoan(db.Model):
+    """
+    Loans flagged as overdue by `flask flag-overdue-loans`.
+    A flag stays until the job runs after the loan is returned; readers join
+    borrowings to hide returned loans in the meantime.
+    """
+    __tablename__ = 'overdue_loans'
+
+    borrowing_id = db.Column(db.Integer, db.ForeignKey('borrowings.id', ondelete='CASCADE'), primary_key=True)
+    borrower_hotel = db.Column(db.String(255), nullable=False)
+    borrower_room_number = db.Column(db.String(10), nullable=False)
+    due_at = db.Column(db.TIMESTAMP(timezone=True), nullable=False)
+    flagged_at = db.Column(db.TIMESTAMP(timezone=True), nullable=False)
+
+    # Table arguments for indexes
+    __table_args__ = (
+        Index('idx_overdue_loans_hotel_room', 'borrower_hotel', 'borrower_room_number'),
+    )
+
+class OverdueScanState(db.Model):
+    """Single row (id = 1) recording how far the overdue job has scanned."""
+    __tablename__ = 'overdue_scan_state'
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    # Loans borrowed before this instant have already been checked
+    watermark = db.Column(db.TIMESTAMP(timezone=True), nullable=False)
+    # Loan period the watermark was computed with; a change forces a full rescan
+    loan_period_days = db.Column(db.Integer, nullable=False)
+    last_run_at = db.Column(db.TIMESTAMP(timezone=True), nullable=False)
@@ -0,0 +1,141 @@
+# routes/batch.py
+from flask import Blueprint, request, jsonify, current_app, g
+from flask_pydantic import validate
+from flask_sqlalchemy.query import Query
+from sqlalchemy.orm import Session
+from werkzeug.test import EnvironBuilder
+
+from extensions import db, outer_transaction
+from routes.pydantic_models import BatchRequest
+from services.stats_service import apply_deferred_stats
+from services.suggest_service import get_suggest_index
+from utils.availability_events import publish_availability
+from utils.circulation_log import record_circulation
+from utils.idempotency import idempotency_scope
+from utils.rate_limit import expensive_endpoint, rate_limit_sub_request
+
+batch_bp = Blueprint('batch_bp', __name__)
+
+# Endpoints that cannot run as a sub-request
+_EXCLUDED_ENDPOINTS = {'batch_bp.run_batch', 'books_bp.stream_availability'}
+
+# Only these headers are passed through to a sub-request
+_FORWARDED_HEADERS = {'if-match', 'idempotency-key'}
+
+
+def _dispatch(app, index, operation):
+    """
+    Run one operation through the matching view in-process and return its
+    result. Authentication already ran for the batch, so before_request hooks
+    are skipped; each operation is still charged to the caller's rate limit
+    bucket for its tier, and error handlers still apply.
+    """
+    headers = {k: v for k, v in (operation.headers or {}).items()
+               if k.lower() in _FORWARDED_HEADERS}
+    builder = EnvironBuilder(
+        path=operation.path,
+        method=operation.method,
+        headers=headers,
+        json=operation.body if operation.body is not None else None,
+        environ_base={
+            'REMOTE_ADDR': request.remote_addr,
+            'rate_limit.client_key': request.environ.get('rate_limit.client_key'),
+            # Api-Key is not forwarded; Idempotency-Key values stay scoped to the caller
+            'idempotency.scope': idempotency_scope(),
+        },
+    )
+    try:
+        environ = builder.get_environ()
+    finally:
+        builder.close()
+
+    with app.request_context(environ):
+        if request.url_rule is not None and request.url_rule.endpoint in _EXCLUDED_ENDPOINTS:
+            return {"index": index, "status": 400,
+                    "body": {"error": f"{operation.path} cannot be used in a batch."}}
+        app.logger.info('Batch operation %d: %s %s', index, operation.method, operation.path)
+        rv = rate_limit_sub_request()
+        if rv is None:
+            try:
+                rv = app.dispatch_request()
+            except Exception as e:
+                rv = app.handle_user_exception(e)
+        response = app.make_response(rv)
+
+    body = response.get_json(silent=True)
+    if body is None and response.status_code != 204:
+        body = response.get_data(as_text=True) or None
+    return {"index": index, "status": response.status_code, "body": body}
+
+
+def _run_atomic(app, operations):
+    """
+    Run every operation inside one database transaction.
+
+    The request's session is swapped for one bound to a single connection
+    with join_transaction_mode='create_savepoint', so the commits made by the
+    views only release savepoints. The outer transaction commits if every
+    operation succeeded and is rolled back at the first failure; the
+    remaining operations are skipped. Stats counter updates, availability
+    events and circulation log entries wait for the commit, so the counters
+    do not hold up the book rows the batch has locked.
+    """
+    results = []
+    committed = False
+    g.deferred_availability_events = []
+    g.deferred_circulation_events = []
+    g.deferred_stats_updates = []
+    db.session.remove()
+    with outer_transaction(db.engine) as (connection, transaction):
+        # query_cls keeps Flask-SQLAlchemy's Query, whose paginate() the list views use
+        db.session.registry.set(Session(bind=connection, join_transaction_mode='create_savepoint', query_cls=Query))
+        try:
+            for index, operation in enumerate(operations):
+                result = _dispatch(app, index, operation)
+                results.append(result)
+                if result["status"] >= 400:
+                    break
+            else:
+                transaction.commit()
+                committed = True
+        finally:
+            if not committed:
+                transaction.rollback()
+            db.session.remove()
+            events = g.pop('deferred_availability_events', [])
+            logged = g.pop('deferred_circulation_events', [])
+            counted = g.pop('deferred_stats_updates', [])
+
+    if committed:
+        apply_deferred_stats(counted)
+        publish_availability(events)
+        record_circulation(logged)
+    else:
+        # Views already applied their writes to this worker's suggest index
+        get_suggest_index().invalidate()
+        for index in range(len(results), len(operations)):
+            results.append({"index": index, "status": None, "body": None, "skipped": True})
+    return results, committed
+
+
+@batch_bp.route('/', methods=['POST'], strict_slashes=False)
+@expensive_endpoint
+@validate()
+def run_batch(body: BatchRequest):
+    """Run several API operations in one round trip, optionally as one transaction."""
+    max_operations = current_app.config['BATCH_MAX_OPERATIONS']
+    if len(body.operations) > max_operations:
+        return jsonify({"error": f"A batch may contain at most {max_operations} operations."}), 400
+
+    app = current_app._get_current_object()
+    if body.atomic:
+        results, committed = _run_atomic(app, body.operations)
+    else:
+        results = [_dispatch(app, index, operation)
+                   for index, operation in enumerate(body.operations)]
+        committed = None
+
+    current_app.logger.info(
+        f"Batch of {len(body.operations)} operations finished (atomic={body.atomic}, committed={committed})"
+    )
+    return jsonify({"atomic": body.atomic, "committed": committed, "results": results}), 200
@@ -1,17 +1,32 @@
 # routes/books.py
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, request, jsonify, current_app
+import json
 from extensions import db
 from models.book import Book
 from models.category import Category
-from services.book_service import get_all_books_service
-from routes.pydantic_models import BookCreateList, BookUpdate # MODIFIED: Import BookCreateList
+from models.borrowing import Borrowing
+from services.book_service import get_all_books_service, bulk_update_quantities_service
+from services.stats_service import record_catalog_changes
+from services.suggest_service import suggest_books_service, get_suggest_index
+from services.catalog_snapshot import query_catalog_snapshot, mark_catalog_stale
+from routes.pydantic_models import BookCreate, BookCreateList, BookUpdate, BookQuantityUpdate, BookQuantityUpdateList # MODIFIED: Import BookCreateList
 from flask_pydantic import validate
+from sqlalchemy import exists
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload
+from sqlalchemy.orm.exc import StaleDataError
+from utils.idempotency import idempotent
+from utils.validation import validate_bulk
+from utils.etag import make_etag, if_match_satisfied
+from utils.availability_events import Subscription, availability_event, publish_availability
+from utils.circulation_log import circulation_event, record_circulation
+from utils.rate_limit import exempt_from_load_shedding
 
 books_bp = Blueprint('books_bp', __name__)
 
 @books_bp.route('/', methods=['POST'], strict_slashes=False)
-@validate()
+@idempotent
+@validate_bulk(BookCreateList, 'books', BookCreate)
 def create_book(body: BookCreateList): # MODIFIED: Expect a list of books
     """Create one or more new books in a batch."""
     books_to_create = body.books
@@ -56,10 +71,23 @@ def create_book(body: BookCreateList): # MODIFIED: Expect a list of books
             new_books.append(new_book)
         
         db.session.add_all(new_books)
+        db.session.flush()
+        new_ids = [book.id for book in new_books]
+        record_catalog_changes([(book.id, book.category_id, book.total_quantity, 0) for book in new_books])
+        logged = [circulation_event('quantity_change', book) for book in new_books]
         db.session.commit()
-        
+        record_circulation(logged)
+
+        # Reload with categories in one query; the commit expired every object
+        loaded = {book.id: book for book in db.session.query(Book)
+                  .options(joinedload(Book.category)).filter(Book.id.in_(new_ids))}
+        new_books = [loaded[book_id] for book_id in new_ids]
+
         # Return the list of created books
-        return jsonify([book.to_dict() for book in new_books]), 201
+        response = jsonify([book.to_dict() for book in new_books])
+        get_suggest_index().add_books(new_books)
+        mark_catalog_stale()
+        return response, 201
 
     except IntegrityError: # This is a fallback, validations should catch most issues
         db.session.rollback()
@@ -79,12 +107,17 @@ def get_books():
     page = request.args.get('page', 1, type=int)
     per_page = request.args.get('per_page', 50, type=int)
 
-    # Get paginated books from the service
-    pagination_obj = get_all_books_service(filters, page, per_page)
-    
+    # Served from the in-memory snapshot when enabled and fresh, otherwise from SQL
+    pagination_obj = query_catalog_snapshot(filters, page, per_page)
+    if pagination_obj is not None:
+        books = pagination_obj.items
+    else:
+        pagination_obj = get_all_books_service(filters, page, per_page)
+        books = [book.to_dict() for book in pagination_obj.items]
+
     # Format the response to include pagination metadata
     return jsonify({
-        "books": [book.to_dict() for book in pagination_obj.items],
+        "books": books,
         "pagination": {
             "total": pagination_obj.total,
             "pages": pagination_obj.pages,
@@ -97,23 +130,106 @@ def get_books():
         }
     }), 200
 
+@books_bp.route('/suggest', methods=['GET'])
+def suggest_books():
+    """Typeahead suggestions by title, author or ISBN prefix, served from memory."""
+    query = request.args.get('q', '')
+    limit = request.args.get('limit', 10, type=int)
+    if not 1 <= limit <= 50:
+        return jsonify({"error": "limit must be between 1 and 50."}), 400
+
+    suggestions = suggest_books_service(query, limit)
+    return jsonify({
+        "suggestions": [
+            {"id": book_id, "title": title, "author": author, "isbn": isbn}
+            for book_id, title, author, isbn in suggestions
+        ]
+    }), 200
+
+def _parse_id_list(value):
+    """Parse a comma-separated list of integer ids, e.g. '1,2,3'."""
+    if not value:
+        return None
+    return [int(part) for part in value.split(',') if part.strip()]
+
+@books_bp.route('/stream', methods=['GET'])
+@exempt_from_load_shedding
+def stream_availability():
+    """
+    Server-Sent Events stream of available_quantity changes.
+    Filter with book_ids and/or category_ids; resume with Last-Event-ID.
+    """
+    try:
+        book_ids = _parse_id_list(request.args.get('book_ids'))
+        category_ids = _parse_id_list(request.args.get('category_ids'))
+        last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+        last_event_id = int(last_event_id) if last_event_id else None
+    except ValueError:
+        return jsonify({"error": "book_ids, category_ids and Last-Event-ID must be integers."}), 400
+
+    broker = current_app.extensions['availability_broker']
+    if broker.subscriber_count() >= current_app.config['SSE_MAX_SUBSCRIBERS']:
+        response = jsonify({"error": "Too many open event streams. Please retry later."})
+        response.headers['Retry-After'] = '5'
+        return response, 503
+
+    heartbeat = current_app.config['SSE_HEARTBEAT_SECONDS']
+    subscription = Subscription(book_ids, category_ids, current_app.config['SSE_BUFFER_SIZE'])
+    broker.subscribe(subscription, last_event_id)
+
+    def generate():
+        # No request context or DB session is held while the stream is open
+        try:
+            yield f"retry: {heartbeat * 1000}\n\n"
+            while True:
+                events, resync = subscription.get(timeout=heartbeat)
+                if resync:
+                    # The client fell behind or resumed past the history: tell it to refetch availability
+                    yield f"event: resync\ndata: {json.dumps(resync)}\n\n"
+                if not events and not resync:
+                    yield ": heartbeat\n\n"
+                for event in events:
+                    yield f"id: {event['id']}\nevent: availability\ndata: {json.dumps(event)}\n\n"
+        finally:
+            broker.unsubscribe(subscription)
+
+    return Response(generate(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no',
+    })
+
 @books_bp.route('/<int:id>', methods=['GET'])
 def get_book(id):
     """Get a single book by ID."""
-    book = db.session.get(Book, id)
+    book = db.session.get(Book, id, options=[joinedload(Book.category)])
     if not book:
         return jsonify({"error": "Book not found"}), 404
-    return jsonify({"book": book.to_dict()}), 200
+    response = jsonify({"book": book.to_dict()})
+    response.headers['ETag'] = make_etag(book.version_id)
+    return response, 200
 
 @books_bp.route('/<int:id>', methods=['PATCH'])
 @validate()
 def update_book(id, body: BookUpdate):
-    """Update book information (partial updates)."""
-    book = db.session.get(Book, id)
+    """
+    Update book information (partial updates).
+    Honours If-Match against the book's ETag and returns 412 when it is stale.
+    """
+    book = db.session.get(Book, id, options=[joinedload(Book.category)])
     if not book:
         return jsonify({"error": "Book not found"}), 404
 
+    if_match = request.headers.get('If-Match')
+    if if_match is None and current_app.config.get('REQUIRE_IF_MATCH'):
+        return jsonify({"error": "If-Match header is required to update a book."}), 428
+    if if_match is not None and not if_match_satisfied(if_match, book.version_id):
+        return jsonify({
+            "error": "Book has been modified since it was last fetched.",
+            "version": book.version_id
+        }), 412
+
     update_data = body.model_dump(exclude_unset=True)
+    before = (book.category_id, book.total_quantity, book.total_quantity - book.available_quantity)
 
     if 'total_quantity' in update_data:
         new_total_quantity = update_data['total_quantity']
@@ -138,22 +254,66 @@ def update_book(id, body: BookUpdate):
     try:
         for key, value in update_data.items():
             setattr(book, key, value)
+        record_catalog_changes([
+            (id, before[0], -before[1], -before[2]),
+            (id, book.category_id, book.total_quantity, book.total_quantity - book.available_quantity),
+        ])
+        event = availability_event(book)
+        logged = [circulation_event('quantity_change', book)] if 'total_quantity' in body.model_fields_set else []
         db.session.commit()
-        return jsonify(book.to_dict()), 200
+        publish_availability([event])
+        record_circulation(logged)
+        # category_id may have changed; reload the row and its category in one query
+        book = db.session.get(Book, id, options=[joinedload(Book.category)], populate_existing=True)
+        response = jsonify(book.to_dict())
+        get_suggest_index().add_books([book])
+        response.headers['ETag'] = make_etag(book.version_id)
+        return response, 200
     except IntegrityError:
         db.session.rollback()
         return jsonify({"error": "Update failed. ISBN might already exist or category_id is invalid."}), 409
+    except StaleDataError:
+        # A concurrent borrow/return or edit changed the row after it was read
+        db.session.rollback()
+        return jsonify({
+            "error": "Book was modified concurrently. Fetch it again and retry."
+        }), 412 if if_match is not None else 409
+
+@books_bp.route('/quantities', methods=['PATCH'])
+@validate_bulk(BookQuantityUpdateList, 'items', BookQuantityUpdate)
+def update_book_quantities(body: BookQuantityUpdateList):
+    """Set total_quantity for many books at once, e.g. after a stocktake."""
+    result, error = bulk_update_quantities_service(body.items)
+    if error:
+        return jsonify({"error": error}), 500
+
+    current_app.logger.info(
+        f"Bulk quantity update: {len(result['updated'])} updated, {len(result['rejected'])} rejected"
+    )
+    return jsonify(result), 200
 
 @books_bp.route('/<int:id>', methods=['DELETE'])
 def delete_book(id):
-    """Delete a book."""
-    book = db.session.get(Book, id)
+    """Delete a book and its returned loan history."""
+    # Lock the book so no borrow can start between the check and the delete
+    book = db.session.query(Book).filter_by(id=id).with_for_update().first()
     if not book:
+        db.session.rollback()
         return jsonify({"error": "Book not found"}), 404
-    
-    if any(not b.is_returned for b in book.borrowings):
+
+    has_active_loans = db.session.query(
+        exists().where(Borrowing.book_id == id, Borrowing.is_returned == False)
+    ).scalar()
+    if has_active_loans:
+        db.session.rollback()
         return jsonify({"error": "Cannot delete book with active borrowing records."}), 409
 
+    db.session.query(Borrowing).filter(Borrowing.book_id == id).delete(synchronize_session=False)
+    record_catalog_changes([
+        (id, book.category_id, -book.total_quantity, book.available_quantity - book.total_quantity)
+    ])
     db.session.delete(book)
     db.session.commit()
+    get_suggest_index().remove_book(id)
+    mark_catalog_stale()
     return '', 204
@@ -1,16 +1,40 @@
 # routes/borrowings.py
-from flask import Blueprint, request, jsonify
-from services.borrowing_service import borrow_book_service, return_book_service
+from flask import Blueprint, request, jsonify, current_app
+from datetime import datetime, timezone
+from services.borrowing_service import (
+    borrow_book_service, return_book_service, return_room_service,
+    get_active_loans_service, get_borrowings_service, loan_projection_query
+)
+from services.archive_service import archive_horizon
+from services.overdue_service import get_overdue_loans_service
 from models.borrowing import Borrowing
-from models.book import Book # Import the Book model
+from models.borrowing_archive import BorrowingArchive
 from extensions import db
-from routes.pydantic_models import BorrowBook
+from routes.pydantic_models import BorrowBook, ReturnRoom
 from flask_pydantic import validate
-from sqlalchemy import or_ # Import or_ for complex queries
+from sqlalchemy.orm import joinedload
+from utils.idempotency import idempotent
 
 borrowings_bp = Blueprint('borrowings_bp', __name__)
 
+def _loan_row_to_dict(row):
+    """Format a loan_projection_query() row like Borrowing.to_dict()."""
+    return {
+        "id": row.id,
+        "book_id": row.book_id,
+        "book_title": row.book_title,
+        "borrower_name": row.borrower_name,
+        "borrower_email": row.borrower_email,
+        "borrower_phone": row.borrower_phone,
+        "borrower_room_number": row.borrower_room_number,
+        "borrower_hotel": row.borrower_hotel,
+        "borrowed_at": row.borrowed_at.isoformat(),
+        "returned_at": row.returned_at.isoformat() if row.returned_at else None,
+        "is_returned": row.is_returned
+    }
+
 @borrowings_bp.route('/borrow', methods=['POST'])
+@idempotent
 @validate()
 def borrow_book_endpoint(body: BorrowBook):
     """Endpoint to borrow a book."""
@@ -26,6 +50,7 @@ def borrow_book_endpoint(body: BorrowBook):
     return jsonify(borrowing_record.to_dict()), 201
 
 @borrowings_bp.route('/return/<int:borrowing_id>', methods=['PATCH'])
+@idempotent
 def return_book_endpoint(borrowing_id: int):
     """Endpoint to return a book."""
     borrowing_record, error = return_book_service(borrowing_id)
@@ -39,61 +64,89 @@ def return_book_endpoint(borrowing_id: int):
 
     return jsonify(borrowing_record.to_dict()), 200
 
+@borrowings_bp.route('/return-room', methods=['PATCH'])
+@idempotent
+@validate()
+def return_room_endpoint(body: ReturnRoom):
+    """Endpoint to return every active loan of a hotel room (checkout day)."""
+    returned_ids, error = return_room_service(body.borrower_hotel, body.borrower_room_number)
+
+    if error == "No active borrowing records found for this room":
+        return jsonify({"error": error}), 404
+    if error == "Cannot return book: available quantity would exceed total quantity":
+        return jsonify({"error": error}), 409
+    if error:
+        return jsonify({"error": "An internal error occurred"}), 500
+
+    rows = loan_projection_query().filter(Borrowing.id.in_(returned_ids)).order_by(Borrowing.id).all()
+    return jsonify({"borrowings": [_loan_row_to_dict(row) for row in rows]}), 200
+
+@borrowings_bp.route('/active', methods=['GET'])
+def get_active_loans():
+    """Get the books currently out for a hotel, optionally narrowed to one room."""
+    hotel = request.args.get('hotel')
+    if not hotel:
+        return jsonify({"error": "The 'hotel' query parameter is required."}), 400
+
+    rows = get_active_loans_service(hotel, request.args.get('room'))
+    return jsonify({"borrowings": [_loan_row_to_dict(row) for row in rows]}), 200
+
+@borrowings_bp.route('/overdue', methods=['GET'])
+def get_overdue_loans():
+    """Get the overdue loans found by the last `flask flag-overdue-loans` run, with a per-room summary."""
+    state, loans, summary = get_overdue_loans_service(request.args.get('hotel'), request.args.get('room'))
+    return jsonify({
+        "last_run_at": state.last_run_at.isoformat() if state else None,
+        "loan_period_days": state.loan_period_days if state else None,
+        "summary": summary,
+        "borrowings": [dict(_loan_row_to_dict(loan), due_at=loan.due_at.isoformat()) for loan in loans]
+    }), 200
+
 @borrowings_bp.route('/', methods=['GET'], strict_slashes=False)
 def get_borrowings():
-    """Get a list of all borrowing records with optional filters and pagination."""
-    query = db.session.query(Borrowing)
-    
-    # --- Fuzzy Search Logic ---
-    search_filter = request.args.get('search')
-    if search_filter:
-        search_term = f"%{search_filter}%"
-        # Join with the Book table to search by book title
-        query = query.join(Book, Borrowing.book_id == Book.id)
-        query = query.filter(
-            or_(
-                Borrowing.borrower_name.ilike(search_term),
-                Borrowing.borrower_email.ilike(search_term),
-                Borrowing.borrower_phone.ilike(search_term),
-                Borrowing.borrower_hotel.ilike(search_term),
-                Book.title.ilike(search_term)
-            )
-        )
+    """
+    Get a list of borrowing records with optional filters and pagination.
+    Archived history is only read when requested or when the date range reaches it.
+    """
+    filters = {'search': request.args.get('search')}
 
     # --- is_returned Filter Logic ---
     is_returned_filter = request.args.get('is_returned')
     if is_returned_filter is not None:
         if is_returned_filter.lower() in ['false', 'f', '0', 'no']:
-            query = query.filter(Borrowing.is_returned == False)
+            filters['is_returned'] = False
         elif is_returned_filter.lower() in ['true', 't', '1', 'yes']:
-            query = query.filter(Borrowing.is_returned == True)
-            
+            filters['is_returned'] = True
+
+    # --- borrowed_at Range Logic ---
+    try:
+        for param in ('borrowed_from', 'borrowed_to'):
+            value = request.args.get(param)
+            if value:
+                parsed = datetime.fromisoformat(value)
+                filters[param] = parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+    except ValueError:
+        return jsonify({"error": "borrowed_from and borrowed_to must be ISO 8601 dates."}), 400
+
+    # Returned loans older than the horizon live in borrowings_archive
+    horizon = archive_horizon(current_app.config['BORROWINGS_ARCHIVE_AFTER_DAYS'])
+    borrowed_from, borrowed_to = filters.get('borrowed_from'), filters.get('borrowed_to')
+    include_archived = (
+        request.args.get('include_archived', '').lower() in ['true', 't', '1', 'yes']
+        or (borrowed_from is not None and borrowed_from < horizon)
+        # An open-ended range that ends before the horizon only reaches archived loans
+        or (borrowed_from is None and borrowed_to is not None and borrowed_to < horizon)
+    ) and filters.get('is_returned') is not False
+
     # --- Pagination Logic ---
     page = request.args.get('page', 1, type=int)
     per_page = request.args.get('per_page', 50, type=int)
 
-    if per_page == 0:
-        items = query.order_by(Borrowing.borrowed_at.desc()).all()
-        class AllItemsPagination:
-            def __init__(self, items):
-                self.items = items
-                self.total = len(items)
-                self.pages = 1 if self.total > 0 else 0
-                self.page = 1
-                self.per_page = self.total
-                self.has_next = False
-                self.has_prev = False
-                self.next_num = None
-                self.prev_num = None
-        pagination_obj = AllItemsPagination(items)
-    else:
-        pagination_obj = query.order_by(Borrowing.borrowed_at.desc()).paginate(
-            page=page, per_page=per_page, error_out=False
-        )
-    
+    pagination_obj = get_borrowings_service(filters, page, per_page, include_archived)
+
     # Format and return the response
     return jsonify({
-        "borrowings": [b.to_dict() for b in pagination_obj.items],
+        "borrowings": [_loan_row_to_dict(row) for row in pagination_obj.items],
         "pagination": {
             "total": pagination_obj.total,
             "pages": pagination_obj.pages,
@@ -109,7 +162,8 @@ def get_borrowings():
 @borrowings_bp.route('/<int:id>', methods=['GET'])
 def get_borrowing(id):
     """Get a single borrowing record by ID."""
-    borrowing = db.session.get(Borrowing, id)
+    borrowing = (db.session.get(Borrowing, id, options=[joinedload(Borrowing.book)])
+                 or db.session.get(BorrowingArchive, id, options=[joinedload(BorrowingArchive.book)]))
     if not borrowing:
         return jsonify({"error": "Borrowing record not found"}), 404
     return jsonify(borrowing.to_dict()), 200
@@ -5,6 +5,7 @@ from models.category import Category
 from models.book import Book
 from routes.pydantic_models import CategoryCreate, CategoryUpdate
 from flask_pydantic import validate
+from services.catalog_snapshot import mark_catalog_stale
 
 categories_bp = Blueprint('categories_bp', __name__)
 
@@ -48,6 +49,8 @@ def update_category(id, body: CategoryUpdate):
 
     category.name = body.name
     db.session.commit()
+    # Book listings carry the category name
+    mark_catalog_stale()
     return jsonify(category.to_dict()), 200
 
 @categories_bp.route('/<int:id>', methods=['DELETE'])
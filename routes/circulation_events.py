@@ -0,0 +1,24 @@
+# routes/circulation_events.py
+from flask import Blueprint, request, jsonify, current_app
+from services.circulation_event_service import get_circulation_events_service
+
+circulation_events_bp = Blueprint('circulation_events_bp', __name__)
+
+@circulation_events_bp.route('/', methods=['GET'], strict_slashes=False)
+def get_circulation_events():
+    """Read the circulation event log in id order, for analytics and change-feed consumers."""
+    after_id = request.args.get('after_id', 0, type=int)
+    limit = request.args.get('limit', 500, type=int)
+
+    if after_id < 0:
+        return jsonify({"error": "after_id must not be negative."}), 400
+    if not 1 <= limit <= 5000:
+        return jsonify({"error": "limit must be between 1 and 5000."}), 400
+
+    events, next_after_id = get_circulation_events_service(
+        after_id, limit, current_app.config['CIRCULATION_EVENTS_SETTLE_SECONDS']
+    )
+    return jsonify({
+        "events": [event.to_dict() for event in events],
+        "next_after_id": next_after_id
+    }), 200
@@ -1,9 +1,14 @@
 # routes/pydantic_models.py
-from pydantic import BaseModel, constr, conint, EmailStr, Field
-from typing import Optional, List
+from pydantic import BaseModel, ConfigDict, constr, conint, EmailStr, Field, model_validator
+from typing import Any, Dict, List, Literal, Optional
+
+class ApiModel(BaseModel):
+    # Build validators on first use instead of at import, to keep cold starts short
+    model_config = ConfigDict(defer_build=True)
+
 
 # --- Category Models ---
-class CategoryBase(BaseModel):
+class CategoryBase(ApiModel):
     name: constr(min_length=1, max_length=100)
 
 class CategoryCreate(CategoryBase):
@@ -13,7 +18,7 @@ class CategoryUpdate(CategoryBase):
     pass
 
 # --- Book Models ---
-class BookBase(BaseModel):
+class BookBase(ApiModel):
     title: constr(min_length=1, max_length=255)
     author: constr(min_length=1, max_length=255)
     isbn: constr(min_length=10, max_length=20) # ISBN-10 or ISBN-13
@@ -24,10 +29,10 @@ class BookBase(BaseModel):
 class BookCreate(BookBase):
     pass
 
-class BookCreateList(BaseModel):
+class BookCreateList(ApiModel):
     books: List[BookCreate] = Field(..., min_length=1)
 
-class BookUpdate(BaseModel):
+class BookUpdate(ApiModel):
     title: Optional[constr(min_length=1, max_length=255)] = None
     author: Optional[constr(min_length=1, max_length=255)] = None
     isbn: Optional[constr(min_length=10, max_length=20)] = None
@@ -36,9 +41,23 @@ class BookUpdate(BaseModel):
     category_id: Optional[int] = None
     image_url: Optional[str] = None
 
+class BookQuantityUpdate(ApiModel):
+    id: Optional[int] = None
+    isbn: Optional[constr(min_length=10, max_length=20)] = None
+    total_quantity: conint(ge=0)
+
+    @model_validator(mode='after')
+    def check_one_identifier(self):
+        if (self.id is None) == (self.isbn is None):
+            raise ValueError('Provide exactly one of id or isbn')
+        return self
+
+class BookQuantityUpdateList(ApiModel):
+    items: List[BookQuantityUpdate] = Field(..., min_length=1)
+
 
 # --- Borrowing Models ---
-class BorrowBook(BaseModel):
+class BorrowBook(ApiModel):
     book_id: int
     borrower_name: constr(min_length=1, max_length=255)
     borrower_email: Optional[EmailStr] = None
@@ -46,5 +65,21 @@ class BorrowBook(BaseModel):
     borrower_room_number: constr(min_length=1, max_length=10)
     borrower_hotel: constr(min_length=1, max_length=255)
 
-class ReturnBook(BaseModel):
+class ReturnBook(ApiModel):
     borrowing_id: int
+
+class ReturnRoom(ApiModel):
+    borrower_hotel: constr(min_length=1, max_length=255)
+    borrower_room_number: constr(min_length=1, max_length=10)
+
+
+# --- Batch Models ---
+class BatchOperation(ApiModel):
+    method: Literal['GET', 'POST', 'PATCH', 'DELETE']
+    path: constr(pattern=r'^/api/')
+    body: Optional[Any] = None
+    headers: Optional[Dict[str, str]] = None
+
+class BatchRequest(ApiModel):
+    operations: List[BatchOperation] = Field(..., min_length=1)
+    atomic: bool = False
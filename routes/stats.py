@@ -0,0 +1,18 @@
+# routes/stats.py
+from flask import Blueprint, request, jsonify
+from services.stats_service import get_stats_service
+
+stats_bp = Blueprint('stats_bp', __name__)
+
+@stats_bp.route('/', methods=['GET'], strict_slashes=False)
+def get_stats():
+    """Get circulation statistics for the management dashboard."""
+    top = request.args.get('top', 10, type=int)
+    days = request.args.get('days', 30, type=int)
+
+    if not 1 <= top <= 100:
+        return jsonify({"error": "top must be between 1 and 100."}), 400
+    if not 1 <= days <= 366:
+        return jsonify({"error": "days must be between 1 and 366."}), 400
+
+    return jsonify(get_stats_service(top, days)), 200
@@ -0,0 +1,71 @@
+# services/archive_service.py
+import time
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import delete, insert, select
+
+from extensions import db
+from models.borrowing import Borrowing
+from models.borrowing_archive import BorrowingArchive
+
+# Columns copied verbatim from borrowings to borrowings_archive
+_ARCHIVED_COLUMNS = [
+    'id', 'book_id', 'borrower_name', 'borrower_email', 'borrower_phone',
+    'borrower_room_number', 'borrower_hotel', 'borrowed_at', 'returned_at', 'is_returned'
+]
+
+def archive_horizon(archive_after_days):
+    """Loans borrowed on or after this instant are guaranteed to still be in the hot table."""
+    return datetime.now(timezone.utc) - timedelta(days=archive_after_days)
+
+def archive_returned_borrowings(older_than_days, batch_size=1000, max_batches=None, pause=0.0):
+    """
+    Move returned borrowings whose return is older than `older_than_days` into
+    borrowings_archive, one bounded batch per transaction.
+
+    Each batch is a single DELETE ... RETURNING feeding an INSERT, so rows are
+    never in both tables. Batches walk the primary key from the last archived
+    id, which keeps every batch an index range scan, and rows locked by a
+    concurrent request are skipped rather than waited on.
+    Returns the total number of rows archived.
+    """
+    cutoff = archive_horizon(older_than_days)
+    borrowings = Borrowing.__table__
+    archive = BorrowingArchive.__table__
+
+    last_id = 0
+    total = 0
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        batch_ids = select(borrowings.c.id).where(
+            borrowings.c.id > last_id,
+            borrowings.c.is_returned == True,
+            borrowings.c.returned_at < cutoff
+        ).order_by(borrowings.c.id).limit(batch_size).with_for_update(skip_locked=True)
+
+        moved = delete(borrowings).where(
+            borrowings.c.id.in_(batch_ids.scalar_subquery())
+        ).returning(*[borrowings.c[name] for name in _ARCHIVED_COLUMNS]).cte('moved')
+
+        statement = insert(archive).from_select(
+            _ARCHIVED_COLUMNS, select(*[moved.c[name] for name in _ARCHIVED_COLUMNS])
+        ).returning(archive.c.id)
+
+        try:
+            archived_ids = db.session.execute(statement).scalars().all()
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+        if not archived_ids:
+            break
+
+        last_id = max(archived_ids)
+        total += len(archived_ids)
+        batches += 1
+        if pause:
+            # Give borrow/return traffic and autovacuum room between batches
+            time.sleep(pause)
+
+    return total
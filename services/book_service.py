@@ -1,15 +1,21 @@
 # services/book_service.py
+from datetime import datetime, timezone
 from extensions import db
 from models.book import Book
 from models.category import Category
-from sqlalchemy import or_
+from sqlalchemy import Integer, column, func, or_, update, values
+from sqlalchemy.orm import contains_eager
+from services.stats_service import record_catalog_changes
+from utils.availability_events import publish_availability
+from utils.circulation_log import record_circulation
 
 def get_all_books_service(filters, page=1, per_page=50):
     """
     Service to retrieve a list of books with optional filters and pagination.
     If per_page is 0, all items will be returned without pagination.
     """
-    query = db.session.query(Book).join(Category, Book.category_id == Category.id, isouter=True)
+    query = db.session.query(Book).join(Category, Book.category_id == Category.id, isouter=True) \
+        .options(contains_eager(Book.category))
 
     if filters.get('search'):
         search_term = f"%{filters['search']}%"
@@ -28,6 +34,9 @@ def get_all_books_service(filters, page=1, per_page=50):
         if filters['available'].lower() == 'true':
             query = query.filter(Book.available_quantity > 0)
 
+    # Stable ordering so pages do not overlap; served by the title indexes
+    query = query.order_by(Book.title, Book.id)
+
     # Apply pagination or return all items if per_page is 0
     if per_page == 0:
         items = query.all()
@@ -49,3 +58,113 @@ def get_all_books_service(filters, page=1, per_page=50):
     else:
         pagination_obj = query.paginate(page=page, per_page=per_page, error_out=False)
         return pagination_obj
+
+def bulk_update_quantities_service(items):
+    """
+    Service to set total_quantity for many books (e.g. after a stocktake).
+
+    All rows are applied by one UPDATE ... FROM (VALUES ...) that enforces the
+    same rule as update_book: the new total cannot drop below the number of
+    copies on loan. available_quantity moves by the same difference, and
+    version_id and updated_at are bumped as an ORM update would. The rows
+    are locked first to read the totals being replaced, which move the
+    per-category stats counters. No ORM objects are loaded. Entries given by isbn are resolved to ids first, so
+    a book listed twice (by id and by isbn) is caught as a duplicate.
+    Returns ({"updated": [...], "rejected": [...]}, error).
+    """
+    isbns = [item.isbn for item in items if item.id is None]
+    ids_by_isbn = dict(db.session.query(Book.isbn, Book.id).filter(Book.isbn.in_(isbns)).all()) if isbns else {}
+
+    rejected = []
+    seen = set()
+    rows = []
+    for index, item in enumerate(items):
+        given = {"id": item.id} if item.id is not None else {"isbn": item.isbn}
+        book_id = item.id if item.id is not None else ids_by_isbn.get(item.isbn)
+        if book_id is None:
+            rejected.append({"index": index, **given, "error": "Book not found"})
+            continue
+        if book_id in seen:
+            rejected.append({"index": index, **given, "error": "Duplicate entry in request"})
+            continue
+        seen.add(book_id)
+        rows.append((index, book_id, given, item.total_quantity))
+
+    books = Book.__table__
+    updated = []
+    occurred_at = datetime.now(timezone.utc)
+    if rows:
+        adj = values(
+            column('book_id', Integer), column('total_quantity', Integer),
+            name='adjustments'
+        ).data([(book_id, total_quantity) for _, book_id, _, total_quantity in rows]).alias('adjustments')
+
+        stmt = (
+            update(books)
+            .where(books.c.id == adj.c.book_id)
+            .where(adj.c.total_quantity >= books.c.total_quantity - books.c.available_quantity)
+            .values(
+                available_quantity=books.c.available_quantity + adj.c.total_quantity - books.c.total_quantity,
+                total_quantity=adj.c.total_quantity,
+                version_id=books.c.version_id + 1,
+                updated_at=func.now(),
+            )
+            .returning(books.c.id, books.c.isbn, books.c.category_id,
+                       books.c.total_quantity, books.c.available_quantity, books.c.version_id)
+        )
+        try:
+            # Lock the rows in id order and read the totals the update replaces
+            previous = {book_id: (category_id, total_quantity) for book_id, category_id, total_quantity in
+                        db.session.query(Book.id, Book.category_id, Book.total_quantity)
+                        .filter(Book.id.in_([book_id for _, book_id, _, _ in rows]))
+                        .order_by(Book.id).with_for_update()}
+            updated = [dict(row._mapping) for row in db.session.execute(stmt)]
+            record_catalog_changes([
+                (row['id'], previous[row['id']][0], row['total_quantity'] - previous[row['id']][1], 0)
+                for row in updated
+            ])
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            return None, "An internal error occurred"
+
+        done_ids = {row['id'] for row in updated}
+        missing = [r for r in rows if r[1] not in done_ids]
+        if missing:
+            rejected.extend(_explain_rejections(missing))
+
+    publish_availability([
+        {"book_id": row['id'], "category_id": row['category_id'],
+         "available_quantity": row['available_quantity'], "total_quantity": row['total_quantity']}
+        for row in updated
+    ])
+    record_circulation([
+        {"event_type": 'quantity_change', "book_id": row['id'], "borrowing_id": None, "borrower_hotel": None,
+         "total_quantity": row['total_quantity'], "available_quantity": row['available_quantity'],
+         "occurred_at": occurred_at}
+        for row in updated
+    ])
+    rejected.sort(key=lambda r: r['index'])
+    return {"updated": updated, "rejected": rejected}, None
+
+def _explain_rejections(rows):
+    """Look up why the rows missed by the bulk UPDATE were not applied."""
+    found = db.session.query(
+        Book.id, (Book.total_quantity - Book.available_quantity).label('on_loan')
+    ).filter(Book.id.in_([r[1] for r in rows])).all()
+    by_id = {b.id: b for b in found}
+
+    rejections = []
+    for index, book_id, given, total_quantity in rows:
+        rejection = {"index": index, **given}
+        book = by_id.get(book_id)
+        if book is None:
+            rejection["error"] = "Book not found"
+        elif total_quantity < book.on_loan:
+            rejection["error"] = (f"Cannot reduce total quantity to {total_quantity}. "
+                                  f"There are currently {book.on_loan} books on loan.")
+        else:
+            # A borrow committed between the UPDATE and this lookup
+            rejection["error"] = "Book was modified concurrently. Retry this row."
+        rejections.append(rejection)
+    return rejections
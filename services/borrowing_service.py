@@ -2,7 +2,19 @@
 from extensions import db
 from models.book import Book
 from models.borrowing import Borrowing
+from models.borrowing_archive import BorrowingArchive
+from services.stats_service import record_borrows, record_returns
+from utils.availability_events import availability_event, publish_availability
+from utils.circulation_log import circulation_event, record_circulation
+from sqlalchemy import or_
+from sqlalchemy.orm import joinedload
 from datetime import datetime
+from collections import Counter
+
+def _load_with_book(borrowing_id):
+    """Reload a borrowing and its book in one query; commit expires both."""
+    return db.session.get(Borrowing, borrowing_id, options=[joinedload(Borrowing.book)],
+                          populate_existing=True)
 
 def borrow_book_service(data):
     """
@@ -34,8 +46,17 @@ def borrow_book_service(data):
             borrower_hotel=data.get('borrower_hotel')
         )
         db.session.add(new_borrowing)
+        db.session.flush()
+        borrowing_id = new_borrowing.id
+        loans, hotel = [(book.id, book.category_id)], new_borrowing.borrower_hotel
+        event = availability_event(book)
+        logged = circulation_event('borrow', book, new_borrowing)
         db.session.commit()
-        return new_borrowing, None
+        # Counted once the book row lock is released
+        record_borrows(loans, hotel)
+        publish_availability([event])
+        record_circulation([logged])
+        return _load_with_book(borrowing_id), None
         
     except Exception as e:
         db.session.rollback()
@@ -71,9 +92,156 @@ def return_book_service(borrowing_id):
         book.available_quantity += 1
         borrowing_record.is_returned = True
         borrowing_record.returned_at = datetime.utcnow()
+        loans, hotel = [(book.id, book.category_id)], borrowing_record.borrower_hotel
+        event = availability_event(book)
+        logged = circulation_event('return', book, borrowing_record)
         
         db.session.commit()
-        return borrowing_record, None
+        # Counted once the book and borrowing row locks are released
+        record_returns(loans, hotel)
+        publish_availability([event])
+        record_circulation([logged])
+        return _load_with_book(borrowing_id), None
+
+    except Exception as e:
+        db.session.rollback()
+        # In a real app, you'd want to log the error e
+        return None, "An internal error occurred"
+
+
+def loan_projection_query(model=Borrowing):
+    """
+    Query the borrowing columns together with the book title in a single join.
+    Rows are plain tuples, so no ORM objects or per-row lazy loads are involved.
+    Pass `model=BorrowingArchive` to read archived records in the same shape.
+    """
+    return db.session.query(
+        model.id.label('id'),
+        model.book_id.label('book_id'),
+        Book.title.label('book_title'),
+        model.borrower_name.label('borrower_name'),
+        model.borrower_email.label('borrower_email'),
+        model.borrower_phone.label('borrower_phone'),
+        model.borrower_room_number.label('borrower_room_number'),
+        model.borrower_hotel.label('borrower_hotel'),
+        model.borrowed_at.label('borrowed_at'),
+        model.returned_at.label('returned_at'),
+        model.is_returned.label('is_returned')
+    ).join(Book, model.book_id == Book.id)
+
+def _filter_loans(query, model, filters):
+    """Apply the list endpoint's search, is_returned and borrowed_at range filters."""
+    if filters.get('search'):
+        search_term = f"%{filters['search']}%"
+        query = query.filter(
+            or_(
+                model.borrower_name.ilike(search_term),
+                model.borrower_email.ilike(search_term),
+                model.borrower_phone.ilike(search_term),
+                model.borrower_hotel.ilike(search_term),
+                Book.title.ilike(search_term)
+            )
+        )
+
+    if filters.get('is_returned') is not None:
+        query = query.filter(model.is_returned == filters['is_returned'])
+
+    if filters.get('borrowed_from'):
+        query = query.filter(model.borrowed_at >= filters['borrowed_from'])
+    if filters.get('borrowed_to'):
+        query = query.filter(model.borrowed_at < filters['borrowed_to'])
+
+    return query
+
+def get_borrowings_service(filters, page=1, per_page=50, include_archived=False):
+    """
+    Service to retrieve borrowing records with optional filters and pagination.
+    Only the hot `borrowings` table is read unless `include_archived` is set,
+    in which case archived records are merged in with UNION ALL.
+    If per_page is 0, all items will be returned without pagination.
+    """
+    query = _filter_loans(loan_projection_query(), Borrowing, filters)
+    if include_archived:
+        archived = _filter_loans(loan_projection_query(BorrowingArchive), BorrowingArchive, filters)
+        query = query.union_all(archived)
+
+    # Matches the (borrowed_at DESC, id) indexes on both tables
+    query = query.order_by(Borrowing.borrowed_at.desc(), Borrowing.id)
+
+    if per_page == 0:
+        items = query.all()
+        class AllItemsPagination:
+            def __init__(self, items):
+                self.items = items
+                self.total = len(items)
+                self.pages = 1 if self.total > 0 else 0
+                self.page = 1
+                self.per_page = self.total
+                self.has_next = False
+                self.has_prev = False
+                self.next_num = None
+                self.prev_num = None
+        return AllItemsPagination(items)
+
+    return query.paginate(page=page, per_page=per_page, error_out=False)
+
+def get_active_loans_service(hotel, room_number=None):
+    """
+    Service to list the active loans of a hotel, optionally narrowed to one room.
+    Served by the partial index on (borrower_hotel, borrower_room_number).
+    """
+    query = loan_projection_query().filter(
+        Borrowing.is_returned == False,
+        Borrowing.borrower_hotel == hotel
+    )
+    if room_number:
+        query = query.filter(Borrowing.borrower_room_number == room_number)
+    return query.order_by(Borrowing.borrower_room_number, Borrowing.borrowed_at).all()
+
+def return_room_service(hotel, room_number):
+    """
+    Handles the business logic for returning every active loan of a room at once,
+    e.g. on checkout day. Returns the ids of the returned borrowing records.
+    """
+    try:
+        # Lock the room's active loans, then their books, always in id order
+        records = db.session.query(Borrowing).filter(
+            Borrowing.is_returned == False,
+            Borrowing.borrower_hotel == hotel,
+            Borrowing.borrower_room_number == room_number
+        ).order_by(Borrowing.id).with_for_update().all()
+
+        if not records:
+            db.session.rollback()
+            return None, "No active borrowing records found for this room"
+
+        returned_per_book = Counter(record.book_id for record in records)
+        books = db.session.query(Book).filter(
+            Book.id.in_(returned_per_book)
+        ).order_by(Book.id).with_for_update().all()
+
+        for book in books:
+            if book.available_quantity + returned_per_book[book.id] > book.total_quantity:
+                db.session.rollback()
+                return None, "Cannot return book: available quantity would exceed total quantity"
+            book.available_quantity += returned_per_book[book.id]
+
+        returned_at = datetime.utcnow()
+        for record in records:
+            record.is_returned = True
+            record.returned_at = returned_at
+
+        returned_ids = [record.id for record in records]
+        events = [availability_event(book) for book in books]
+        books_by_id = {book.id: book for book in books}
+        loans = [(record.book_id, books_by_id[record.book_id].category_id) for record in records]
+        logged = [circulation_event('return', books_by_id[record.book_id], record) for record in records]
+        db.session.commit()
+        # Counted once the row locks are released
+        record_returns(loans, hotel)
+        publish_availability(events)
+        record_circulation(logged)
+        return returned_ids, None
 
     except Exception as e:
         db.session.rollback()
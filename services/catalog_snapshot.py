@@ -0,0 +1,471 @@
+# services/catalog_snapshot.py
+import sys
+import threading
+import time
+from array import array
+from bisect import bisect_right
+from datetime import timedelta
+from math import ceil
+
+from flask import current_app, g
+
+from extensions import db
+from models.book import Book
+from models.category import Category
+
+# Stored for books without a category
+_NO_CATEGORY = -1
+# Changed rows fetched per IN (...) query during a refresh
+_DELTA_CHUNK = 1000
+# updated_at is the writing transaction's start time (now()), so a row can
+# commit after a check with an older timestamp; each check re-reads rows
+# updated this long before the previous one
+_OVERLAP = timedelta(seconds=60)
+
+
+class SnapshotPage:
+    """A page of book dicts with the same attributes as a Flask-SQLAlchemy Pagination."""
+
+    def __init__(self, items, total, page, per_page, pages=None):
+        self.items = items
+        self.total = total
+        self.page = page
+        self.per_page = per_page
+        self.pages = pages if pages is not None else ceil(total / per_page)
+        self.has_prev = page > 1
+        self.has_next = page < self.pages
+        self.prev_num = page - 1 if self.has_prev else None
+        self.next_num = page + 1 if self.has_next else None
+
+
+class CatalogSnapshot:
+    """
+    Per-worker columnar copy of the books table for GET /api/books.
+
+    Integer columns are arrays indexed by row position; strings are kept in
+    parallel lists (authors interned, since they repeat). `_order` holds the
+    row positions in the database's (title, id) order, read from the database
+    so collation matches the SQL path.
+
+    Filters are bitmasks over that order, held as Python ints (bit i is the
+    i-th book by title): one mask per category and one for available books,
+    kept up to date as rows change. A search runs str.find over the search
+    text of all books joined in title order and sets the bits of the rows it
+    lands in (or, when the other filters already left under a quarter of the
+    books, tests just those). Combining filters is an AND of the masks, the total is a
+    popcount, and a page is read off by skipping whole 64-bit words until
+    its first bit, so no per-book Python work is done for rows outside the
+    page.
+
+    Availability events patch the book's quantities in place and queue its
+    id; the next read re-reads just the queued rows by primary key. Every
+    CATALOG_SNAPSHOT_MAX_AGE_SECONDS (or after a local create/delete) a
+    check fetches the rows whose updated_at moved since the previous check,
+    with an overlap for late commits, through idx_books_updated_at. It also
+    reads every (id, category_id): deletes leave no row behind and deleting
+    a category nulls category_id without touching updated_at. Ids that are
+    gone trigger a full rebuild; rows that are missing or whose category
+    differs are re-read. While a refresh is running in another thread,
+    callers that need one fall back to SQL.
+    """
+
+    def __init__(self, max_age):
+        self._max_age = max_age
+        self._refresh_lock = threading.Lock()
+        self._lock = threading.RLock()
+        self._built = False
+        self._checked_at = 0.0
+        # Set by mark_stale; cleared when a check starts, so a signal that
+        # arrives during a check is not lost when the check finishes
+        self._stale = False
+        # Ids patched by availability events, to re-read on the next read
+        self._dirty = set()
+        # Database time at the start of the last check
+        self._watermark = None
+        self._reset()
+
+    def _reset(self):
+        self._position = {}
+        self._ids = array('q')
+        self._category_ids = array('q')
+        self._total = array('l')
+        self._available = array('l')
+        self._versions = array('l')
+        self._titles, self._authors, self._isbns, self._image_urls = [], [], [], []
+        self._created, self._updated = [], []
+        # Lower-cased "title\0author\0isbn", for the search filter
+        self._search_text = []
+        self._order = array('q')
+        self._categories = {}
+        # Position -> index in _order, i.e. the row's bit in the masks
+        self._rank = array('q')
+        self._all_mask = 0
+        self._available_mask = 0
+        self._category_masks = {}
+        # Search text in title order and where each row starts; built on the first search
+        self._search_blob = None
+        self._search_starts = None
+
+    def __len__(self):
+        return len(self._position)
+
+    # --- Loading ---
+
+    @staticmethod
+    def _columns():
+        return db.session.query(
+            Book.id, Book.title, Book.author, Book.isbn, Book.image_url, Book.total_quantity,
+            Book.available_quantity, Book.category_id, Book.created_at, Book.updated_at, Book.version_id
+        )
+
+    def _set_row(self, row):
+        values = (
+            row.id, row.category_id if row.category_id is not None else _NO_CATEGORY,
+            row.total_quantity, row.available_quantity, row.version_id,
+            row.title, sys.intern(row.author), row.isbn, row.image_url,
+            row.created_at.isoformat(), row.updated_at.isoformat(),
+            '\0'.join((row.title, row.author, row.isbn)).lower(),
+        )
+        columns = (
+            self._ids, self._category_ids, self._total, self._available, self._versions,
+            self._titles, self._authors, self._isbns, self._image_urls,
+            self._created, self._updated, self._search_text,
+        )
+        position = self._position.get(row.id)
+        if position is None:
+            # Gets its bits when _set_order places it
+            self._position[row.id] = len(self._ids)
+            for column, value in zip(columns, values):
+                column.append(value)
+            return
+        old_category, old_available = self._category_ids[position], self._available[position]
+        if self._search_text[position] != values[-1]:
+            self._search_blob = None
+        for column, value in zip(columns, values):
+            column[position] = value
+        self._update_bits(position, old_category, old_available)
+
+    def _update_bits(self, position, old_category, old_available):
+        """Move a row's bits after its category or available quantity changed."""
+        index = self._rank[position] if position < len(self._rank) else -1
+        if index < 0:
+            return
+        bit = 1 << index
+        if (old_available > 0) != (self._available[position] > 0):
+            self._available_mask ^= bit
+        category_id = self._category_ids[position]
+        if category_id != old_category:
+            self._category_masks[old_category] &= ~bit
+            self._category_masks[category_id] = self._category_masks.get(category_id, 0) | bit
+
+    @staticmethod
+    def _ordered_ids():
+        return [book_id for (book_id,) in db.session.query(Book.id).order_by(Book.title, Book.id)]
+
+    def _set_order(self, ordered_ids):
+        # Rows inserted after the columns were read are picked up by the next check
+        position = self._position
+        order = array('q', (position[book_id] for book_id in ordered_ids if book_id in position))
+
+        # Every bit index moves, so the masks are rebuilt from the columns
+        rank = array('q', [-1]) * len(self._ids)
+        size = (len(order) + 7) // 8
+        available_bits = bytearray(size)
+        category_bits = {}
+        available, category_ids = self._available, self._category_ids
+        for index, p in enumerate(order):
+            rank[p] = index
+            byte, bit = index >> 3, 1 << (index & 7)
+            if available[p] > 0:
+                available_bits[byte] |= bit
+            bits = category_bits.get(category_ids[p])
+            if bits is None:
+                bits = category_bits[category_ids[p]] = bytearray(size)
+            bits[byte] |= bit
+
+        self._order = order
+        self._rank = rank
+        self._all_mask = (1 << len(order)) - 1
+        self._available_mask = int.from_bytes(available_bits, 'little')
+        self._category_masks = {cid: int.from_bytes(bits, 'little') for cid, bits in category_bits.items()}
+        self._search_blob = None
+
+    @staticmethod
+    def _category_names():
+        return {cid: sys.intern(name) for cid, name in db.session.query(Category.id, Category.name)}
+
+    @staticmethod
+    def _database_now():
+        return db.session.query(db.func.now()).scalar()
+
+    # Queries run before taking self._lock, so readers only wait for the in-memory updates
+
+    def _rebuild(self):
+        watermark = self._database_now()
+        rows = self._columns().all()
+        ordered_ids = self._ordered_ids()
+        categories = self._category_names()
+        with self._lock:
+            self._reset()
+            for row in rows:
+                self._set_row(row)
+            self._set_order(ordered_ids)
+            self._categories = categories
+            self._watermark = watermark
+            self._built = True
+
+    def _apply_rows(self, rows):
+        # New rows and retitled rows move in the (title, id) order
+        reorder = any(row.id not in self._position or self._titles[self._position[row.id]] != row.title
+                      for row in rows)
+        ordered_ids = self._ordered_ids() if reorder else None
+        with self._lock:
+            for row in rows:
+                self._set_row(row)
+            if ordered_ids is not None:
+                self._set_order(ordered_ids)
+
+    def _rows_by_id(self, book_ids):
+        rows = []
+        ordered = sorted(book_ids)
+        for start in range(0, len(ordered), _DELTA_CHUNK):
+            rows.extend(self._columns().filter(Book.id.in_(ordered[start:start + _DELTA_CHUNK])).all())
+        return rows
+
+    def _apply_deltas(self):
+        watermark = self._database_now()
+        rows = self._columns().filter(Book.updated_at >= self._watermark - _OVERLAP).all()
+        current = {
+            book_id: category_id if category_id is not None else _NO_CATEGORY
+            for book_id, category_id in db.session.query(Book.id, Book.category_id)
+        }
+        self._categories = self._category_names()
+        if self._position.keys() - current.keys():
+            # Deleted rows would leave holes in the columns
+            self._rebuild()
+            return
+
+        fetched = {row.id for row in rows}
+        position, category_ids = self._position, self._category_ids
+        # Rows committed late with an older updated_at, or whose category was deleted
+        stale = [book_id for book_id, category_id in current.items() if book_id not in fetched and (
+            book_id not in position or category_ids[position[book_id]] != category_id
+        )]
+        rows = [row for row in rows if row.id in current] + self._rows_by_id(stale)
+        self._apply_rows(rows)
+        self._watermark = watermark
+
+    def _fetch_dirty(self):
+        with self._lock:
+            book_ids, self._dirty = self._dirty, set()
+        rows = self._rows_by_id(book_ids)
+        if len(rows) < len(book_ids):
+            self._rebuild()
+            return
+        self._apply_rows(rows)
+
+    def mark_stale(self):
+        """Force a check against the database before the snapshot is served again."""
+        self._stale = True
+
+    # Lets the snapshot subscribe to the availability broker like an SSE client
+    def request_resync(self):
+        self.mark_stale()
+
+    def push(self, event):
+        """Apply an availability event's quantities now; the rest of the row is re-read on the next read."""
+        book_id = event.get('book_id')
+        if book_id is None:
+            self.mark_stale()
+            return
+        with self._lock:
+            position = self._position.get(book_id)
+            if position is not None:
+                old_available = self._available[position]
+                self._available[position] = event['available_quantity']
+                self._total[position] = event['total_quantity']
+                self._update_bits(position, self._category_ids[position], old_available)
+            self._dirty.add(book_id)
+
+    def ensure_fresh(self):
+        """
+        Return True if the snapshot may be served, first re-reading the rows
+        queued by availability events and, when it is older than the allowed
+        age, checking it against the database. Returns False (serve from SQL)
+        while another thread is refreshing or if the refresh fails.
+        """
+        due = not self._built or self._stale or time.monotonic() - self._checked_at >= self._max_age
+        if not due and not self._dirty:
+            return True
+        if not self._refresh_lock.acquire(blocking=False):
+            return False
+        try:
+            if due:
+                self._stale = False
+                started = time.monotonic()
+                if self._built:
+                    self._apply_deltas()
+                else:
+                    self._rebuild()
+                self._checked_at = started
+            if self._dirty:
+                self._fetch_dirty()
+            return True
+        except Exception as e:
+            self._stale = True
+            db.session.rollback()
+            current_app.logger.error(f"Catalog snapshot refresh failed: {e}", exc_info=True)
+            return False
+        finally:
+            self._refresh_lock.release()
+
+    # --- Reading ---
+
+    def _to_dict(self, p):
+        category_id = self._category_ids[p]
+        if category_id == _NO_CATEGORY:
+            category_id = None
+        return {
+            "id": self._ids[p],
+            "title": self._titles[p],
+            "author": self._authors[p],
+            "isbn": self._isbns[p],
+            "image_url": self._image_urls[p],
+            "total_quantity": self._total[p],
+            "available_quantity": self._available[p],
+            "category_id": category_id,
+            "category_name": self._categories.get(category_id),
+            "created_at": self._created[p],
+            "updated_at": self._updated[p],
+            "version": self._versions[p],
+        }
+
+    def _search_mask(self, term):
+        """Bits of the books whose search text contains `term` (which holds no NUL)."""
+        if self._search_blob is None:
+            texts = self._search_text
+            starts, offset = array('q'), 0
+            for p in self._order:
+                starts.append(offset)
+                offset += len(texts[p]) + 1
+            self._search_blob = '\0'.join(texts[p] for p in self._order)
+            self._search_starts = starts
+        blob, starts = self._search_blob, self._search_starts
+
+        bits = bytearray((len(starts) + 7) // 8)
+        found = blob.find(term)
+        while found != -1:
+            index = bisect_right(starts, found) - 1
+            bits[index >> 3] |= 1 << (index & 7)
+            # Skip the rest of this row
+            found = blob.find(term, starts[index + 1]) if index + 1 < len(starts) else -1
+        return int.from_bytes(bits, 'little')
+
+    def _search_candidates(self, mask, term):
+        """Bits of `mask` whose search text contains `term`, testing only those rows."""
+        texts, order = self._search_text, self._order
+        bits = bytearray((len(order) + 7) // 8)
+        for index in self._select(mask, 0, None):
+            if term in texts[order[index]]:
+                bits[index >> 3] |= 1 << (index & 7)
+        return int.from_bytes(bits, 'little')
+
+    def _select(self, mask, skip, limit):
+        """Indexes of the set bits of `mask` in order, after skipping `skip` of them; all if limit is None."""
+        data = mask.to_bytes((len(self._order) + 63) // 64 * 8, 'little')
+        indexes = []
+        for base in range(0, len(data), 8):
+            word = int.from_bytes(data[base:base + 8], 'little')
+            if not word:
+                continue
+            count = word.bit_count()
+            if skip >= count:
+                skip -= count
+                continue
+            while word:
+                low = word & -word
+                word ^= low
+                if skip:
+                    skip -= 1
+                    continue
+                indexes.append(base * 8 + low.bit_length() - 1)
+                if len(indexes) == limit:
+                    return indexes
+        return indexes
+
+    def query(self, filters, page, per_page):
+        """Apply the list filters and return a SnapshotPage of book dicts, in (title, id) order."""
+        with self._lock:
+            mask = self._all_mask
+            if filters.get('category'):
+                wanted = 0
+                for cid, name in self._categories.items():
+                    if name == filters['category']:
+                        wanted |= self._category_masks.get(cid, 0)
+                mask &= wanted
+            if filters.get('available') and filters['available'].lower() == 'true':
+                mask &= self._available_mask
+            if filters.get('search'):
+                term = filters['search'].lower()
+                if mask.bit_count() * 4 < len(self._order):
+                    # Other filters left few books: test those rather than scan them all
+                    mask = self._search_candidates(mask, term)
+                else:
+                    mask &= self._search_mask(term)
+
+            total = mask.bit_count()
+            order = self._order
+            if per_page == 0:
+                # Same shape as the SQL path's AllItemsPagination
+                positions = order if mask == self._all_mask else [order[i] for i in self._select(mask, 0, None)]
+                return SnapshotPage([self._to_dict(p) for p in positions], total, 1, total, pages=1)
+            start = (page - 1) * per_page
+            if mask == self._all_mask:
+                positions = order[start:start + per_page]
+            else:
+                positions = [order[i] for i in self._select(mask, start, per_page)]
+            items = [self._to_dict(p) for p in positions]
+        return SnapshotPage(items, total, page, per_page)
+
+
+def get_catalog_snapshot():
+    """Return this worker's CatalogSnapshot, creating it on first use."""
+    snapshot = current_app.extensions.get('catalog_snapshot')
+    if snapshot is None:
+        snapshot = CatalogSnapshot(current_app.config['CATALOG_SNAPSHOT_MAX_AGE_SECONDS'])
+        if current_app.extensions.setdefault('catalog_snapshot', snapshot) is snapshot:
+            # Availability events (from any worker with the postgres broker)
+            # are applied as they arrive instead of waiting out the max age
+            broker = current_app.extensions.get('availability_broker')
+            if broker is not None:
+                broker.subscribe(snapshot)
+        snapshot = current_app.extensions['catalog_snapshot']
+    return snapshot
+
+
+def query_catalog_snapshot(filters, page=1, per_page=50):
+    """
+    Serve a book listing from the snapshot, or return None when the caller
+    should use the SQL path: the snapshot is disabled or could not be
+    refreshed, the request is part of an atomic batch, or the search term contains LIKE wildcards or escapes that
+    only ILIKE interprets (or a NUL, which separates rows in the search text). Page arguments are clamped like paginate() does.
+    """
+    if not current_app.config.get('CATALOG_SNAPSHOT_ENABLED'):
+        return None
+    if g.get('deferred_availability_events') is not None:
+        # Inside an atomic batch: a refresh would read uncommitted rows
+        return None
+    search = filters.get('search') or ''
+    if any(c in search for c in '%_\\\0'):
+        return None
+    snapshot = get_catalog_snapshot()
+    if not snapshot.ensure_fresh():
+        return None
+    return snapshot.query(filters, max(page, 1), per_page if per_page >= 0 else 20)
+
+
+def mark_catalog_stale():
+    """Call after a local write that publishes no availability event (create, delete)."""
+    snapshot = current_app.extensions.get('catalog_snapshot')
+    if snapshot is not None:
+        snapshot.mark_stale()
@@ -0,0 +1,28 @@
+# services/circulation_event_service.py
+from datetime import timedelta
+
+from extensions import db
+from models.circulation_event import CirculationEvent
+from sqlalchemy import func
+
+def get_circulation_events_service(after_id=0, limit=500, settle_seconds=2.0):
+    """
+    Read the circulation log in id order, starting after `after_id`.
+
+    Ids come from a sequence and are handed out before the writer's INSERT
+    commits, so a concurrent writer can commit a lower id after a higher one
+    is visible. Events logged within the last `settle_seconds` are held back
+    so a consumer that resumes from the last id it saw never skips one that
+    was written. The log itself is best effort (see CirculationLogWriter):
+    events the writer could not write are never seen. The cutoff uses the
+    database clock, like logged_at's default, so app server clock skew
+    cannot shorten the hold.
+    Returns (events, next_after_id).
+    """
+    settled = func.now() - timedelta(seconds=settle_seconds)
+    events = db.session.query(CirculationEvent).filter(
+        CirculationEvent.id > after_id,
+        CirculationEvent.logged_at <= settled
+    ).order_by(CirculationEvent.id).limit(limit).all()
+    next_after_id = events[-1].id if events else after_id
+    return events, next_after_id
@@ -0,0 +1,122 @@
+# services/overdue_service.py
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import and_, delete, exists, or_, select
+from sqlalchemy.dialects import postgresql, sqlite
+
+from extensions import db
+from models.borrowing import Borrowing
+from models.overdue_loan import OverdueLoan, OverdueScanState
+from services.borrowing_service import loan_projection_query
+
+def _insert(model):
+    dialect = db.session.get_bind().dialect.name
+    return (postgresql.insert if dialect == 'postgresql' else sqlite.insert)(model.__table__)
+
+def flag_overdue_loans(loan_period_days, batch_size=1000, pause=0.0):
+    """
+    Flag active loans borrowed more than `loan_period_days` ago.
+
+    Only loans borrowed between the previous run's cutoff (the watermark) and
+    this run's cutoff are read: anything older was checked by an earlier run.
+    The scan walks the partial active-loan index (borrowed_at DESC, id) with
+    keyset pagination, one bounded batch per transaction, and flags are
+    inserted idempotently so an interrupted run can simply be repeated.
+    Flags of loans returned since are removed at the end. Changing the loan
+    period discards all flags and rescans from the beginning.
+    Returns {"flagged", "cleared", "watermark"}.
+    """
+    now = datetime.now(timezone.utc)
+    loan_period = timedelta(days=loan_period_days)
+    cutoff = now - loan_period
+
+    state = db.session.get(OverdueScanState, 1)
+    watermark = state.watermark if state and state.loan_period_days == loan_period_days else None
+    if state and watermark is None:
+        db.session.execute(delete(OverdueLoan))
+        db.session.commit()
+
+    flagged = 0
+    last = None
+    while True:
+        batch = select(
+            Borrowing.id, Borrowing.borrower_hotel, Borrowing.borrower_room_number, Borrowing.borrowed_at
+        ).where(Borrowing.is_returned == False, Borrowing.borrowed_at < cutoff)
+        if watermark is not None:
+            batch = batch.where(Borrowing.borrowed_at >= watermark)
+        if last is not None:
+            batch = batch.where(or_(
+                Borrowing.borrowed_at < last.borrowed_at,
+                and_(Borrowing.borrowed_at == last.borrowed_at, Borrowing.id > last.id)
+            ))
+        rows = db.session.execute(
+            batch.order_by(Borrowing.borrowed_at.desc(), Borrowing.id).limit(batch_size)
+        ).all()
+        if not rows:
+            break
+
+        statement = _insert(OverdueLoan).values([{
+            "borrowing_id": row.id,
+            "borrower_hotel": row.borrower_hotel,
+            "borrower_room_number": row.borrower_room_number,
+            "due_at": row.borrowed_at + loan_period,
+            "flagged_at": now,
+        } for row in rows]).on_conflict_do_nothing(index_elements=['borrowing_id'])
+        try:
+            flagged += db.session.execute(statement).rowcount
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+        last = rows[-1]
+        if len(rows) < batch_size:
+            break
+        if pause:
+            time.sleep(pause)
+
+    # Flags are few, so this probes borrowings by primary key
+    cleared = db.session.execute(delete(OverdueLoan).where(exists().where(
+        Borrowing.id == OverdueLoan.borrowing_id, Borrowing.is_returned == True
+    ))).rowcount
+
+    statement = _insert(OverdueScanState).values(
+        id=1, watermark=cutoff, loan_period_days=loan_period_days, last_run_at=now
+    )
+    db.session.execute(statement.on_conflict_do_update(index_elements=['id'], set_={
+        "watermark": statement.excluded.watermark,
+        "loan_period_days": statement.excluded.loan_period_days,
+        "last_run_at": statement.excluded.last_run_at,
+    }))
+    db.session.commit()
+    return {"flagged": flagged, "cleared": cleared, "watermark": cutoff}
+
+def get_overdue_loans_service(hotel=None, room_number=None):
+    """
+    Service to read the overdue loans found by the last job run, with a
+    count per hotel and room. Starts from the small overdue_loans table and
+    joins borrowings by primary key to leave out loans returned since.
+    Returns (state, loans, summary); state is None if the job has never run.
+    """
+    state = db.session.get(OverdueScanState, 1)
+    query = loan_projection_query().add_columns(OverdueLoan.due_at.label('due_at')) \
+        .join(OverdueLoan, OverdueLoan.borrowing_id == Borrowing.id) \
+        .filter(Borrowing.is_returned == False)
+    if hotel:
+        query = query.filter(OverdueLoan.borrower_hotel == hotel)
+    if room_number:
+        query = query.filter(OverdueLoan.borrower_room_number == room_number)
+    loans = query.order_by(OverdueLoan.borrower_hotel, OverdueLoan.borrower_room_number, OverdueLoan.due_at).all()
+
+    per_room = defaultdict(list)
+    for loan in loans:
+        per_room[(loan.borrower_hotel, loan.borrower_room_number)].append(loan)
+    summary = [{
+        "borrower_hotel": hotel_name,
+        "borrower_room_number": room,
+        "overdue_count": len(room_loans),
+        "earliest_due_at": room_loans[0].due_at.isoformat(),
+    } for (hotel_name, room), room_loans in per_room.items()]
+    return state, loans, summary
@@ -0,0 +1,254 @@
+# services/stats_service.py
+from collections import Counter
+from datetime import datetime, timedelta
+
+from sqlalchemy import case, cast, Date, func, literal, select, union_all
+from sqlalchemy.dialects import postgresql, sqlite
+
+from flask import current_app, g
+
+from extensions import db
+from models.book import Book
+from models.borrowing import Borrowing
+from models.borrowing_archive import BorrowingArchive
+from models.category import Category
+from models.circulation_stats import (
+    BookCirculationStats, CategoryCirculationStats, HotelCirculationStats, DailyCirculationStats
+)
+
+def _increment(model, keys, **increments):
+    """Upsert a summary row, adding `increments` to its counters."""
+    dialect = db.session.get_bind().dialect.name
+    insert = postgresql.insert if dialect == 'postgresql' else sqlite.insert
+    table = model.__table__
+
+    statement = insert(table).values(**keys, **increments)
+    statement = statement.on_conflict_do_update(
+        index_elements=list(keys),
+        set_={name: table.c[name] + statement.excluded[name] for name in increments}
+    )
+    db.session.execute(statement)
+
+def _shard(book_ids):
+    """
+    Counter shard for a transaction over these books, so concurrent
+    transactions over different books rarely update the same hotel, day or
+    category row; a figure is the sum over its shards.
+    """
+    return min(book_ids) % current_app.config['STATS_COUNTER_SHARDS']
+
+def _count_loans(loans, hotel, borrowed):
+    """
+    Upsert the counters for `loans`, (book_id, category_id) pairs that were
+    borrowed or (with borrowed=False) returned, without committing. Rows are
+    touched in a fixed order (books by id, categories by id, hotel, day) so
+    concurrent transactions cannot deadlock on them.
+    """
+    per_book = Counter(book_id for book_id, _ in loans)
+    per_category = Counter(category_id for _, category_id in loans if category_id is not None)
+    shard = _shard(per_book)
+    sign = 1 if borrowed else -1
+    counted = 'borrow_count' if borrowed else 'return_count'
+    for book_id in sorted(per_book):
+        _increment(BookCirculationStats, {'book_id': book_id}, **{counted: per_book[book_id]})
+    for category_id in sorted(per_category):
+        _increment(CategoryCirculationStats, {'category_id': category_id, 'shard': shard},
+                   on_loan=sign * per_category[category_id])
+    # A shard's active_loans may go negative (borrowed in another shard); the sum is exact
+    hotel_counts = {'active_loans': sign * len(loans)}
+    if borrowed:
+        hotel_counts['borrow_count'] = len(loans)
+    _increment(HotelCirculationStats, {'borrower_hotel': hotel, 'shard': shard}, **hotel_counts)
+    _increment(DailyCirculationStats, {'day': datetime.utcnow().date(), 'shard': shard},
+               **{counted: len(loans)})
+
+def _commit_loans(loans, hotel, borrowed):
+    """Count `loans` in a short transaction of its own, or defer them to the end of an atomic batch."""
+    deferred = g.get('deferred_stats_updates')
+    if deferred is not None:
+        deferred.append((loans, hotel, borrowed))
+        return
+    try:
+        _count_loans(loans, hotel, borrowed)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        current_app.logger.error(
+            f"Could not count {len(loans)} loans in the stats tables; run `flask rebuild-stats` to repair",
+            exc_info=True
+        )
+
+def record_borrows(loans, hotel):
+    """
+    Count new loans, given as (book_id, category_id) pairs, in the summary
+    tables. Call after the borrowing transaction has committed: the counters
+    are updated in a transaction of their own, so the book rows are no
+    longer locked while it waits on a busy counter row. Inside an atomic
+    batch the update runs once the batch commits (see routes/batch.py). A
+    failed update is logged and leaves the counters short until
+    `flask rebuild-stats`.
+    """
+    _commit_loans(loans, hotel, borrowed=True)
+
+def record_returns(loans, hotel):
+    """Count returned loans in the summary tables. See record_borrows()."""
+    _commit_loans(loans, hotel, borrowed=False)
+
+def apply_deferred_stats(updates):
+    """Count the loans deferred by an atomic batch, after it committed."""
+    for loans, hotel, borrowed in updates:
+        _commit_loans(loans, hotel, borrowed)
+
+def record_catalog_changes(changes):
+    """
+    Move the per-category copy counters for catalog edits, given as
+    (book_id, category_id, total_delta, on_loan_delta) tuples. Call inside
+    the edit's transaction, before it commits; catalog edits are rare, so
+    they keep the counters exact instead of deferring them.
+    """
+    per_row = Counter()
+    on_loan = Counter()
+    for book_id, category_id, total_delta, on_loan_delta in changes:
+        if category_id is None:
+            continue
+        row = (category_id, book_id % current_app.config['STATS_COUNTER_SHARDS'])
+        per_row[row] += total_delta
+        on_loan[row] += on_loan_delta
+    for category_id, shard in sorted(per_row.keys() | on_loan.keys()):
+        if per_row[(category_id, shard)] or on_loan[(category_id, shard)]:
+            _increment(CategoryCirculationStats, {'category_id': category_id, 'shard': shard},
+                       total_quantity=per_row[(category_id, shard)], on_loan=on_loan[(category_id, shard)])
+
+def get_stats_service(top=10, days=30):
+    """
+    Service to read the circulation dashboard. Every query reads a summary
+    table or the category list, never the books or the borrowing history.
+    """
+    most_borrowed = db.session.query(
+        BookCirculationStats.book_id, Book.title, BookCirculationStats.borrow_count
+    ).join(Book, Book.id == BookCirculationStats.book_id).order_by(
+        BookCirculationStats.borrow_count.desc(), BookCirculationStats.book_id
+    ).limit(top).all()
+
+    active_loans = func.sum(HotelCirculationStats.active_loans)
+    hotels = db.session.query(
+        HotelCirculationStats.borrower_hotel,
+        active_loans.label('active_loans'),
+        func.sum(HotelCirculationStats.borrow_count).label('borrow_count')
+    ).group_by(HotelCirculationStats.borrower_hotel).having(
+        active_loans > 0
+    ).order_by(HotelCirculationStats.borrower_hotel).all()
+
+    copies = db.session.query(
+        CategoryCirculationStats.category_id,
+        func.sum(CategoryCirculationStats.total_quantity).label('total_quantity'),
+        func.sum(CategoryCirculationStats.on_loan).label('on_loan')
+    ).group_by(CategoryCirculationStats.category_id).subquery()
+    categories = db.session.query(
+        Category.id,
+        Category.name,
+        func.coalesce(copies.c.total_quantity, 0),
+        func.coalesce(copies.c.on_loan, 0)
+    ).outerjoin(copies, copies.c.category_id == Category.id).order_by(Category.name).all()
+
+    since = datetime.utcnow().date() - timedelta(days=days - 1)
+    daily = db.session.query(
+        DailyCirculationStats.day,
+        func.sum(DailyCirculationStats.borrow_count).label('borrow_count'),
+        func.sum(DailyCirculationStats.return_count).label('return_count')
+    ).filter(
+        DailyCirculationStats.day >= since
+    ).group_by(DailyCirculationStats.day).order_by(DailyCirculationStats.day).all()
+
+    return {
+        "most_borrowed": [
+            {"book_id": book_id, "title": title, "borrow_count": count}
+            for book_id, title, count in most_borrowed
+        ],
+        "active_loans_per_hotel": [
+            {"hotel": h.borrower_hotel, "active_loans": h.active_loans, "borrow_count": h.borrow_count}
+            for h in hotels
+        ],
+        "category_utilization": [
+            {
+                "category_id": category_id,
+                "category_name": name,
+                "total_quantity": total,
+                "on_loan": on_loan,
+                "utilization": round(on_loan / total, 4) if total else 0.0
+            }
+            for category_id, name, total, on_loan in categories
+        ],
+        "daily": [
+            {"day": d.day.isoformat(), "borrow_count": d.borrow_count, "return_count": d.return_count}
+            for d in daily
+        ]
+    }
+
+def rebuild_stats_service():
+    """
+    Recompute every summary table from the full borrowing history (hot and
+    archived) and the book catalog, into shard 0. This is a full scan: use it once to backfill, or
+    to repair drift.
+    """
+    history = union_all(
+        select(Borrowing.book_id, Borrowing.borrower_hotel, Borrowing.borrowed_at,
+               Borrowing.returned_at, Borrowing.is_returned),
+        select(BorrowingArchive.book_id, BorrowingArchive.borrower_hotel, BorrowingArchive.borrowed_at,
+               BorrowingArchive.returned_at, BorrowingArchive.is_returned)
+    ).subquery('history')
+
+    def utc_day(column):
+        return cast(func.timezone('UTC', column), Date)
+
+    try:
+        db.session.query(BookCirculationStats).delete()
+        db.session.query(HotelCirculationStats).delete()
+        db.session.query(DailyCirculationStats).delete()
+        db.session.query(CategoryCirculationStats).delete()
+
+        db.session.execute(BookCirculationStats.__table__.insert().from_select(
+            ['book_id', 'borrow_count', 'return_count'],
+            select(
+                history.c.book_id,
+                func.count(),
+                func.count(case((history.c.is_returned, literal(1))))
+            ).group_by(history.c.book_id)
+        ))
+        db.session.execute(HotelCirculationStats.__table__.insert().from_select(
+            ['borrower_hotel', 'shard', 'active_loans', 'borrow_count'],
+            select(
+                history.c.borrower_hotel,
+                literal(0),
+                func.count(case((history.c.is_returned == False, literal(1)))),
+                func.count()
+            ).group_by(history.c.borrower_hotel)
+        ))
+
+        db.session.execute(CategoryCirculationStats.__table__.insert().from_select(
+            ['category_id', 'shard', 'total_quantity', 'on_loan'],
+            select(
+                Book.category_id,
+                literal(0),
+                func.sum(Book.total_quantity),
+                func.sum(Book.total_quantity - Book.available_quantity)
+            ).where(Book.category_id.isnot(None)).group_by(Book.category_id)
+        ))
+
+        events = union_all(
+            select(utc_day(history.c.borrowed_at).label('day'),
+                   literal(1).label('borrowed'), literal(0).label('returned')),
+            select(utc_day(history.c.returned_at).label('day'),
+                   literal(0).label('borrowed'), literal(1).label('returned'))
+            .where(history.c.returned_at.isnot(None))
+        ).subquery('events')
+        db.session.execute(DailyCirculationStats.__table__.insert().from_select(
+            ['day', 'shard', 'borrow_count', 'return_count'],
+            select(events.c.day, literal(0), func.sum(events.c.borrowed), func.sum(events.c.returned))
+            .group_by(events.c.day)
+        ))
+
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
@@ -0,0 +1,259 @@
+# services/suggest_service.py
+import bisect
+import heapq
+import itertools
+import re
+import threading
+import time
+import unicodedata
+
+from flask import current_app
+
+from extensions import db
+from models.book import Book
+
+_WORD_RE = re.compile(r'\w+')
+_CJK_RE = re.compile(r'[\u3400-\u9fff\uf900-\ufaff]')
+_ISBN_HYPHEN_RE = re.compile(r'(?<=\d)-(?=\d)')
+
+# Bounds the work done for very broad prefixes (e.g. a single letter)
+_MAX_MERGED_TOKENS = 256
+_MAX_SCANNED_ENTRIES = 5000
+
+
+def normalize(text):
+    """Casefold and strip accents so 'Café' matches 'cafe'."""
+    text = unicodedata.normalize('NFKD', text or '')
+    return ''.join(c for c in text if not unicodedata.combining(c)).casefold()
+
+
+def tokenize(text):
+    """
+    Split normalized text into index tokens. Runs of CJK characters have no
+    spaces between words, so every suffix of such a run is indexed as well.
+    """
+    tokens = set()
+    for word in _WORD_RE.findall(normalize(text)):
+        tokens.add(word)
+        if _CJK_RE.search(word):
+            tokens.update(word[i:] for i in range(1, len(word)))
+    return tokens
+
+
+class PrefixIndex:
+    """
+    Per-worker typeahead index over book titles, authors and ISBNs.
+
+    Every book has one sort key, (normalized title, id). Titles are kept in
+    a sorted list of keys, and each token maps to a sorted list of the keys
+    of books containing it; the tokens themselves are kept sorted too. All
+    tokens (or titles) starting with a prefix therefore form one contiguous
+    slice found with bisect, and the first matches in title order can be read
+    off without looking at the rest.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._titles = []
+        self._tokens = []
+        self._postings = {}
+        self._docs = {}
+
+    def __len__(self):
+        return len(self._docs)
+
+    def ids(self):
+        with self._lock:
+            return set(self._docs)
+
+    @staticmethod
+    def _doc_tokens(title, author, isbn):
+        return frozenset(tokenize(title) | tokenize(author) | {normalize(isbn).replace('-', '')})
+
+    def build(self, rows):
+        """Replace the whole index from (id, title, author, isbn) rows."""
+        docs, postings, titles = {}, {}, []
+        for book_id, title, author, isbn in rows:
+            tokens = self._doc_tokens(title, author, isbn)
+            key = (normalize(title), book_id)
+            docs[book_id] = (title, author, isbn, key, tokens)
+            titles.append(key)
+            for token in tokens:
+                postings.setdefault(token, []).append(key)
+        for keys in postings.values():
+            keys.sort()
+        titles.sort()
+        with self._lock:
+            self._docs, self._postings, self._titles = docs, postings, titles
+            self._tokens = sorted(postings)
+
+    def add(self, book_id, title, author, isbn):
+        """Insert or replace one book."""
+        tokens = self._doc_tokens(title, author, isbn)
+        key = (normalize(title), book_id)
+        with self._lock:
+            self.remove(book_id)
+            self._docs[book_id] = (title, author, isbn, key, tokens)
+            bisect.insort(self._titles, key)
+            for token in tokens:
+                keys = self._postings.get(token)
+                if keys is None:
+                    self._postings[token] = keys = []
+                    bisect.insort(self._tokens, token)
+                bisect.insort(keys, key)
+
+    def remove(self, book_id):
+        with self._lock:
+            doc = self._docs.pop(book_id, None)
+            if doc is None:
+                return
+            key = doc[3]
+            del self._titles[bisect.bisect_left(self._titles, key)]
+            for token in doc[4]:
+                keys = self._postings[token]
+                del keys[bisect.bisect_left(keys, key)]
+                if not keys:
+                    del self._postings[token]
+                    del self._tokens[bisect.bisect_left(self._tokens, token)]
+
+    def search(self, query, limit=10):
+        """
+        Return up to `limit` (id, title, author, isbn) tuples matching every
+        query term as a token prefix. Titles starting with the whole query
+        come first; the rest follow in title order.
+        """
+        # '978-0-44' should match the hyphen-free ISBN token
+        normalized = _ISBN_HYPHEN_RE.sub('', normalize(query).strip())
+        terms = _WORD_RE.findall(normalized)
+        if not terms:
+            return []
+        # Walk the most selective (longest) term; check the others per book
+        terms.sort(key=len, reverse=True)
+        first, rest = terms[0], terms[1:]
+
+        def matches_rest(tokens):
+            return all(any(token.startswith(term) for token in tokens) for term in rest)
+
+        results, seen = [], set()
+        with self._lock:
+            i = bisect.bisect_left(self._titles, (normalized,))
+            while i < len(self._titles) and len(results) < limit:
+                key = self._titles[i]
+                if not key[0].startswith(normalized):
+                    break
+                doc = self._docs[key[1]]
+                if matches_rest(doc[4]):
+                    results.append(doc)
+                    seen.add(key[1])
+                i += 1
+
+            if len(results) < limit:
+                start = bisect.bisect_left(self._tokens, first)
+                postings = []
+                for token in self._tokens[start:start + _MAX_MERGED_TOKENS]:
+                    if not token.startswith(first):
+                        break
+                    postings.append(self._postings[token])
+
+                merged = heapq.merge(*postings)
+                for _title, book_id in itertools.islice(merged, _MAX_SCANNED_ENTRIES):
+                    if book_id in seen:
+                        continue
+                    seen.add(book_id)
+                    doc = self._docs[book_id]
+                    if matches_rest(doc[4]):
+                        results.append(doc)
+                        if len(results) == limit:
+                            break
+
+        return [(doc[3][1], doc[0], doc[1], doc[2]) for doc in results]
+
+
+class SuggestIndex:
+    """
+    PrefixIndex kept in sync with the books table.
+
+    Built on first use. Writes made through this worker are applied
+    immediately; changes made by other workers are picked up from
+    updated_at deltas at most every SUGGEST_REFRESH_SECONDS. Deletions leave
+    no row behind, so each refresh also compares the index's ids with the
+    table's: ids that are gone are removed, and rows the deltas missed (e.g.
+    committed late with an older updated_at) are loaded.
+    """
+
+    def __init__(self, refresh_seconds):
+        self.index = PrefixIndex()
+        self._refresh_seconds = refresh_seconds
+        self._sync_lock = threading.Lock()
+        self._built = False
+        self._checked_at = 0.0
+        self._watermark = None
+
+    def _rebuild(self):
+        rows = db.session.query(Book.id, Book.title, Book.author, Book.isbn, Book.updated_at).all()
+        self.index.build((r.id, r.title, r.author, r.isbn) for r in rows)
+        self._watermark = max((r.updated_at for r in rows), default=None)
+        self._built = True
+
+    def _apply_deltas(self):
+        query = db.session.query(Book.id, Book.title, Book.author, Book.isbn, Book.updated_at)
+        if self._watermark is not None:
+            # >= so rows sharing the watermark timestamp are not missed; re-adding is harmless
+            query = query.filter(Book.updated_at >= self._watermark)
+        for r in query.all():
+            self.index.add(r.id, r.title, r.author, r.isbn)
+            if self._watermark is None or r.updated_at > self._watermark:
+                self._watermark = r.updated_at
+
+        table_ids = {book_id for (book_id,) in db.session.query(Book.id)}
+        indexed_ids = self.index.ids()
+        for book_id in indexed_ids - table_ids:
+            self.index.remove(book_id)
+        missing = table_ids - indexed_ids
+        if missing:
+            rows = db.session.query(Book.id, Book.title, Book.author, Book.isbn) \
+                .filter(Book.id.in_(missing)).all()
+            for r in rows:
+                self.index.add(r.id, r.title, r.author, r.isbn)
+
+    def ensure_fresh(self):
+        now = time.monotonic()
+        if self._built and now - self._checked_at < self._refresh_seconds:
+            return
+        with self._sync_lock:
+            if not self._built:
+                self._rebuild()
+            elif now - self._checked_at >= self._refresh_seconds:
+                self._apply_deltas()
+            self._checked_at = time.monotonic()
+
+    def add_books(self, books):
+        if self._built:
+            for book in books:
+                self.index.add(book.id, book.title, book.author, book.isbn)
+
+    def remove_book(self, book_id):
+        if self._built:
+            self.index.remove(book_id)
+
+    def invalidate(self):
+        """Drop the index so the next lookup rebuilds it, e.g. after a rolled-back batch."""
+        with self._sync_lock:
+            self._built = False
+
+
+def get_suggest_index():
+    """Return this worker's SuggestIndex, creating it on first use."""
+    suggest_index = current_app.extensions.get('suggest_index')
+    if suggest_index is None:
+        suggest_index = current_app.extensions.setdefault(
+            'suggest_index', SuggestIndex(current_app.config['SUGGEST_REFRESH_SECONDS'])
+        )
+    return suggest_index
+
+
+def suggest_books_service(query, limit=10):
+    """Service to return typeahead suggestions without querying the books table."""
+    suggest_index = get_suggest_index()
+    suggest_index.ensure_fresh()
+    return suggest_index.index.search(query, limit)
@@ -0,0 +1,80 @@
+# tests/conftest.py
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from config import Config
+from extensions import db
+
+API_KEY = 'test-key'
+
+
+@pytest.fixture
+def app(tmp_path):
+    """
+    App on a fresh database per test: a SQLite file under tmp_path, or the
+    database in TEST_DATABASE_URL (all tables are dropped and recreated).
+    A file rather than :memory: so transactions behave as on a server.
+    """
+    class TestConfig(Config):
+        SQLALCHEMY_DATABASE_URI = os.environ.get('TEST_DATABASE_URL', f"sqlite:///{tmp_path / 'test.db'}")
+        TESTING = True
+        API_KEY = API_KEY
+        LOG_LEVEL = 'WARNING'
+        LOG_FILE = None
+        LOG_TO_STDOUT = False
+        RATELIMIT_ENABLED = False
+        # Write the circulation log inline instead of from a background thread
+        CIRCULATION_LOG_FLUSH_SECONDS = 0
+
+    app = create_app(TestConfig)
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+    yield app
+    with app.app_context():
+        db.session.remove()
+        db.drop_all()
+        db.engine.dispose()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def headers():
+    return {'Api-Key': API_KEY}
+
+
+def postgres_only(app):
+    if app.config['SQLALCHEMY_DATABASE_URI'].split(':', 1)[0] not in ('postgresql', 'postgres'):
+        pytest.skip("Needs PostgreSQL; set TEST_DATABASE_URL")
+
+
+def create_category(client, headers, name='Fiction'):
+    response = client.post('/api/categories', json={"name": name}, headers=headers)
+    assert response.status_code == 201, response.get_json()
+    return response.get_json()['id']
+
+
+def create_books(client, headers, category_id, *books):
+    """Create books given as (isbn, title, total_quantity) and return their ids."""
+    response = client.post('/api/books', json={"books": [{
+        "title": title, "author": "Author", "isbn": isbn,
+        "total_quantity": total_quantity, "category_id": category_id,
+    } for isbn, title, total_quantity in books]}, headers=headers)
+    assert response.status_code == 201, response.get_json()
+    return [book['id'] for book in response.get_json()]
+
+
+def borrow(client, headers, book_id, room='101', hotel='Grand Hotel'):
+    return client.post('/api/borrowings/borrow', json={
+        "book_id": book_id, "borrower_name": "Guest",
+        "borrower_room_number": room, "borrower_hotel": hotel,
+    }, headers=headers)
@@ -0,0 +1,77 @@
+# tests/test_availability_events.py
+from conftest import borrow, create_books, create_category
+from utils.availability_events import InProcessBroker, Subscription
+
+
+def _event(book_id, category_id=1, available=1):
+    return {"book_id": book_id, "category_id": category_id, "available_quantity": available, "total_quantity": 2}
+
+
+def test_resuming_client_gets_the_events_it_missed():
+    broker = InProcessBroker(history_size=10)
+    for book_id in range(1, 6):
+        broker.publish(_event(book_id))
+    ids = [event["id"] for event in broker._history]
+    assert ids == sorted(set(ids))
+
+    subscription = Subscription()
+    broker.subscribe(subscription, last_event_id=ids[2])
+
+    events, resync = subscription.get(timeout=0)
+    assert [event["book_id"] for event in events] == [4, 5]
+    assert resync is None
+
+
+def test_resuming_from_before_the_history_asks_for_a_resync():
+    broker = InProcessBroker(history_size=3)
+    first = Subscription()
+    broker.subscribe(first)
+    for book_id in range(1, 6):
+        broker.publish(_event(book_id))
+    oldest_id = first.get(timeout=0)[0][0]["id"]
+
+    subscription = Subscription()
+    broker.subscribe(subscription, last_event_id=oldest_id)
+
+    events, resync = subscription.get(timeout=0)
+    assert [event["book_id"] for event in events] == [3, 4, 5]
+    assert resync == {"reason": "history_unavailable"}
+
+
+def test_slow_client_drops_the_oldest_events_and_is_told():
+    broker = InProcessBroker()
+    subscription = Subscription(buffer_size=2)
+    broker.subscribe(subscription)
+    for book_id in range(1, 4):
+        broker.publish(_event(book_id))
+
+    events, resync = subscription.get(timeout=0)
+    assert [event["book_id"] for event in events] == [2, 3]
+    assert resync == {"dropped": 1}
+
+
+def test_subscriptions_filter_by_book_or_category():
+    broker = InProcessBroker()
+    subscription = Subscription(book_ids=[1], category_ids=[7])
+    broker.subscribe(subscription)
+    broker.publish_many([_event(1, category_id=2), _event(2, category_id=7), _event(3, category_id=2)])
+
+    assert [event["book_id"] for event in subscription.get(timeout=0)[0]] == [1, 2]
+
+
+def test_events_are_published_after_commit_and_not_for_rolled_back_batches(app, client, headers):
+    book_id, = create_books(client, headers, create_category(client, headers), ('9780000000001', 'Dune', 2))
+    subscription = Subscription()
+    app.extensions['availability_broker'].subscribe(subscription)
+
+    borrow(client, headers, book_id)
+    events, _ = subscription.get(timeout=0)
+    assert [(event["book_id"], event["available_quantity"]) for event in events] == [(book_id, 1)]
+
+    operation = {"method": "POST", "path": "/api/borrowings/borrow", "body": {
+        "book_id": book_id, "borrower_name": "Guest", "borrower_room_number": "102", "borrower_hotel": "Grand Hotel",
+    }}
+    client.post('/api/batch', json={"atomic": True, "operations": [
+        operation, dict(operation, body=dict(operation["body"], book_id=999999)),
+    ]}, headers=headers)
+    assert subscription.get(timeout=0) == ([], None)
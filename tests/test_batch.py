@@ -0,0 +1,59 @@
+# tests/test_batch.py
+from conftest import borrow, create_books, create_category
+
+
+def _borrow_operation(book_id, room='101'):
+    return {"method": "POST", "path": "/api/borrowings/borrow", "body": {
+        "book_id": book_id, "borrower_name": "Guest",
+        "borrower_room_number": room, "borrower_hotel": "Grand Hotel",
+    }}
+
+
+def test_atomic_batch_rolls_back_every_operation_on_failure(client, headers):
+    category_id = create_category(client, headers)
+    book_id, = create_books(client, headers, category_id, ('9780000000001', 'Dune', 2))
+
+    response = client.post('/api/batch', json={"atomic": True, "operations": [
+        _borrow_operation(book_id),
+        {"method": "PATCH", "path": f"/api/books/{book_id}", "body": {"title": "Dune (2nd ed.)"}},
+        _borrow_operation(999999),
+        _borrow_operation(book_id, room='102'),
+    ]}, headers=headers)
+
+    body = response.get_json()
+    assert response.status_code == 200
+    assert body["committed"] is False
+    assert [result["status"] for result in body["results"]] == [201, 200, 404, None]
+    assert body["results"][3]["skipped"] is True
+
+    book = client.get(f'/api/books/{book_id}', headers=headers).get_json()["book"]
+    assert book["title"] == 'Dune'
+    assert book["available_quantity"] == 2
+    assert client.get('/api/borrowings', headers=headers).get_json()["pagination"]["total"] == 0
+
+
+def test_atomic_batch_commits_when_every_operation_succeeds(client, headers):
+    category_id = create_category(client, headers)
+    book_id, = create_books(client, headers, category_id, ('9780000000001', 'Dune', 2))
+
+    response = client.post('/api/batch', json={"atomic": True, "operations": [
+        _borrow_operation(book_id), _borrow_operation(book_id, room='102'),
+    ]}, headers=headers)
+
+    assert response.get_json()["committed"] is True
+    book = client.get(f'/api/books/{book_id}', headers=headers).get_json()["book"]
+    assert book["available_quantity"] == 0
+
+
+def test_non_atomic_batch_keeps_operations_before_a_failure(client, headers):
+    category_id = create_category(client, headers)
+    book_id, = create_books(client, headers, category_id, ('9780000000001', 'Dune', 1))
+
+    response = client.post('/api/batch', json={"operations": [
+        _borrow_operation(book_id), _borrow_operation(book_id, room='102'),
+    ]}, headers=headers)
+
+    body = response.get_json()
+    assert body["committed"] is None
+    assert [result["status"] for result in body["results"]] == [201, 409]
+    assert borrow(client, headers, book_id).status_code == 409
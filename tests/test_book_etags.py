@@ -0,0 +1,63 @@
+# tests/test_book_etags.py
+from conftest import borrow, create_books, create_category
+
+
+def _fetch(client, headers, book_id):
+    response = client.get(f'/api/books/{book_id}', headers=headers)
+    return response.headers['ETag'], response.get_json()["book"]
+
+
+def test_update_with_current_etag_succeeds_and_returns_the_new_one(client, headers):
+    book_id, = create_books(client, headers, create_category(client, headers), ('9780000000001', 'Dune', 1))
+    etag, _ = _fetch(client, headers, book_id)
+
+    response = client.patch(f'/api/books/{book_id}', json={"title": "Dune Messiah"},
+                            headers=dict(headers, **{'If-Match': etag}))
+
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+    assert response.headers['ETag'] == _fetch(client, headers, book_id)[0]
+
+
+def test_update_with_stale_etag_returns_412(client, headers):
+    book_id, = create_books(client, headers, create_category(client, headers), ('9780000000001', 'Dune', 2))
+    etag, _ = _fetch(client, headers, book_id)
+    # A borrow bumps the version like any other write
+    assert borrow(client, headers, book_id).status_code == 201
+
+    response = client.patch(f'/api/books/{book_id}', json={"title": "Dune Messiah"},
+                            headers=dict(headers, **{'If-Match': etag}))
+
+    assert response.status_code == 412
+    assert _fetch(client, headers, book_id)[1]["title"] == 'Dune'
+
+
+def test_weak_etag_never_matches(client, headers):
+    book_id, = create_books(client, headers, create_category(client, headers), ('9780000000001', 'Dune', 1))
+    etag, _ = _fetch(client, headers, book_id)
+
+    response = client.patch(f'/api/books/{book_id}', json={"title": "Dune Messiah"},
+                            headers=dict(headers, **{'If-Match': f'W/{etag}'}))
+
+    assert response.status_code == 412
+
+
+def test_wildcard_and_etag_lists_match(client, headers):
+    book_id, = create_books(client, headers, create_category(client, headers), ('9780000000001', 'Dune', 1))
+    etag, _ = _fetch(client, headers, book_id)
+
+    listed = client.patch(f'/api/books/{book_id}', json={"title": "Dune Messiah"},
+                          headers=dict(headers, **{'If-Match': f'"stale", {etag}'}))
+    wildcard = client.patch(f'/api/books/{book_id}', json={"title": "Children of Dune"},
+                            headers=dict(headers, **{'If-Match': '*'}))
+
+    assert (listed.status_code, wildcard.status_code) == (200, 200)
+
+
+def test_if_match_can_be_required(app, client, headers):
+    app.config['REQUIRE_IF_MATCH'] = True
+    book_id, = create_books(client, headers, create_category(client, headers), ('9780000000001', 'Dune', 1))
+
+    response = client.patch(f'/api/books/{book_id}', json={"title": "Dune Messiah"}, headers=headers)
+
+    assert response.status_code == 428
@@ -0,0 +1,59 @@
+# tests/test_bulk_quantities.py
+from conftest import borrow, create_books, create_category, postgres_only
+
+
+def test_unknown_isbns_are_rejected_per_item(client, headers):
+    create_books(client, headers, create_category(client, headers), ('9780000000001', 'Dune', 2))
+
+    # Unknown ISBNs are rejected before the UPDATE (unknown ids: see the Postgres test)
+    response = client.patch('/api/books/quantities', json={"items": [
+        {"isbn": "9789999999999", "total_quantity": 1},
+        {"isbn": "9789999999998", "total_quantity": 1},
+    ]}, headers=headers)
+
+    assert response.status_code == 200
+    assert response.get_json() == {"updated": [], "rejected": [
+        {"index": 0, "isbn": "9789999999999", "error": "Book not found"},
+        {"index": 1, "isbn": "9789999999998", "error": "Book not found"},
+    ]}
+
+
+def test_invalid_items_are_reported_by_index(client, headers):
+    response = client.patch('/api/books/quantities', json={"items": [
+        {"id": 1, "total_quantity": 1},
+        {"id": 2, "isbn": "9780000000001", "total_quantity": 1},
+        {"total_quantity": 1},
+        {"id": 3, "total_quantity": -1},
+    ]}, headers=headers)
+
+    body = response.get_json()
+    assert response.status_code == 400
+    assert body["invalid_item_count"] == 3
+    assert sorted(body["items"]) == ['1', '2', '3']
+
+
+def test_rows_the_update_cannot_apply_are_rejected(app, client, headers):
+    postgres_only(app)
+    first, second = create_books(client, headers, create_category(client, headers),
+                                 ('9780000000001', 'Dune', 3), ('9780000000002', 'Emma', 1))
+    assert borrow(client, headers, first).status_code == 201
+    assert borrow(client, headers, first, room='102').status_code == 201
+
+    response = client.patch('/api/books/quantities', json={"items": [
+        {"id": first, "total_quantity": 1},
+        {"isbn": "9780000000002", "total_quantity": 5},
+        {"isbn": "9780000000001", "total_quantity": 4},
+        {"id": 999999, "total_quantity": 1},
+    ]}, headers=headers)
+
+    body = response.get_json()
+    assert [row["id"] for row in body["updated"]] == [second]
+    assert body["updated"][0]["available_quantity"] == 5
+    assert body["rejected"] == [
+        {"index": 0, "id": first,
+         "error": "Cannot reduce total quantity to 1. There are currently 2 books on loan."},
+        {"index": 2, "isbn": "9780000000001", "error": "Duplicate entry in request"},
+        {"index": 3, "id": 999999, "error": "Book not found"},
+    ]
+    book = client.get(f'/api/books/{first}', headers=headers).get_json()["book"]
+    assert (book["total_quantity"], book["available_quantity"]) == (3, 1)
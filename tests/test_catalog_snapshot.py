@@ -0,0 +1,72 @@
+# tests/test_catalog_snapshot.py
+from datetime import datetime
+
+import pytest
+from sqlalchemy import delete, update
+
+from conftest import create_books, create_category
+from extensions import db
+from models.book import Book
+from models.category import Category
+
+
+@pytest.fixture
+def snapshot_app(app):
+    app.config['CATALOG_SNAPSHOT_ENABLED'] = True
+    # Check against the database on every read
+    app.config['CATALOG_SNAPSHOT_MAX_AGE_SECONDS'] = 0
+    return app
+
+
+def _listed(client, headers, query=''):
+    return [book["title"] for book in client.get(f'/api/books{query}', headers=headers).get_json()["books"]]
+
+
+def _change_elsewhere(app, *statements):
+    """Write as another worker would: straight to the database, without telling the snapshot."""
+    with app.app_context():
+        for statement in statements:
+            db.session.execute(statement)
+        # Old enough that updated_at deltas alone cannot pick the rows up
+        db.session.execute(update(Book).values(updated_at=datetime(2000, 1, 1)))
+        db.session.commit()
+
+
+def test_snapshot_drops_books_deleted_by_another_worker(snapshot_app, client, headers):
+    category_id = create_category(client, headers)
+    first, _, _ = create_books(client, headers, category_id, ('9780000000001', 'Dune', 1),
+                               ('9780000000002', 'Emma', 1), ('9780000000003', 'Ulysses', 1))
+    _change_elsewhere(snapshot_app)
+    assert _listed(client, headers) == ['Dune', 'Emma', 'Ulysses']
+
+    _change_elsewhere(snapshot_app, delete(Book).where(Book.id == first))
+
+    assert _listed(client, headers) == ['Emma', 'Ulysses']
+    assert _listed(client, headers, '?search=dune') == []
+    assert len(snapshot_app.extensions['catalog_snapshot']) == 2
+
+
+def test_snapshot_follows_category_deleted_by_another_worker(snapshot_app, client, headers):
+    fiction = create_category(client, headers, 'Fiction')
+    create_books(client, headers, fiction, ('9780000000001', 'Dune', 1))
+    _change_elsewhere(snapshot_app)
+    assert _listed(client, headers, '?category=Fiction') == ['Dune']
+
+    # As ON DELETE SET NULL would: category_id changes, updated_at does not
+    _change_elsewhere(snapshot_app,
+                      update(Book).where(Book.category_id == fiction).values(category_id=None),
+                      delete(Category).where(Category.id == fiction))
+
+    assert _listed(client, headers, '?category=Fiction') == []
+    assert client.get('/api/books', headers=headers).get_json()["books"][0]["category_id"] is None
+
+
+def test_snapshot_sees_local_deletes(snapshot_app, client, headers):
+    snapshot_app.config['CATALOG_SNAPSHOT_MAX_AGE_SECONDS'] = 3600
+    category_id = create_category(client, headers)
+    first, _ = create_books(client, headers, category_id, ('9780000000001', 'Dune', 1), ('9780000000002', 'Emma', 1))
+    assert _listed(client, headers) == ['Dune', 'Emma']
+
+    assert client.delete(f'/api/books/{first}', headers=headers).status_code == 204
+
+    assert _listed(client, headers) == ['Emma']
@@ -0,0 +1,134 @@
+# tests/test_circulation_log.py
+from datetime import datetime, timezone
+from unittest import mock
+
+from sqlalchemy import func, select
+from sqlalchemy.exc import OperationalError
+
+from conftest import borrow, create_books, create_category, postgres_only
+from extensions import db
+from models.circulation_event import CirculationEvent
+from utils import circulation_log
+from utils.circulation_log import CirculationLogWriter
+
+
+def _events(client, headers, after_id=0):
+    response = client.get(f'/api/circulation-events?after_id={after_id}', headers=headers)
+    assert response.status_code == 200
+    return response.get_json()
+
+
+def _rows(book_id, count):
+    return [{
+        "event_type": 'borrow', "book_id": book_id, "borrowing_id": None, "borrower_hotel": None,
+        "total_quantity": count, "available_quantity": count - n - 1,
+        "occurred_at": datetime.now(timezone.utc),
+    } for n in range(count)]
+
+
+def _logged_count():
+    return db.session.scalar(select(func.count()).select_from(CirculationEvent))
+
+
+def _logged(app):
+    with app.app_context():
+        return [(event.event_type, event.available_quantity)
+                for event in db.session.scalars(select(CirculationEvent).order_by(CirculationEvent.id))]
+
+
+def test_borrow_and_return_are_logged_in_order(app, client, headers):
+    book_id, = create_books(client, headers, create_category(client, headers), ('9780000000001', 'Dune', 2))
+    loan_id = borrow(client, headers, book_id).get_json()["id"]
+    assert client.patch(f'/api/borrowings/return/{loan_id}', headers=headers).status_code == 200
+
+    assert _logged(app) == [('quantity_change', 2), ('borrow', 1), ('return', 2)]
+
+
+def test_events_endpoint_pages_settled_events(app, client, headers):
+    # The settle cutoff is computed with the database clock and interval arithmetic
+    postgres_only(app)
+    app.config['CIRCULATION_EVENTS_SETTLE_SECONDS'] = 0
+    book_id, = create_books(client, headers, create_category(client, headers), ('9780000000001', 'Dune', 2))
+    borrow(client, headers, book_id)
+
+    body = _events(client, headers)
+    assert [event["event_type"] for event in body["events"]] == ['quantity_change', 'borrow']
+    assert body["next_after_id"] == body["events"][-1]["id"]
+    assert _events(client, headers, after_id=body["next_after_id"])["events"] == []
+
+
+def test_unsettled_events_are_held_back(app, client, headers):
+    postgres_only(app)
+    app.config['CIRCULATION_EVENTS_SETTLE_SECONDS'] = 3600
+    create_books(client, headers, create_category(client, headers), ('9780000000001', 'Dune', 2))
+
+    assert _events(client, headers)["events"] == []
+
+
+def test_atomic_batch_logs_only_after_commit(app, client, headers):
+    book_id, = create_books(client, headers, create_category(client, headers), ('9780000000001', 'Dune', 1))
+    operation = {"method": "POST", "path": "/api/borrowings/borrow", "body": {
+        "book_id": book_id, "borrower_name": "Guest",
+        "borrower_room_number": '101', "borrower_hotel": "Grand Hotel",
+    }}
+
+    # The second borrow fails, so the first is rolled back and must not be logged
+    response = client.post('/api/batch', json={"atomic": True, "operations": [operation, operation]},
+                           headers=headers)
+    assert response.get_json()["committed"] is False
+    assert _logged(app) == [('quantity_change', 1)]
+
+    response = client.post('/api/batch', json={"atomic": True, "operations": [operation]}, headers=headers)
+    assert response.get_json()["committed"] is True
+    assert _logged(app) == [('quantity_change', 1), ('borrow', 0)]
+
+
+def test_queued_events_are_flushed(app):
+    with app.app_context():
+        writer = CirculationLogWriter(db.engine, app.logger, batch_size=2, flush_seconds=60)
+        with mock.patch.object(writer, '_ensure_thread'):
+            writer.record(_rows(1, 5))
+        assert _logged_count() == 0
+
+        with mock.patch.object(writer, '_write', wraps=writer._write) as write:
+            writer.flush()
+        assert [len(call.args[0]) for call in write.call_args_list] == [2, 2, 1]
+        assert _logged_count() == 5
+
+
+def test_background_thread_writes_a_full_batch_without_waiting(app):
+    with app.app_context():
+        writer = CirculationLogWriter(db.engine, app.logger, batch_size=3, flush_seconds=60)
+        with mock.patch.object(writer, '_write') as write:
+            writer.record(_rows(1, 3))
+            for _ in range(200):
+                if write.called:
+                    break
+                circulation_log.time.sleep(0.01)
+        write.assert_called_once()
+        assert len(write.call_args.args[0]) == 3
+
+
+def test_full_queue_writes_inline(app):
+    with app.app_context():
+        writer = CirculationLogWriter(db.engine, app.logger, queue_size=1, flush_seconds=60)
+        with mock.patch.object(writer, '_ensure_thread'):
+            writer.record(_rows(1, 3))
+        assert _logged_count() == 2
+
+        writer.flush()
+        assert _logged_count() == 3
+
+
+def test_failed_batch_is_retried_then_dropped(app, monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(circulation_log.time, 'sleep', sleeps.append)
+    engine = mock.Mock()
+    engine.begin.side_effect = OperationalError('INSERT', {}, Exception('connection lost'))
+    logger = mock.Mock()
+
+    CirculationLogWriter(engine, logger, flush_seconds=0, retries=3).record(_rows(1, 2))
+
+    assert engine.begin.call_count == 4
+    assert sleeps == [0.5, 1.0, 2.0]
+    assert logger.error.call_args.args[0].startswith("Dropped 2 circulation events after 4 attempts")
@@ -0,0 +1,65 @@
+# tests/test_idempotency.py
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import update
+
+from conftest import create_books, create_category
+from extensions import db
+from models.idempotency_key import IdempotencyKey
+
+
+def _borrow_body(book_id, room='101'):
+    return {"book_id": book_id, "borrower_name": "Guest",
+            "borrower_room_number": room, "borrower_hotel": "Grand Hotel"}
+
+
+def _available(client, headers, book_id):
+    return client.get(f'/api/books/{book_id}', headers=headers).get_json()["book"]["available_quantity"]
+
+
+def test_retry_replays_the_stored_response(client, headers):
+    book_id, = create_books(client, headers, create_category(client, headers), ('9780000000001', 'Dune', 3))
+    keyed = {**headers, 'Idempotency-Key': 'borrow-1'}
+
+    first = client.post('/api/borrowings/borrow', json=_borrow_body(book_id), headers=keyed)
+    retry = client.post('/api/borrowings/borrow', json=_borrow_body(book_id), headers=keyed)
+
+    assert first.status_code == retry.status_code == 201
+    assert retry.headers['Idempotent-Replayed'] == 'true'
+    assert retry.get_json() == first.get_json()
+    assert _available(client, headers, book_id) == 2
+
+    reused = client.post('/api/borrowings/borrow', json=_borrow_body(book_id, room='102'), headers=keyed)
+    assert reused.status_code == 422
+
+
+def test_expired_key_is_claimed_again(app, client, headers):
+    book_id, = create_books(client, headers, create_category(client, headers), ('9780000000001', 'Dune', 3))
+    keyed = {**headers, 'Idempotency-Key': 'borrow-1'}
+    assert client.post('/api/borrowings/borrow', json=_borrow_body(book_id), headers=keyed).status_code == 201
+
+    with app.app_context():
+        db.session.execute(update(IdempotencyKey).values(
+            expires_at=datetime.now(timezone.utc) - timedelta(seconds=1)))
+        db.session.commit()
+
+    response = client.post('/api/borrowings/borrow', json=_borrow_body(book_id), headers=keyed)
+    assert response.status_code == 201
+    assert 'Idempotent-Replayed' not in response.headers
+    assert _available(client, headers, book_id) == 1
+
+
+def test_batch_operations_share_the_callers_keys(client, headers):
+    book_id, = create_books(client, headers, create_category(client, headers), ('9780000000001', 'Dune', 3))
+    keyed = {**headers, 'Idempotency-Key': 'borrow-1'}
+    first = client.post('/api/borrowings/borrow', json=_borrow_body(book_id), headers=keyed)
+
+    response = client.post('/api/batch', json={"operations": [{
+        "method": "POST", "path": "/api/borrowings/borrow", "body": _borrow_body(book_id),
+        "headers": {"Idempotency-Key": 'borrow-1'},
+    }]}, headers=headers)
+
+    result, = response.get_json()["results"]
+    assert result["status"] == 201
+    assert result["body"] == first.get_json()
+    assert _available(client, headers, book_id) == 2
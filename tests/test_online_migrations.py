@@ -0,0 +1,128 @@
+# tests/test_online_migrations.py
+import importlib.util
+import os
+from datetime import datetime
+
+import pytest
+from alembic.migration import MigrationContext
+from alembic.operations import Operations
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+
+import utils.online_migrations as online_migrations
+from extensions import db
+from utils.online_migrations import OnlineMigration, backfill
+
+MIGRATIONS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'migrations', 'versions')
+
+
+class _PgError(Exception):
+    def __init__(self, pgcode):
+        super().__init__(pgcode)
+        self.pgcode = pgcode
+
+
+def _failing(times, pgcode):
+    """A step that fails `times` times with the given SQLSTATE, then returns 'done'."""
+    calls = []
+
+    def step():
+        calls.append(1)
+        if len(calls) <= times:
+            raise DBAPIError('ALTER TABLE books ...', {}, _PgError(pgcode))
+        return 'done'
+    return step, calls
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    slept = []
+    monkeypatch.setattr(online_migrations.time, 'sleep', slept.append)
+    return slept
+
+
+def test_lock_timeouts_are_retried_with_backoff(app, sleeps):
+    step, calls = _failing(2, '55P03')
+    with app.app_context():
+        assert OnlineMigration(retries=3, backoff_seconds=0.5).retry('step', step) == 'done'
+    assert len(calls) == 3
+    assert sleeps == [0.5, 1.0]
+
+
+def test_deadlocks_are_retried(app, sleeps):
+    step, calls = _failing(1, '40P01')
+    with app.app_context():
+        assert OnlineMigration(backoff_seconds=1).retry('step', step) == 'done'
+    assert len(calls) == 2
+
+
+def test_retries_give_up_after_the_limit(app, sleeps):
+    step, calls = _failing(5, '55P03')
+    with app.app_context(), pytest.raises(DBAPIError):
+        OnlineMigration(retries=2).retry('step', step)
+    assert len(calls) == 3
+
+
+def test_other_errors_are_not_retried(app, sleeps):
+    # unique_violation
+    step, calls = _failing(1, '23505')
+    with app.app_context(), pytest.raises(DBAPIError):
+        OnlineMigration().retry('step', step)
+    assert len(calls) == 1
+    assert sleeps == []
+
+
+def _migrate(app, run):
+    with app.app_context():
+        app.extensions['online_migration'] = online = OnlineMigration(batch_size=2, batch_pause=0)
+        try:
+            with db.engine.connect() as conn:
+                with Operations.context(MigrationContext.configure(conn)):
+                    result = run()
+                conn.commit()
+        finally:
+            app.extensions.pop('online_migration')
+    return result, online.steps
+
+
+def test_backfill_updates_in_batches_and_can_be_rerun(app):
+    with app.app_context():
+        with db.engine.begin() as conn:
+            conn.exec_driver_sql("CREATE TABLE scratch (id INTEGER PRIMARY KEY, value INTEGER, copy INTEGER)")
+            conn.exec_driver_sql("INSERT INTO scratch (id, value) VALUES (1, 10), (2, 20), (3, 30), (5, 50), (8, 80)")
+
+    filled, steps = _migrate(app, lambda: backfill('scratch', 'copy = value', 'copy IS NULL'))
+    assert filled == 5
+    assert steps[-1][2] == '5 rows in 3 batches of 2'
+    assert _migrate(app, lambda: backfill('scratch', 'copy = value', 'copy IS NULL'))[0] == 0
+
+    with app.app_context(), db.engine.begin() as conn:
+        assert conn.exec_driver_sql("SELECT count(*) FROM scratch WHERE copy = value").scalar() == 5
+        conn.exec_driver_sql("DROP TABLE scratch")
+
+
+def _load_migration(filename):
+    spec = importlib.util.spec_from_file_location(filename[:-3], os.path.join(MIGRATIONS, filename))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_claimed_at_migration_backfills_existing_keys(app):
+    migration = _load_migration('683f7131ccc0_add_idempotency_keys_claimed_at.py')
+    created = [datetime(2026, 1, day, 12) for day in (1, 2, 3)]
+    _migrate(app, migration.downgrade)
+    with app.app_context(), db.engine.begin() as conn:
+        for index, created_at in enumerate(created):
+            conn.execute(text(
+                "INSERT INTO idempotency_keys (key, request_hash, created_at, expires_at) "
+                "VALUES (:key, 'hash', :created_at, :created_at)"
+            ), {"key": f"key-{index}", "created_at": created_at})
+
+    _, steps = _migrate(app, migration.upgrade)
+
+    assert any(step == 'backfill idempotency_keys' for step, _, _ in steps)
+    with app.app_context(), db.engine.connect() as conn:
+        backfilled = conn.exec_driver_sql(
+            "SELECT count(*) FROM idempotency_keys WHERE claimed_at = created_at").scalar()
+    assert backfilled == len(created)
@@ -0,0 +1,63 @@
+# tests/test_overdue.py
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import delete, update
+
+from conftest import borrow, create_books, create_category
+from extensions import db
+from models.borrowing import Borrowing
+from models.overdue_loan import OverdueLoan, OverdueScanState
+from services.overdue_service import flag_overdue_loans
+
+
+def _flagged_ids():
+    return sorted(borrowing_id for (borrowing_id,) in db.session.query(OverdueLoan.borrowing_id))
+
+
+def test_runs_scan_only_past_the_watermark(app, client, headers):
+    book_id, = create_books(client, headers, create_category(client, headers), ('9780000000001', 'Dune', 3))
+    loans = [borrow(client, headers, book_id, room=str(room)).get_json()["id"] for room in (1, 2, 3)]
+    now = datetime.now(timezone.utc)
+
+    with app.app_context():
+        for loan_id, days in zip(loans, (30, 20, 1)):
+            db.session.execute(update(Borrowing).where(Borrowing.id == loan_id)
+                               .values(borrowed_at=now - timedelta(days=days)))
+        db.session.commit()
+
+        assert flag_overdue_loans(14, batch_size=1)["flagged"] == 2
+        assert _flagged_ids() == loans[:2]
+
+        # Loans below the watermark were checked by the last run and are not read again
+        db.session.execute(delete(OverdueLoan))
+        db.session.commit()
+        assert flag_overdue_loans(14, batch_size=1)["flagged"] == 0
+
+        # With the watermark moved back, only the loans after it are scanned
+        db.session.execute(update(OverdueScanState).values(watermark=now - timedelta(days=25)))
+        db.session.commit()
+        assert flag_overdue_loans(14, batch_size=1)["flagged"] == 1
+        assert _flagged_ids() == [loans[1]]
+
+        # A new loan period discards the flags and rescans from the beginning
+        assert flag_overdue_loans(10, batch_size=1)["flagged"] == 2
+        assert _flagged_ids() == loans[:2]
+
+
+def test_flags_of_returned_loans_are_cleared(app, client, headers):
+    book_id, = create_books(client, headers, create_category(client, headers), ('9780000000001', 'Dune', 1))
+    loan_id = borrow(client, headers, book_id).get_json()["id"]
+    with app.app_context():
+        db.session.execute(update(Borrowing).values(borrowed_at=datetime.now(timezone.utc) - timedelta(days=30)))
+        db.session.commit()
+        flag_overdue_loans(14)
+
+    overdue = client.get('/api/borrowings/overdue', headers=headers).get_json()
+    assert [loan["id"] for loan in overdue["borrowings"]] == [loan_id]
+
+    assert client.patch(f'/api/borrowings/return/{loan_id}', headers=headers).status_code == 200
+    # Hidden at once, removed by the next run
+    assert client.get('/api/borrowings/overdue', headers=headers).get_json()["borrowings"] == []
+    with app.app_context():
+        assert flag_overdue_loans(14)["cleared"] == 1
+        assert _flagged_ids() == []
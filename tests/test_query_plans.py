@@ -0,0 +1,55 @@
+# tests/test_query_plans.py
+import pytest
+
+from conftest import borrow, create_books, create_category, postgres_only
+from utils.query_plans import _is_known, _scan_problems, check_query_plans, missing_data
+
+
+def test_missing_data_lists_what_the_checked_paths_need(app, client, headers):
+    with app.app_context():
+        assert missing_data() == ["a category", "a book with a copy available", "an active loan"]
+
+    book_id, = create_books(client, headers, create_category(client, headers), ('9780000000001', 'Dune', 2))
+    borrow(client, headers, book_id)
+
+    with app.app_context():
+        assert missing_data() == []
+
+
+def test_scans_without_an_index_condition_are_reported():
+    plan = {"Node Type": "Nested Loop", "Plans": [
+        {"Node Type": "Index Scan", "Relation Name": "books", "Index Name": "books_pkey",
+         "Index Cond": "(id = 1)"},
+        {"Node Type": "Index Scan", "Relation Name": "borrowings", "Index Name": "idx_borrowings_borrowed_at_id",
+         "Filter": "(book_id = 1)"},
+        {"Node Type": "Seq Scan", "Relation Name": "categories"},
+    ]}
+
+    assert list(_scan_problems(plan)) == [
+        ("Index Scan", "borrowings", "idx_borrowings_borrowed_at_id", "(book_id = 1)"),
+        ("Seq Scan", "categories", None, None),
+    ]
+
+
+def test_known_full_scans_match_by_path_and_relation():
+    assert _is_known('/api/books?search=the', 'books')
+    assert _is_known('/api/books/suggest?q=the', 'books')
+    assert not _is_known('/api/books/suggest?q=the', 'borrowings')
+    assert not _is_known('/api/books?available=true', 'books')
+
+
+def test_check_requires_postgres(app):
+    if app.config['SQLALCHEMY_DATABASE_URI'].startswith('postgres'):
+        pytest.skip("Runs on PostgreSQL; see test_every_query_uses_an_index")
+    with app.app_context(), pytest.raises(RuntimeError):
+        check_query_plans()
+
+
+def test_every_query_uses_an_index(app, client, headers):
+    postgres_only(app)
+    category_id = create_category(client, headers)
+    book_id, _ = create_books(client, headers, category_id, ('9780000000001', 'Dune', 2), ('9780000000002', 'Emma', 1))
+    borrow(client, headers, book_id)
+
+    with app.app_context():
+        assert check_query_plans() == []
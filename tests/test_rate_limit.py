@@ -0,0 +1,38 @@
+# tests/test_rate_limit.py
+import pytest
+
+from conftest import API_KEY
+from utils.rate_limit import InMemoryRateLimitBackend, _check_rate_config, _client_key
+
+
+def _key_for(app, remote_addr, api_key=None):
+    headers = {'Api-Key': api_key} if api_key else {}
+    with app.test_request_context('/api/books', headers=headers, environ_base={'REMOTE_ADDR': remote_addr}):
+        return _client_key()
+
+
+def test_clients_sharing_the_api_key_get_separate_buckets(app):
+    first, second = _key_for(app, '10.0.0.1', API_KEY), _key_for(app, '10.0.0.2', API_KEY)
+    assert first != second
+    assert first == _key_for(app, '10.0.0.1', API_KEY)
+
+    backend = InMemoryRateLimitBackend()
+    assert backend.consume(first, rate=1, burst=1)[0] is True
+    assert backend.consume(first, rate=1, burst=1)[0] is False
+    assert backend.consume(second, rate=1, burst=1)[0] is True
+
+
+def test_unknown_api_keys_fall_back_to_the_address(app):
+    assert _key_for(app, '10.0.0.1', 'made-up') == _key_for(app, '10.0.0.1', 'other') == 'ip:10.0.0.1'
+
+
+@pytest.mark.parametrize('setting, value', [
+    ('RATELIMIT_DEFAULT_RATE', 0),
+    ('RATELIMIT_EXPENSIVE_RATE', -1),
+    ('RATELIMIT_DEFAULT_BURST', 0),
+    ('RATELIMIT_EXPENSIVE_BURST', 0),
+])
+def test_rates_that_never_admit_a_request_are_rejected(app, setting, value):
+    _check_rate_config(app.config)
+    with pytest.raises(ValueError, match=setting):
+        _check_rate_config({**app.config, setting: value})
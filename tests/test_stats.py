@@ -0,0 +1,80 @@
+# tests/test_stats.py
+from sqlalchemy import text
+
+from conftest import borrow, create_books, create_category
+from extensions import db
+
+
+def _stats(client, headers):
+    response = client.get('/api/stats', headers=headers)
+    assert response.status_code == 200
+    return response.get_json()
+
+
+def _utilization(client, headers):
+    return {row["category_id"]: (row["total_quantity"], row["on_loan"])
+            for row in _stats(client, headers)["category_utilization"]}
+
+
+def _live_utilization(app):
+    """What category_utilization used to aggregate from books on every request."""
+    with app.app_context():
+        return {category_id: (total, on_loan) for category_id, total, on_loan in db.session.execute(text(
+            "SELECT c.id, COALESCE(SUM(b.total_quantity), 0), "
+            "COALESCE(SUM(b.total_quantity - b.available_quantity), 0) "
+            "FROM categories c LEFT JOIN books b ON b.category_id = c.id GROUP BY c.id"
+        ))}
+
+
+def test_counters_follow_borrows_and_returns(client, headers):
+    first, second = create_books(client, headers, create_category(client, headers),
+                                 ('9780000000001', 'Dune', 3), ('9780000000002', 'Emma', 1))
+    loan = borrow(client, headers, first).get_json()["id"]
+    borrow(client, headers, first, room='102')
+    borrow(client, headers, second, room='102', hotel='Harbour Inn')
+    client.patch(f'/api/borrowings/return/{loan}', headers=headers)
+
+    stats = _stats(client, headers)
+    assert [(row["book_id"], row["borrow_count"]) for row in stats["most_borrowed"]] == [(first, 2), (second, 1)]
+    assert {row["hotel"]: row["active_loans"] for row in stats["active_loans_per_hotel"]} == {
+        'Grand Hotel': 1, 'Harbour Inn': 1,
+    }
+    assert [(row["borrow_count"], row["return_count"]) for row in stats["daily"]] == [(3, 1)]
+
+
+def test_category_counters_follow_catalog_edits(app, client, headers):
+    fiction = create_category(client, headers, 'Fiction')
+    poetry = create_category(client, headers, 'Poetry')
+    first, second, third = create_books(client, headers, fiction, ('9780000000001', 'Dune', 3),
+                                        ('9780000000002', 'Emma', 2), ('9780000000003', 'Ulysses', 4))
+    borrow(client, headers, first)
+    borrow(client, headers, third)
+    client.patch('/api/borrowings/return-room', json={"borrower_hotel": 'Grand Hotel', "borrower_room_number": '101'},
+                 headers=headers)
+    borrow(client, headers, third, room='102')
+
+    # Moving a book with a copy on loan moves both counters
+    assert client.patch(f'/api/books/{third}', json={"category_id": poetry, "total_quantity": 6},
+                        headers=headers).status_code == 200
+    assert client.patch(f'/api/books/{first}', json={"available_quantity": 2}, headers=headers).status_code == 200
+    assert client.delete(f'/api/books/{second}', headers=headers).status_code == 204
+
+    assert _utilization(client, headers) == {fiction: (3, 1), poetry: (6, 1)}
+    assert _utilization(client, headers) == _live_utilization(app)
+
+
+def test_rolled_back_batches_are_not_counted(client, headers):
+    book_id, = create_books(client, headers, create_category(client, headers), ('9780000000001', 'Dune', 2))
+    operation = {"method": "POST", "path": "/api/borrowings/borrow", "body": {
+        "book_id": book_id, "borrower_name": "Guest", "borrower_room_number": "101", "borrower_hotel": "Grand Hotel",
+    }}
+
+    client.post('/api/batch', json={"atomic": True, "operations": [
+        operation, dict(operation, body=dict(operation["body"], book_id=999999)),
+    ]}, headers=headers)
+    assert _stats(client, headers)["most_borrowed"] == []
+
+    client.post('/api/batch', json={"atomic": True, "operations": [operation, operation]}, headers=headers)
+    stats = _stats(client, headers)
+    assert stats["most_borrowed"][0]["borrow_count"] == 2
+    assert stats["category_utilization"][0]["on_loan"] == 2
@@ -0,0 +1,39 @@
+# tests/test_suggest.py
+from sqlalchemy import delete
+
+from conftest import create_books, create_category
+from extensions import db
+from models.book import Book
+
+
+def _suggested(client, headers, q):
+    response = client.get(f'/api/books/suggest?q={q}', headers=headers)
+    return [book["title"] for book in response.get_json()["suggestions"]]
+
+
+def test_suggestions_drop_books_deleted_by_another_worker(app, client, headers):
+    app.config['SUGGEST_REFRESH_SECONDS'] = 0
+    first, _ = create_books(client, headers, create_category(client, headers),
+                            ('9780000000001', 'Dune', 1), ('9780000000002', 'Dune Messiah', 1))
+    assert _suggested(client, headers, 'dun') == ['Dune', 'Dune Messiah']
+
+    with app.app_context():
+        db.session.execute(delete(Book).where(Book.id == first))
+        db.session.commit()
+
+    assert _suggested(client, headers, 'dun') == ['Dune Messiah']
+
+
+def test_suggestions_follow_local_writes(app, client, headers):
+    app.config['SUGGEST_REFRESH_SECONDS'] = 3600
+    category_id = create_category(client, headers)
+    first, = create_books(client, headers, category_id, ('9780000000001', 'Dune', 1))
+    assert _suggested(client, headers, 'dun') == ['Dune']
+
+    create_books(client, headers, category_id, ('9780000000002', 'Dune Messiah', 1))
+    client.patch(f'/api/books/{first}', json={"title": "Emma"}, headers=headers)
+    assert _suggested(client, headers, 'dun') == ['Dune Messiah']
+    assert _suggested(client, headers, 'emm') == ['Emma']
+
+    assert client.delete(f'/api/books/{first}', headers=headers).status_code == 204
+    assert _suggested(client, headers, 'emm') == []
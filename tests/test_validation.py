@@ -0,0 +1,55 @@
+# tests/test_validation.py
+import json
+
+from conftest import create_category
+from utils.validation import MAX_REPORTED_ITEMS
+
+
+def _book(index, **fields):
+    return dict({"title": f"Book {index}", "author": "Author", "isbn": f"978{index:010d}",
+                 "total_quantity": 1, "category_id": 1}, **fields)
+
+
+def test_every_invalid_item_is_reported_by_index(client, headers):
+    create_category(client, headers)
+    books = [_book(0), _book(1, title=""), _book(2), _book(3, total_quantity=-1, isbn="123")]
+
+    response = client.post('/api/books', json={"books": books}, headers=headers)
+
+    body = response.get_json()
+    assert response.status_code == 400
+    assert body["invalid_item_count"] == 2
+    assert {index: sorted(error["loc"][0] for error in errors) for index, errors in body["items"].items()} == {
+        '1': ['title'], '3': ['isbn', 'total_quantity'],
+    }
+    assert client.get('/api/books', headers=headers).get_json()["pagination"]["total"] == 0
+
+
+def test_reported_items_are_capped(client, headers):
+    books = [_book(index, title="") for index in range(MAX_REPORTED_ITEMS + 5)]
+
+    body = client.post('/api/books', json={"books": books}, headers=headers).get_json()
+
+    assert body["invalid_item_count"] == MAX_REPORTED_ITEMS + 5
+    assert len(body["items"]) == MAX_REPORTED_ITEMS
+
+
+def test_envelope_errors_and_limits(app, client, headers):
+    app.config['BULK_MAX_ITEMS'] = 2
+
+    empty = client.post('/api/books', json={"books": []}, headers=headers).get_json()
+    too_many = client.post('/api/books', json={"books": [_book(i) for i in range(3)]}, headers=headers)
+    malformed = client.post('/api/books', data=b'{"books": [', headers=dict(headers, **{'Content-Type': 'application/json'}))
+
+    assert empty["invalid_item_count"] == 0 and empty["details"][0]["loc"] == ["books"]
+    assert too_many.status_code == 400
+    assert malformed.status_code == 400
+
+
+def test_bodies_over_the_size_limit_are_rejected_before_parsing(app, client, headers):
+    app.config['MAX_CONTENT_LENGTH'] = 1024
+    payload = json.dumps({"books": [_book(i) for i in range(50)]})
+
+    response = client.post('/api/books', data=payload, headers=dict(headers, **{'Content-Type': 'application/json'}))
+
+    assert response.status_code == 413
@@ -1,20 +1,37 @@
 from flask import current_app
 from flask_migrate import upgrade
 from app import create_app
+from extensions import init_migrate
+import argparse
 import os
 
 # 設置環境變數，以確保 Flask 能夠找到應用程式
 os.environ['FLASK_APP'] = 'app.py'
 
+parser = argparse.ArgumentParser(description="Upgrade the database to the latest migration.")
+parser.add_argument('--online', action='store_true',
+                    help="Lock-safe mode: short lock_timeout with retries, one transaction per revision, "
+                         "and a per-step duration report (see utils/online_migrations.py).")
+args = parser.parse_args()
+
 # 創建 Flask 應用實例
 app = create_app()
+init_migrate(app)
+
+if args.online:
+    from utils.online_migrations import run_online_upgrade
 
-with app.app_context():
-    print("Starting database migration...")
-    try:
-        upgrade()
-        print("Database migration completed successfully.")
-    except Exception as e:
-        print(f"An error occurred during migration: {e}")
-        raise
-    
\ No newline at end of file
+    print("Starting online database migration...")
+    steps = run_online_upgrade(app)
+    for step, seconds, detail in steps:
+        print(f"  {step:<40} {seconds:8.2f} s  {detail}")
+    print("Database migration completed successfully.")
+else:
+    with app.app_context():
+        print("Starting database migration...")
+        try:
+            upgrade()
+            print("Database migration completed successfully.")
+        except Exception as e:
+            print(f"An error occurred during migration: {e}")
+            raise
@@ -0,0 +1,273 @@
+# utils/availability_events.py
+import json
+import select
+import threading
+import time
+from collections import deque
+
+from flask import current_app, g
+from sqlalchemy import Sequence, text
+
+from extensions import db
+
+# Postgres NOTIFY channel shared by every worker
+CHANNEL = 'book_availability'
+
+# Event ids shared by every worker (PostgresBroker); created by the migrations and by create_all
+EVENT_IDS = Sequence('book_availability_event_ids', metadata=db.metadata)
+
+
+def availability_event(book):
+    """
+    Build the event payload for a book from its in-memory state.
+    Call before commit: afterwards the attributes are expired and reading
+    them would issue a query per book.
+    """
+    return {
+        "book_id": book.id,
+        "category_id": book.category_id,
+        "available_quantity": book.available_quantity,
+        "total_quantity": book.total_quantity,
+    }
+
+
+class Subscription:
+    """
+    One SSE connection's filter and bounded event buffer.
+    When the client reads too slowly the oldest events are dropped and the
+    overflow is reported, so a stalled client can never grow memory.
+    """
+
+    def __init__(self, book_ids=None, category_ids=None, buffer_size=100):
+        self.book_ids = set(book_ids) if book_ids else None
+        self.category_ids = set(category_ids) if category_ids else None
+        self._events = deque(maxlen=buffer_size)
+        self._cond = threading.Condition()
+        self._dropped = 0
+        # Set when the broker may have missed events this client expects
+        self._gap = False
+
+    def matches(self, event):
+        if self.book_ids is None and self.category_ids is None:
+            return True
+        return (
+            (self.book_ids is not None and event['book_id'] in self.book_ids)
+            or (self.category_ids is not None and event['category_id'] in self.category_ids)
+        )
+
+    def push(self, event):
+        if not self.matches(event):
+            return
+        with self._cond:
+            if len(self._events) == self._events.maxlen:
+                self._dropped += 1
+            self._events.append(event)
+            self._cond.notify()
+
+    def request_resync(self):
+        """Tell the client to refetch: events it expects are no longer available."""
+        with self._cond:
+            self._gap = True
+            self._cond.notify()
+
+    def get(self, timeout):
+        """
+        Wait up to `timeout` seconds and return (events, resync), where resync
+        is None or the payload of a `resync` event for the client.
+        """
+        with self._cond:
+            if not self._events and not self._gap and not self._dropped:
+                self._cond.wait(timeout)
+            events = list(self._events)
+            self._events.clear()
+            resync = None
+            if self._dropped or self._gap:
+                resync = {"dropped": self._dropped} if self._dropped else {"reason": "history_unavailable"}
+            self._dropped, self._gap = 0, False
+        return events, resync
+
+
+class InProcessBroker:
+    """
+    Fans events out to the subscribers of this worker process.
+    Suitable for a single worker and for tests; keeps a short history so
+    reconnecting clients can resume from Last-Event-ID. A client resuming
+    from before the oldest event the history still covers is sent a
+    `resync` instead, since events it missed may be gone.
+    """
+
+    def __init__(self, history_size=1000):
+        self._lock = threading.Lock()
+        self._subscribers = set()
+        self._history = deque(maxlen=history_size)
+        self._last_id = 0
+        # The history holds every event with a larger id than this
+        self._complete_after = time.time_ns() // 1000
+
+    def _next_id(self):
+        # Microsecond timestamps keep ids increasing across restarts of this process
+        with self._lock:
+            self._last_id = max(self._last_id + 1, time.time_ns() // 1000)
+            return self._last_id
+
+    def publish(self, payload):
+        self._deliver(dict(payload, id=self._next_id()))
+
+    def publish_many(self, payloads):
+        for payload in payloads:
+            self.publish(payload)
+
+    def _deliver(self, event):
+        with self._lock:
+            if len(self._history) == self._history.maxlen:
+                self._complete_after = self._history[0]['id']
+            self._history.append(event)
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            subscription.push(event)
+
+    def subscriber_count(self):
+        """Open SSE subscriptions; in-process listeners such as the catalog snapshot are not counted."""
+        with self._lock:
+            return sum(isinstance(s, Subscription) for s in self._subscribers)
+
+    def subscribe(self, subscription, last_event_id=None):
+        """Register a subscription, replaying buffered events newer than last_event_id."""
+        with self._lock:
+            self._subscribers.add(subscription)
+            missed = [e for e in self._history
+                      if last_event_id is not None and e['id'] > last_event_id]
+            gap = last_event_id is not None and last_event_id < self._complete_after
+        if gap:
+            subscription.request_resync()
+        for event in missed:
+            subscription.push(event)
+
+    def _resync_all(self):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            subscription.request_resync()
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+
+class PostgresBroker(InProcessBroker):
+    """
+    Fans events out across workers with Postgres LISTEN/NOTIFY.
+    Publishing sends a NOTIFY; each worker runs one listener thread (started
+    on the first subscription) that feeds its local subscribers. The history
+    only counts as complete from the moment the listener is connected, and
+    every subscriber is sent a `resync` after the listener reconnects.
+
+    Event ids come from the shared EVENT_IDS sequence, so they mean the same
+    on every worker. Publishers take a transaction-level advisory lock
+    before drawing ids, so ids are committed, and NOTIFYs delivered, in id
+    order: a client resuming from the last id it saw cannot skip one.
+    """
+
+    def __init__(self, engine, history_size=1000, poll_interval=5.0):
+        super().__init__(history_size)
+        self._engine = engine
+        self._poll_interval = poll_interval
+        self._listener = None
+        # Nothing is received before the listener connects
+        self._complete_after = float('inf')
+
+    def publish(self, payload):
+        self.publish_many([payload])
+
+    def publish_many(self, payloads):
+        """Send all events with one statement on one connection, in order."""
+        if not payloads:
+            return
+        events = [json.dumps(payload) for payload in payloads]
+        with self._engine.connect() as conn:
+            # Held until commit; the listener takes it too (see _listen)
+            conn.execute(text("SELECT pg_advisory_xact_lock(hashtext(:channel))"), {"channel": CHANNEL})
+            conn.execute(text(
+                "SELECT pg_notify(:channel, CAST(jsonb_set(CAST(payload AS jsonb), '{id}', "
+                f"to_jsonb(nextval('{EVENT_IDS.name}'))) AS text)) "
+                "FROM unnest(CAST(:payloads AS text[])) WITH ORDINALITY AS events(payload, n) ORDER BY n"
+            ), {"channel": CHANNEL, "payloads": events})
+            conn.commit()
+
+    def subscribe(self, subscription, last_event_id=None):
+        with self._lock:
+            if self._listener is None or not self._listener.is_alive():
+                self._listener = threading.Thread(
+                    target=self._listen, name='availability-listener', daemon=True
+                )
+                self._listener.start()
+        super().subscribe(subscription, last_event_id)
+
+    def _listen(self):
+        connected_before = False
+        while True:
+            try:
+                raw = self._engine.raw_connection()
+                try:
+                    dbapi_conn = raw.driver_connection
+                    dbapi_conn.autocommit = False
+                    cursor = dbapi_conn.cursor()
+                    # No publisher is between drawing ids and committing while
+                    # the lock is held, so every id above the sequence's
+                    # current value is committed after LISTEN and delivered
+                    cursor.execute("SELECT pg_advisory_xact_lock(hashtext(%s))", (CHANNEL,))
+                    cursor.execute(f"LISTEN {CHANNEL}")
+                    cursor.execute(f"SELECT last_value, is_called FROM {EVENT_IDS.name}")
+                    last_value, is_called = cursor.fetchone()
+                    dbapi_conn.commit()
+                    dbapi_conn.autocommit = True
+                    with self._lock:
+                        self._complete_after = last_value if is_called else last_value - 1
+                    if connected_before:
+                        # Events sent while disconnected were lost
+                        self._resync_all()
+                    connected_before = True
+                    while True:
+                        if select.select([dbapi_conn], [], [], self._poll_interval) == ([], [], []):
+                            continue
+                        dbapi_conn.poll()
+                        while dbapi_conn.notifies:
+                            notify = dbapi_conn.notifies.pop(0)
+                            self._deliver(json.loads(notify.payload))
+                finally:
+                    raw.invalidate()
+            except Exception:
+                # Reconnect after a short pause; events during the gap are lost
+                # and clients are told to resync once the listener is back
+                time.sleep(self._poll_interval)
+
+
+def setup_availability_events(app, engine):
+    """Create the broker selected by AVAILABILITY_BROKER ('memory' or 'postgres')."""
+    if app.config.get('AVAILABILITY_BROKER', 'memory') == 'postgres':
+        broker = PostgresBroker(engine)
+    else:
+        broker = InProcessBroker()
+    app.extensions['availability_broker'] = broker
+
+
+def publish_availability(events):
+    """
+    Publish availability events after the transaction that produced them has
+    committed. Failures are logged and never fail the request.
+
+    Inside an atomic batch (see routes/batch.py) the sub-requests' commits
+    are only savepoints, so events are collected on `g` and published by the
+    batch once the outer transaction commits.
+    """
+    deferred = g.get('deferred_availability_events')
+    if deferred is not None:
+        deferred.extend(events)
+        return
+    broker = current_app.extensions.get('availability_broker')
+    if broker is None or not events:
+        return
+    try:
+        broker.publish_many(events)
+    except Exception as e:
+        current_app.logger.error(f"Failed to publish {len(events)} availability events: {e}", exc_info=True)
@@ -0,0 +1,152 @@
+# utils/circulation_log.py
+import atexit
+import os
+import queue
+import threading
+import time
+from datetime import datetime, timezone
+
+from flask import current_app, g
+from sqlalchemy import insert
+
+from models.circulation_event import CirculationEvent
+
+
+def circulation_event(event_type, book, borrowing=None):
+    """
+    Build a circulation_events row for a book from its in-memory state.
+    Like availability_event(), call before commit: afterwards the attributes
+    are expired and reading them would issue a query.
+    """
+    return {
+        "event_type": event_type,
+        "book_id": book.id,
+        "borrowing_id": borrowing.id if borrowing is not None else None,
+        "borrower_hotel": borrowing.borrower_hotel if borrowing is not None else None,
+        "total_quantity": book.total_quantity,
+        "available_quantity": book.available_quantity,
+        "occurred_at": datetime.now(timezone.utc),
+    }
+
+
+class CirculationLogWriter:
+    """
+    Bounded queue drained by one background thread per worker process.
+
+    Requests enqueue events after their commit and return; the thread writes
+    them with one multi-row INSERT when `batch_size` events are waiting or
+    `flush_seconds` after the first one arrived, whichever comes first, so
+    the borrow/return transactions (and their row locks) are never
+    lengthened. When the queue is full the request writes its own events
+    instead of dropping them. Events still queued when the process exits are
+    flushed by an atexit hook; a hard kill loses at most one queue's worth.
+    A batch that still fails after `retries` attempts is dropped and logged,
+    so the log is a best-effort record, not a source of truth.
+    """
+
+    def __init__(self, engine, logger, queue_size=10000, batch_size=500, flush_seconds=1.0, retries=3):
+        self._engine = engine
+        self._logger = logger
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._batch_size = batch_size
+        self._flush_seconds = flush_seconds
+        self._retries = retries
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        atexit.register(self.flush)
+
+    def _ensure_thread(self):
+        # Started lazily, and again in a forked child, where threads do not survive
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid() or not self._thread.is_alive():
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name='circulation-log', daemon=True)
+                self._thread.start()
+
+    def record(self, events):
+        if not events:
+            return
+        if not self._flush_seconds:
+            self._write(events)
+            return
+        self._ensure_thread()
+        overflow = []
+        for event in events:
+            try:
+                self._queue.put_nowait(event)
+            except queue.Full:
+                overflow.append(event)
+        if overflow:
+            self._logger.warning(f"Circulation log queue full; writing {len(overflow)} events inline")
+            self._write(overflow)
+
+    def _next_batch(self):
+        """Block for the first event, then collect more until the batch is full or the flush time is up."""
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self._flush_seconds
+        while len(batch) < self._batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            self._write(self._next_batch())
+
+    def _write(self, rows):
+        for attempt in range(self._retries + 1):
+            try:
+                with self._engine.begin() as conn:
+                    conn.execute(insert(CirculationEvent.__table__).values(rows))
+                return
+            except Exception as e:
+                if attempt == self._retries:
+                    self._logger.error(f"Dropped {len(rows)} circulation events after {attempt + 1} attempts: {e}",
+                                       exc_info=True)
+                    return
+                time.sleep(0.5 * 2 ** attempt)
+
+    def flush(self):
+        """Write everything still queued, in batches, from the calling thread."""
+        while True:
+            batch = []
+            try:
+                while len(batch) < self._batch_size:
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                pass
+            if not batch:
+                return
+            self._write(batch)
+
+
+def setup_circulation_log(app, engine):
+    """Create this worker's circulation log writer; its thread starts on the first event."""
+    app.extensions['circulation_log'] = CirculationLogWriter(
+        engine, app.logger,
+        queue_size=app.config['CIRCULATION_LOG_QUEUE_SIZE'],
+        batch_size=app.config['CIRCULATION_LOG_BATCH_SIZE'],
+        flush_seconds=app.config['CIRCULATION_LOG_FLUSH_SECONDS'],
+    )
+
+
+def record_circulation(events):
+    """
+    Queue circulation events after the transaction that produced them has
+    committed. Inside an atomic batch they are collected on `g` and recorded
+    by the batch once the outer transaction commits, as with
+    publish_availability().
+    """
+    deferred = g.get('deferred_circulation_events')
+    if deferred is not None:
+        deferred.extend(events)
+        return
+    writer = current_app.extensions.get('circulation_log')
+    if writer is not None:
+        writer.record(events)
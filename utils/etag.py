@@ -0,0 +1,18 @@
+# utils/etag.py
+
+def make_etag(version):
+    """Build a strong ETag value from a row version counter."""
+    return f'"{version}"'
+
+def if_match_satisfied(if_match, version):
+    """
+    Check an If-Match header against the current row version.
+    Accepts '*' or a comma-separated list of ETags. If-Match uses strong
+    comparison (RFC 9110, section 13.1.1), so weak ETags (W/"...") never match.
+    """
+    current = make_etag(version)
+    for tag in if_match.split(','):
+        tag = tag.strip()
+        if tag == '*' or tag == current:
+            return True
+    return False
@@ -0,0 +1,169 @@
+# utils/idempotency.py
+import functools
+import hashlib
+from datetime import datetime, timedelta, timezone
+
+from flask import request, jsonify, current_app
+from sqlalchemy.exc import IntegrityError
+
+from extensions import db
+from models.idempotency_key import IdempotencyKey
+
+
+def idempotency_scope():
+    """
+    The caller that keys are scoped to: its API key, or its address when it
+    sent none. Batch sub-requests carry their parent's scope in the environ
+    (see routes/batch.py), since their own headers are filtered.
+    """
+    return (
+        request.environ.get('idempotency.scope')
+        or request.headers.get('Api-Key')
+        or request.remote_addr
+        or ''
+    )
+
+
+def _scoped_key(header_value):
+    """Scope the client's key to the caller and endpoint so keys cannot collide."""
+    raw = '\x00'.join([
+        idempotency_scope(),
+        request.method,
+        request.path,
+        header_value,
+    ])
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+def _as_utc(value):
+    """Treat naive timestamps (e.g. from SQLite) as UTC so they compare with aware ones."""
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value
+
+
+def _replay(record):
+    """Rebuild the stored response without running the view again."""
+    response = current_app.response_class(
+        record.response_body, status=record.status_code, mimetype='application/json'
+    )
+    response.headers['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def _take_over(key, now):
+    """
+    Claim an unfinished key whose lease ran out (the worker handling it died
+    or was killed). The conditional UPDATE lets only one retry win.
+    """
+    lease = timedelta(seconds=current_app.config.get('IDEMPOTENCY_LEASE_SECONDS', 60))
+    taken = db.session.query(IdempotencyKey).filter(
+        IdempotencyKey.key == key,
+        IdempotencyKey.status_code.is_(None),
+        IdempotencyKey.claimed_at <= now - lease
+    ).update({"claimed_at": now}, synchronize_session=False)
+    db.session.commit()
+    return taken == 1
+
+
+def _claim(key, request_hash, now, attempts=3):
+    """
+    Claim `key` by inserting its placeholder row, replacing an expired one.
+    Returns (True, None) once claimed, or (False, record) with the live
+    record of another request. Concurrent requests racing for the same
+    expired key retry until one of them holds the claim; (False, None) means
+    the race did not settle within `attempts`.
+    """
+    ttl = current_app.config.get('IDEMPOTENCY_TTL_SECONDS', 86400)
+    for _ in range(attempts):
+        record = db.session.get(IdempotencyKey, key)
+        if record is not None and _as_utc(record.expires_at) > now:
+            return False, record
+        if record is not None:
+            # A bulk DELETE of whatever expired row is still there, so a
+            # concurrent request removing it first is not an error
+            db.session.expunge(record)
+            db.session.query(IdempotencyKey).filter(
+                IdempotencyKey.key == key,
+                IdempotencyKey.expires_at <= now
+            ).delete(synchronize_session=False)
+        db.session.add(IdempotencyKey(
+            key=key, request_hash=request_hash, claimed_at=now, expires_at=now + timedelta(seconds=ttl)
+        ))
+        try:
+            db.session.commit()
+            return True, None
+        except IntegrityError:
+            # Another request claimed the same key first; read its record
+            db.session.rollback()
+    return False, None
+
+
+def idempotent(view):
+    """
+    Make a write endpoint safe to retry with an `Idempotency-Key` header.
+
+    The first request claims the key by inserting a placeholder row, runs the
+    view and stores its response. Retries with the same key get the stored
+    response back without reaching the view (and its row locks). A claim
+    left unfinished for IDEMPOTENCY_LEASE_SECONDS is taken over by the next
+    retry. Requests without the header are handled exactly as before.
+    """
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        header_value = request.headers.get('Idempotency-Key')
+        if not header_value:
+            return view(*args, **kwargs)
+
+        if len(header_value) > 255:
+            return jsonify({"error": "Idempotency-Key must be at most 255 characters."}), 400
+
+        key = _scoped_key(header_value)
+        request_hash = hashlib.sha256(request.get_data()).hexdigest()
+        now = datetime.now(timezone.utc)
+
+        claimed, record = _claim(key, request_hash, now)
+        if not claimed and record is None:
+            return jsonify({
+                "error": "A request with this Idempotency-Key is still being processed."
+            }), 409
+
+        if record is not None:
+            if record.request_hash != request_hash:
+                return jsonify({
+                    "error": "Idempotency-Key has already been used for a different request."
+                }), 422
+            if record.status_code is not None:
+                return _replay(record)
+            if not _take_over(key, now):
+                return jsonify({
+                    "error": "A request with this Idempotency-Key is still being processed."
+                }), 409
+
+        try:
+            response = current_app.make_response(view(*args, **kwargs))
+        except Exception:
+            db.session.rollback()
+            db.session.query(IdempotencyKey).filter_by(key=key).delete()
+            db.session.commit()
+            raise
+
+        if response.status_code >= 500:
+            # Server errors are not stored so the client can retry them
+            db.session.query(IdempotencyKey).filter_by(key=key).delete()
+        else:
+            db.session.query(IdempotencyKey).filter_by(key=key).update({
+                "status_code": response.status_code,
+                "response_body": response.get_data(as_text=True),
+            })
+        db.session.commit()
+        return response
+
+    return wrapper
+
+
+def purge_expired_idempotency_keys():
+    """Delete expired idempotency records. Returns the number of rows removed."""
+    deleted = db.session.query(IdempotencyKey).filter(
+        IdempotencyKey.expires_at <= datetime.now(timezone.utc)
+    ).delete(synchronize_session=False)
+    db.session.commit()
+    return deleted
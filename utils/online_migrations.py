@@ -0,0 +1,200 @@
+# utils/online_migrations.py
+"""
+Online (lock-safe) mode for Alembic migrations.
+
+`run_online_upgrade` runs `flask_migrate.upgrade()` so that schema changes
+can ship while borrow/return traffic keeps flowing:
+
+- every revision runs in its own transaction with a short `lock_timeout`,
+  so a DDL statement queued behind a long transaction gives up quickly
+  instead of blocking every request that queues behind it; a revision that
+  times out is rolled back and retried with exponential backoff;
+- migrations build indexes with `create_index_concurrently` and fill new
+  columns with `backfill`, each batch in its own short transaction;
+- the duration of every revision and helper step is reported at the end.
+
+The helpers also work under plain `flask db upgrade`, with the defaults
+from Config, and on SQLite, where there are no lock timeouts and indexes
+are built normally.
+"""
+import time
+from dataclasses import dataclass, field
+
+from alembic import op
+from flask import current_app
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+
+# Postgres SQLSTATEs for lock_not_available (lock_timeout) and deadlock_detected
+_RETRYABLE_SQLSTATES = {'55P03', '40P01'}
+
+
+def _is_lock_timeout(error):
+    return isinstance(error, DBAPIError) and getattr(error.orig, 'pgcode', None) in _RETRYABLE_SQLSTATES
+
+
+@dataclass
+class OnlineMigration:
+    """Settings and per-step report for one online upgrade run."""
+    lock_timeout_ms: int = 2000
+    retries: int = 5
+    backoff_seconds: float = 1.0
+    batch_size: int = 1000
+    batch_pause: float = 0.1
+    # (step, seconds, detail)
+    steps: list = field(default_factory=list)
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(
+            lock_timeout_ms=config['MIGRATION_LOCK_TIMEOUT_MS'],
+            retries=config['MIGRATION_LOCK_RETRIES'],
+            backoff_seconds=config['MIGRATION_RETRY_BACKOFF_SECONDS'],
+            batch_size=config['MIGRATION_BACKFILL_BATCH_SIZE'],
+            batch_pause=config['MIGRATION_BACKFILL_PAUSE_SECONDS'],
+        )
+
+    def record(self, step, seconds, detail=''):
+        self.steps.append((step, seconds, detail))
+        current_app.logger.info(f"migration step {step}: {seconds:.2f} s {detail}".rstrip())
+
+    def configure_args(self):
+        """Extra context.configure() arguments for migrations/env.py."""
+        started = [time.perf_counter()]
+
+        def on_version_apply(ctx, step, heads, run_args):
+            now = time.perf_counter()
+            verb = 'upgrade' if step.is_upgrade else 'downgrade'
+            self.record(f"{verb} {step.up_revision_id}", now - started[0], step.up_revision.doc or '')
+            started[0] = now
+
+        return {'transaction_per_migration': True, 'on_version_apply': on_version_apply}
+
+    def prepare(self, connection):
+        """Set lock_timeout for the whole migration connection, including autocommit blocks."""
+        if connection.dialect.name == 'postgresql':
+            connection.exec_driver_sql(f"SET lock_timeout = {int(self.lock_timeout_ms)}")
+            # Session-level SET survives the commit; Alembic then starts its own transactions
+            connection.commit()
+
+    def retry(self, description, fn):
+        """Call fn(), retrying lock timeouts and deadlocks with exponential backoff."""
+        for attempt in range(self.retries + 1):
+            try:
+                return fn()
+            except DBAPIError as e:
+                if not _is_lock_timeout(e) or attempt == self.retries:
+                    raise
+                delay = self.backoff_seconds * 2 ** attempt
+                current_app.logger.warning(
+                    f"{description}: lock not acquired (attempt {attempt + 1}), retrying in {delay:.1f} s"
+                )
+                time.sleep(delay)
+
+
+def current_online_migration():
+    """The running online upgrade, or one built from Config under plain `flask db upgrade`."""
+    online = current_app.extensions.get('online_migration')
+    return online if online is not None else OnlineMigration.from_config(current_app.config)
+
+
+def run_online_upgrade(app, revision='head'):
+    """
+    Upgrade the database in online mode and return the recorded steps.
+    Requires Flask-Migrate to be initialised on `app` (see init_migrate).
+    """
+    from flask_migrate import upgrade
+
+    online = OnlineMigration.from_config(app.config)
+    app.extensions['online_migration'] = online
+    try:
+        with app.app_context():
+            started = time.perf_counter()
+            # Revisions commit one at a time, so a retry resumes at the one that timed out
+            online.retry('upgrade', lambda: upgrade(revision=revision))
+            online.record('total', time.perf_counter() - started)
+    finally:
+        app.extensions.pop('online_migration', None)
+    return online.steps
+
+
+# --- Helpers for migration scripts ---
+
+def _drop_invalid_index(bind, name):
+    """A failed CREATE INDEX CONCURRENTLY leaves an INVALID index that IF NOT EXISTS would keep."""
+    invalid = bind.execute(text(
+        "SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+        "WHERE c.relname = :name AND NOT i.indisvalid"
+    ), {"name": name}).first()
+    if invalid:
+        bind.exec_driver_sql(f'DROP INDEX CONCURRENTLY IF EXISTS "{name}"')
+
+
+def create_index_concurrently(name, table, columns, **kw):
+    """
+    Build an index without blocking writes: CREATE INDEX CONCURRENTLY in an
+    autocommit block, outside the revision's transaction. Safe to re-run.
+    """
+    online = current_online_migration()
+    started = time.perf_counter()
+    with op.get_context().autocommit_block():
+        bind = op.get_bind()
+
+        def build():
+            if bind.dialect.name == 'postgresql':
+                _drop_invalid_index(bind, name)
+            op.create_index(name, table, columns, postgresql_concurrently=True, if_not_exists=True, **kw)
+
+        online.retry(f"create index {name}", build)
+    online.record(f"index {name}", time.perf_counter() - started, f"on {table}")
+
+
+def drop_index_concurrently(name, table):
+    online = current_online_migration()
+    started = time.perf_counter()
+    with op.get_context().autocommit_block():
+        online.retry(f"drop index {name}", lambda: op.drop_index(
+            name, table_name=table, postgresql_concurrently=True, if_exists=True))
+    online.record(f"drop index {name}", time.perf_counter() - started, f"on {table}")
+
+
+def backfill(table, set_sql, where_sql='TRUE', key='id', batch_size=None, pause=None):
+    """
+    Fill a column in primary-key batches, each in its own short transaction:
+    `UPDATE table SET <set_sql> WHERE <where_sql>` over successive key ranges,
+    sleeping `pause` seconds between batches so normal traffic and autovacuum
+    keep up. `where_sql` should exclude rows already filled, so the backfill
+    can be interrupted and re-run. Returns the number of rows updated.
+    """
+    online = current_online_migration()
+    batch_size = batch_size or online.batch_size
+    pause = online.batch_pause if pause is None else pause
+
+    started = time.perf_counter()
+    total = batches = 0
+    last_key = None
+    with op.get_context().autocommit_block():
+        bind = op.get_bind()
+        while True:
+            after = f"{key} > :last AND " if last_key is not None else ''
+            upper = bind.execute(text(
+                f"SELECT max({key}) FROM (SELECT {key} FROM {table} WHERE {after}({where_sql}) "
+                f"ORDER BY {key} LIMIT :limit) AS batch"
+            ), {"last": last_key, "limit": batch_size}).scalar()
+            if upper is None:
+                break
+
+            def update_batch():
+                # Autocommit: each batch commits on its own and holds its row locks only briefly
+                return bind.execute(text(
+                    f"UPDATE {table} SET {set_sql} WHERE {after}{key} <= :upper AND ({where_sql})"
+                ), {"last": last_key, "upper": upper}).rowcount
+
+            total += online.retry(f"backfill {table} batch {batches + 1}", update_batch)
+            batches += 1
+            last_key = upper
+            if pause:
+                time.sleep(pause)
+    online.record(f"backfill {table}", time.perf_counter() - started,
+                  f"{total} rows in {batches} batches of {batch_size}")
+    return total
@@ -0,0 +1,208 @@
+# utils/profiling.py
+import cProfile
+import glob
+import hmac
+import json
+import os
+import pstats
+import random
+import threading
+import time
+from datetime import datetime, timezone
+
+from flask import request
+from sqlalchemy import event
+
+
+def _function_label(func):
+    """pstats key as `file.py:12(name)`, without the directory."""
+    filename, line, name = func
+    if filename == '~':
+        return name  # Built-in, e.g. "<method 'execute' of 'sqlite3.Cursor' objects>"
+    return f"{os.path.basename(filename)}:{line}({name})"
+
+
+class _Capture:
+    """One profiled request: the profiler plus the queries it issued."""
+
+    def __init__(self, announce):
+        self.announce = announce
+        self.thread_id = threading.get_ident()
+        self.profiler = cProfile.Profile()
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.started = time.perf_counter()
+
+
+class RequestProfiler:
+    """
+    Opt-in cProfile capture of whole requests, for finding where a slow
+    endpoint spends its time in production.
+
+    A request is profiled when it sends `X-Profile: <PROFILE_KEY>`, or at
+    random with probability PROFILE_SAMPLE_RATE. Only one request per worker
+    is profiled at a time (cProfile cannot profile two threads at once on
+    newer Pythons, and it slows the profiled request down); others run
+    normally. Each capture is written to PROFILE_DIR as a pstats file plus a
+    JSON file with its endpoint, status, duration, query count and database
+    time, and the directory is trimmed to the newest PROFILE_MAX_FILES
+    captures. Requests profiled with the key also get the summary in
+    response headers; sampled ones do not, so clients never see them.
+    """
+
+    def __init__(self, directory, max_files=100, key=None, sample_rate=0.0, logger=None):
+        self.directory = directory
+        self.max_files = max_files
+        self.key = key
+        self.sample_rate = sample_rate
+        self._logger = logger
+        self._busy = threading.Lock()
+        self._active = None
+
+    # --- Query accounting (SQLAlchemy engine events) ---
+
+    def before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        capture = self._active
+        if capture is not None and capture.thread_id == threading.get_ident():
+            context._profile_query_started = time.perf_counter()
+
+    def after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        capture = self._active
+        started = getattr(context, '_profile_query_started', None)
+        if capture is not None and started is not None:
+            capture.queries += 1
+            capture.db_seconds += time.perf_counter() - started
+
+    # --- Request hooks ---
+
+    def _requested(self):
+        """(profile, announce) for the current request."""
+        sent = request.headers.get('X-Profile')
+        if sent and self.key and hmac.compare_digest(sent.encode('utf-8'), self.key.encode('utf-8')):
+            return True, True
+        if self.sample_rate and random.random() < self.sample_rate:
+            return True, False
+        return False, False
+
+    def start(self):
+        profile, announce = self._requested()
+        if not profile or not self._busy.acquire(blocking=False):
+            return None
+        capture = _Capture(announce)
+        self._active = capture
+        request.environ['profiling.capture'] = capture
+        capture.profiler.enable()
+        return None
+
+    def _finish(self):
+        capture = request.environ.pop('profiling.capture', None)
+        if capture is None:
+            return None
+        capture.profiler.disable()
+        capture.elapsed = time.perf_counter() - capture.started
+        self._active = None
+        self._busy.release()
+        return capture
+
+    def stop(self, response):
+        capture = self._finish()
+        if capture is None:
+            return response
+        stats = pstats.Stats(capture.profiler)
+        top = sorted(stats.stats.items(), key=lambda item: item[1][2], reverse=True)[:3]
+        summary = {
+            "endpoint": request.endpoint,
+            "method": request.method,
+            "path": request.full_path.rstrip('?'),
+            "status": response.status_code,
+            "duration_ms": round(capture.elapsed * 1000, 2),
+            "query_count": capture.queries,
+            "db_ms": round(capture.db_seconds * 1000, 2),
+            "sampled": not capture.announce,
+            "top_functions": [
+                {"function": _function_label(func), "own_ms": round(tottime * 1000, 2), "calls": calls}
+                for func, (_, calls, tottime, _, _) in top
+            ],
+        }
+        profile_id = self._write(stats, summary)
+
+        if capture.announce:
+            response.headers['Server-Timing'] = (
+                f"app;dur={summary['duration_ms']}, db;dur={summary['db_ms']};desc=\"{capture.queries} queries\""
+            )
+            response.headers['X-Profile-Queries'] = str(capture.queries)
+            response.headers['X-Profile-Top'] = '; '.join(
+                f"{entry['function']} {entry['own_ms']}ms" for entry in summary['top_functions']
+            ).encode('ascii', 'replace').decode('ascii')
+            if profile_id:
+                response.headers['X-Profile-Id'] = profile_id
+        return response
+
+    def abandon(self, exc):
+        """Teardown: stop a profiler the request left running (e.g. after an unhandled error)."""
+        self._finish()
+
+    # --- On-disk ring ---
+
+    def _write(self, stats, summary):
+        """Write the capture and trim the ring; returns the capture's id, or None on failure."""
+        endpoint = (summary['endpoint'] or 'unmatched').replace('.', '-')
+        profile_id = f"{datetime.now(timezone.utc):%Y%m%dT%H%M%S%f}-{os.getpid()}-{endpoint}"
+        path = os.path.join(self.directory, profile_id)
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            stats.dump_stats(path + '.prof')
+            with open(path + '.json', 'w') as f:
+                json.dump(dict(summary, id=profile_id), f, indent=2)
+            self._trim()
+        except OSError as e:
+            if self._logger:
+                self._logger.warning(f"Could not write request profile {profile_id}: {e}")
+            return None
+        return profile_id
+
+    def _trim(self):
+        # Ids start with a UTC timestamp, so name order is age order across workers
+        captures = sorted(glob.glob(os.path.join(self.directory, '*.prof')))
+        for old in captures[:max(0, len(captures) - self.max_files)]:
+            for stale in (old, old[:-len('.prof')] + '.json'):
+                try:
+                    os.remove(stale)
+                except FileNotFoundError:
+                    pass  # Another worker trimmed it first
+
+
+def list_profiles(directory):
+    """Summaries of the captures in `directory`, newest first."""
+    summaries = []
+    for path in sorted(glob.glob(os.path.join(directory, '*.json')), reverse=True):
+        try:
+            with open(path) as f:
+                summaries.append(json.load(f))
+        except (OSError, ValueError):
+            continue  # Trimmed or half-written by another worker
+    return summaries
+
+
+def setup_profiling(app, engine):
+    """
+    Register request profiling when PROFILE_KEY or PROFILE_SAMPLE_RATE is
+    set; otherwise nothing is registered and requests pay nothing for it.
+    Call before the other request hooks so the capture covers them too.
+    """
+    key = app.config.get('PROFILE_KEY')
+    sample_rate = app.config.get('PROFILE_SAMPLE_RATE', 0.0)
+    if not key and not sample_rate:
+        return
+
+    profiler = RequestProfiler(
+        app.config['PROFILE_DIR'], app.config['PROFILE_MAX_FILES'],
+        key=key, sample_rate=sample_rate, logger=app.logger,
+    )
+    app.extensions['request_profiler'] = profiler
+    event.listen(engine, 'before_cursor_execute', profiler.before_cursor_execute)
+    event.listen(engine, 'after_cursor_execute', profiler.after_cursor_execute)
+    app.before_request(profiler.start)
+    # after_request hooks run in reverse order, so this one runs last
+    app.after_request(profiler.stop)
+    app.teardown_request(profiler.abandon)
@@ -0,0 +1,269 @@
+# utils/query_plans.py
+import json
+from urllib.parse import quote
+
+from flask import current_app, g
+from flask_sqlalchemy.query import Query
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from extensions import db, outer_transaction
+from models.book import Book
+from models.borrowing import Borrowing
+from models.category import Category
+
+# Statements checked; EXPLAIN without ANALYZE never executes them
+_EXPLAINED_VERBS = ('SELECT', 'WITH', 'INSERT', 'UPDATE', 'DELETE')
+
+# Scan nodes that read rows without an index condition to narrow them down
+_SCAN_NODES = {'Seq Scan', 'Index Scan', 'Index Only Scan'}
+
+# (path substring, relation, reason) for plans that are full scans by design
+KNOWN_FULL_SCANS = [
+    ('search=', 'books', "Leading-wildcard ILIKE search cannot use a B-tree index."),
+    ('search=', 'borrowings', "Leading-wildcard ILIKE search cannot use a B-tree index."),
+    ('is_returned=true', 'borrowings',
+     "Returned loans are most of the table; walking the ordered index is the intended plan."),
+    ('flag-overdue-loans', 'overdue_loans',
+     "Flags are few; clearing the returned ones reads them all and probes borrowings by key."),
+    ('/api/books/suggest', 'books', "The first request builds the in-memory index from every book."),
+]
+
+
+def _request_paths():
+    """Build one GET request per query shape served by routes/ and services/."""
+    book_id = db.session.query(db.func.min(Book.id)).scalar() or 1
+    category = db.session.query(Category.id, Category.name).order_by(Category.id).first()
+    category_id, category_name = category if category else (1, 'none')
+    category_name = quote(category_name)
+    borrowing_id = db.session.query(db.func.min(Borrowing.id)).scalar() or 1
+    room = db.session.query(Borrowing.borrower_hotel, Borrowing.borrower_room_number).first()
+    hotel, room_number = (quote(value) for value in room) if room else ('none', '0')
+
+    return [
+        '/api/books',
+        '/api/books?page=2&per_page=20',
+        '/api/books?per_page=0',
+        '/api/books?available=true',
+        f'/api/books?category={category_name}',
+        f'/api/books?category={category_name}&available=true',
+        '/api/books?search=the',
+        f'/api/books/{book_id}',
+        '/api/categories',
+        f'/api/categories/{category_id}',
+        '/api/borrowings',
+        '/api/borrowings?per_page=0',
+        '/api/borrowings?is_returned=false',
+        '/api/borrowings?is_returned=true',
+        '/api/borrowings?search=room',
+        '/api/borrowings?include_archived=true',
+        '/api/borrowings?borrowed_from=2000-01-01&borrowed_to=2100-01-01',
+        f'/api/borrowings/active?hotel={hotel}',
+        f'/api/borrowings/active?hotel={hotel}&room={room_number}',
+        f'/api/borrowings/{borrowing_id}',
+        f'/api/borrowings/overdue?hotel={hotel}',
+        '/api/circulation-events?after_id=0&limit=500',
+        '/api/stats',
+        '/api/books/suggest?q=the',
+    ]
+
+
+def missing_data():
+    """The rows every checked path needs to reach its queries, described, that are missing."""
+    required = [
+        ("a category", db.session.query(Category.id)),
+        ("a book with a copy available", db.session.query(Book.id).filter(Book.available_quantity > 0)),
+        ("an active loan", db.session.query(Borrowing.id).filter(Borrowing.is_returned == False)),
+    ]
+    return [description for description, query in required if query.first() is None]
+
+
+def _dispatch(app, method, path, json=None, headers=None):
+    """Run the view for a request in-process; dispatch_request skips before_request hooks."""
+    with app.test_request_context(path, method=method, json=json, headers=headers):
+        return app.dispatch_request()
+
+
+def _write_checks(app):
+    """
+    Build one (label, run) pair per write path: the endpoints that create,
+    update, borrow and return (with an Idempotency-Key, then replayed, so
+    the key lookups are checked too), the delete check, the bulk quantity
+    update, the stats upserts, the suggest index refresh and the
+    maintenance jobs. `run` is called inside a request context.
+    """
+    from routes.pydantic_models import BookQuantityUpdate
+    from services.archive_service import archive_returned_borrowings
+    from services.book_service import bulk_update_quantities_service
+    from services.overdue_service import flag_overdue_loans
+    from services.stats_service import record_borrows, record_returns
+    from services.suggest_service import SuggestIndex
+
+    book = db.session.query(Book.id, Book.isbn, Book.category_id).filter(Book.available_quantity > 0) \
+        .order_by(Book.id).first()
+    book_id, isbn, category_id = book if book else (1, '0000000000', 1)
+    loan = db.session.query(Borrowing.id, Borrowing.borrower_hotel, Borrowing.borrower_room_number) \
+        .filter(Borrowing.is_returned == False).order_by(Borrowing.id).first()
+    borrowing_id, hotel, room_number = loan if loan else (1, 'none', '0')
+    retry = {'Idempotency-Key': 'check-query-plans'}
+
+    def twice(method, path, json=None):
+        # The replay is answered from idempotency_keys without reaching the view
+        return lambda: [_dispatch(app, method, path, json, retry) for _ in range(2)]
+
+    # Built outside the capture, so only the refresh's delta queries are checked
+    suggest_index = SuggestIndex(refresh_seconds=0)
+    suggest_index.ensure_fresh()
+
+    return [
+        ('POST /api/books', twice('POST', '/api/books', {"books": [{
+            "title": "Query plan check", "author": "Query plan check", "isbn": "0000000000000",
+            "total_quantity": 1, "category_id": category_id,
+        }]})),
+        (f'PATCH /api/books/{book_id}', lambda: _dispatch(
+            app, 'PATCH', f'/api/books/{book_id}', {"author": "Query plan check"})),
+        ('POST /api/borrowings/borrow', twice('POST', '/api/borrowings/borrow', {
+            "book_id": book_id, "borrower_name": "Query plan check",
+            "borrower_room_number": room_number, "borrower_hotel": hotel,
+        })),
+        (f'PATCH /api/borrowings/return/{borrowing_id}', twice('PATCH', f'/api/borrowings/return/{borrowing_id}')),
+        ('PATCH /api/borrowings/return-room', twice('PATCH', '/api/borrowings/return-room', {
+            "borrower_hotel": hotel, "borrower_room_number": room_number,
+        })),
+        ('stats upserts', lambda: (record_borrows([(book_id, category_id)], hotel),
+                                   record_returns([(book_id, category_id)], hotel))),
+        (f'DELETE /api/books/{book_id}', lambda: _dispatch(app, 'DELETE', f'/api/books/{book_id}')),
+        ('PATCH /api/books/quantities', lambda: bulk_update_quantities_service([
+            BookQuantityUpdate(id=book_id, total_quantity=0),
+            BookQuantityUpdate(isbn=isbn, total_quantity=0),
+        ])),
+        ('suggest index refresh', suggest_index.ensure_fresh),
+        ('archive-borrowings', lambda: archive_returned_borrowings(
+            app.config['BORROWINGS_ARCHIVE_AFTER_DAYS'], max_batches=1)),
+        ('flag-overdue-loans', lambda: flag_overdue_loans(app.config['LOAN_PERIOD_DAYS'])),
+    ]
+
+
+def _listen_for_statements(statements):
+    """Engine listener recording each distinct statement into the `statements` dict."""
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        # Repeated batches of a job differ only in their parameters
+        if statement.lstrip().upper().startswith(_EXPLAINED_VERBS):
+            statements.setdefault(statement, parameters)
+    return before_cursor_execute
+
+
+def _capture_statements(app, path):
+    """Run the view for `path` in-process and return the statements it issued."""
+    statements = {}
+    before_cursor_execute = _listen_for_statements(statements)
+
+    # The SQL path is what gets checked, not the in-memory catalog snapshot
+    snapshot_enabled = app.config.get('CATALOG_SNAPSHOT_ENABLED')
+    app.config['CATALOG_SNAPSHOT_ENABLED'] = False
+    event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        # dispatch_request skips before_request hooks (auth, rate limiting)
+        with app.test_request_context(path, method='GET'):
+            app.dispatch_request()
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+        app.config['CATALOG_SNAPSHOT_ENABLED'] = snapshot_enabled
+    return list(statements.items())
+
+
+def _capture_write_statements(app, run):
+    """
+    Run a write path and return the statements it issued, leaving the
+    database untouched. As in an atomic batch (routes/batch.py), the session
+    is bound to one connection with join_transaction_mode='create_savepoint'
+    so the code's commits only release savepoints, and the outer transaction
+    is rolled back. Post-commit events are collected on `g` and discarded.
+    """
+    from services.suggest_service import get_suggest_index
+
+    statements = {}
+    before_cursor_execute = _listen_for_statements(statements)
+    with app.test_request_context():
+        g.deferred_availability_events = []
+        g.deferred_circulation_events = []
+        db.session.remove()
+        with outer_transaction(db.engine) as (connection, transaction):
+            db.session.registry.set(Session(bind=connection, join_transaction_mode='create_savepoint', query_cls=Query))
+            event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+            try:
+                run()
+            finally:
+                event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+                transaction.rollback()
+                db.session.remove()
+    # The views applied their writes to this worker's suggest index
+    get_suggest_index().invalidate()
+    return list(statements.items())
+
+
+def _explain(conn, label, statements):
+    """EXPLAIN `statements` on `conn` and return failures for `label`."""
+    failures = []
+    for statement, parameters in statements:
+        result = conn.exec_driver_sql('EXPLAIN (FORMAT JSON) ' + statement, parameters).scalar()
+        plan = (json.loads(result) if isinstance(result, str) else result)[0]['Plan']
+        for node_type, relation, index, filter_ in _scan_problems(plan):
+            if _is_known(label, relation):
+                continue
+            failures.append(
+                f"{label}: {node_type} on {relation}"
+                + (f" using {index}" if index else '')
+                + (f" with filter {filter_}" if filter_ else '')
+            )
+    return failures
+
+
+def _scan_problems(plan):
+    """Yield (node type, relation, index, filter) for scans that filter without an index."""
+    node_type = plan.get('Node Type')
+    if node_type == 'Seq Scan' or (
+        node_type in _SCAN_NODES and 'Filter' in plan and 'Index Cond' not in plan
+    ):
+        yield node_type, plan.get('Relation Name'), plan.get('Index Name'), plan.get('Filter')
+    for child in plan.get('Plans', []):
+        yield from _scan_problems(child)
+
+
+def _is_known(path, relation):
+    for fragment, known_relation, _reason in KNOWN_FULL_SCANS:
+        if fragment in path and relation == known_relation:
+            return True
+    return False
+
+
+def check_query_plans(disable_seqscan=True):
+    """
+    EXPLAIN every query issued by the read endpoints and by the write paths
+    in _write_checks(), and report scans that fall back to reading the whole
+    table (a Seq Scan, or an index walked only to apply a Filter). Returns a
+    list of human-readable failures.
+
+    With `disable_seqscan`, the planner is told to avoid sequential scans, so
+    a Seq Scan in the plan means no usable index exists, regardless of how
+    much data happens to be seeded.
+    """
+    app = current_app._get_current_object()
+    if db.engine.dialect.name != 'postgresql':
+        raise RuntimeError("Query plan checks require a PostgreSQL database.")
+
+    checks = [(path, _capture_statements(app, path)) for path in _request_paths()]
+    checks += [(label, _capture_write_statements(app, run)) for label, run in _write_checks(app)]
+
+    failures = []
+    for label, statements in checks:
+        with db.engine.connect() as conn:
+            trans = conn.begin()
+            try:
+                if disable_seqscan:
+                    conn.exec_driver_sql('SET LOCAL enable_seqscan = off')
+                failures.extend(_explain(conn, label, statements))
+            finally:
+                trans.rollback()
+        app.logger.info(f"Checked {len(statements)} queries for {label}")
+    return failures
@@ -0,0 +1,217 @@
+# utils/rate_limit.py
+import hashlib
+import hmac
+import math
+import threading
+import time
+from collections import OrderedDict
+
+from flask import request, jsonify, current_app
+
+
+class InMemoryRateLimitBackend:
+    """
+    Thread-safe token-bucket store kept in the worker's memory.
+
+    Each key owns a bucket that refills at `rate` tokens per second up to
+    `burst` tokens. Buckets are independent per worker process, so the
+    effective limit across N Passenger workers is N times the configured one.
+
+    Buckets are kept in least-recently-used order. Every `sweep_seconds` the
+    ones that have refilled completely, by their own rate and burst, are
+    dropped since they carry no state; beyond `max_keys` the least recently
+    used bucket is evicted, so no request ever scans the whole store.
+    """
+
+    def __init__(self, max_keys=10000, sweep_seconds=60):
+        # key -> (tokens, last refill, rate, burst)
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+        self._max_keys = max_keys
+        self._sweep_seconds = sweep_seconds
+        self._next_sweep = time.monotonic() + sweep_seconds
+
+    def consume(self, key, rate, burst, cost=1):
+        """
+        Try to take `cost` tokens from the bucket identified by `key`.
+        Returns a tuple (allowed, retry_after_seconds).
+        """
+        now = time.monotonic()
+        with self._lock:
+            tokens, last, _, _ = self._buckets.get(key, (burst, now, rate, burst))
+            tokens = min(burst, tokens + (now - last) * rate)
+
+            if tokens >= cost:
+                tokens -= cost
+                allowed, retry_after = True, 0.0
+            else:
+                allowed, retry_after = False, (cost - tokens) / rate
+            self._buckets[key] = (tokens, now, rate, burst)
+            self._buckets.move_to_end(key)
+
+            if now >= self._next_sweep:
+                self._sweep(now)
+            while len(self._buckets) > self._max_keys:
+                self._buckets.popitem(last=False)
+
+        return allowed, retry_after
+
+    def _sweep(self, now):
+        """Drop buckets that have refilled completely; they carry no state."""
+        full = [k for k, (tokens, last, rate, burst) in self._buckets.items()
+                if tokens + (now - last) * rate >= burst]
+        for k in full:
+            del self._buckets[k]
+        self._next_sweep = now + self._sweep_seconds
+
+
+class ConcurrencyLimiter:
+    """Counts in-flight requests and refuses new ones above `limit`."""
+
+    def __init__(self, limit):
+        self.limit = limit
+        self._in_flight = 0
+        self._lock = threading.Lock()
+
+    def try_acquire(self):
+        with self._lock:
+            if self._in_flight >= self.limit:
+                return False
+            self._in_flight += 1
+            return True
+
+    def release(self):
+        with self._lock:
+            self._in_flight -= 1
+
+
+def expensive_endpoint(view):
+    """Mark a view function as expensive so it draws from the expensive budget."""
+    view.rate_limit_expensive = True
+    return view
+
+
+def exempt_from_load_shedding(view):
+    """Mark a long-lived view (e.g. an event stream) so it does not hold a concurrency slot."""
+    view.load_shedding_exempt = True
+    return view
+
+
+def _client_key():
+    """
+    Identify the caller by API key plus remote address if the key is the
+    configured one, otherwise by remote address alone. All clients share the
+    one API key, so the address is what tells them apart. Runs before
+    authentication, so an unchecked key would let a client get a fresh
+    bucket per request by sending a new made-up key.
+    """
+    api_key = request.headers.get('Api-Key')
+    expected = current_app.config.get('API_KEY')
+    if api_key and expected and hmac.compare_digest(api_key.encode('utf-8'), expected.encode('utf-8')):
+        return 'key:' + hashlib.sha256(api_key.encode('utf-8')).hexdigest()[:16] + f':{request.remote_addr}'
+    return f'ip:{request.remote_addr}'
+
+
+def _is_expensive_request():
+    """Full dumps (per_page=0), searches and marked endpoints are expensive."""
+    if request.args.get('per_page') == '0' or request.args.get('search'):
+        return True
+    view = current_app.view_functions.get(request.endpoint)
+    return getattr(view, 'rate_limit_expensive', False)
+
+
+def _bucket_for(key):
+    """(bucket, rate, burst) for the current request, by its tier."""
+    config = current_app.config
+    if _is_expensive_request():
+        return key + ':expensive', config['RATELIMIT_EXPENSIVE_RATE'], config['RATELIMIT_EXPENSIVE_BURST']
+    return key, config['RATELIMIT_DEFAULT_RATE'], config['RATELIMIT_DEFAULT_BURST']
+
+
+def _too_many(message, status, retry_after):
+    response = jsonify({"error": message})
+    response.status_code = status
+    response.headers['Retry-After'] = str(max(1, math.ceil(retry_after)))
+    return response
+
+
+def _check_rate_config(config):
+    """Fail at startup on rates or bursts that would never admit a request."""
+    for tier in ('DEFAULT', 'EXPENSIVE'):
+        rate, burst = config[f'RATELIMIT_{tier}_RATE'], config[f'RATELIMIT_{tier}_BURST']
+        if not rate > 0:
+            raise ValueError(f"RATELIMIT_{tier}_RATE must be greater than 0, got {rate}.")
+        if burst < 1:
+            raise ValueError(f"RATELIMIT_{tier}_BURST must be at least 1, got {burst}.")
+
+
+def setup_rate_limiting(app):
+    """
+    Register token-bucket rate limiting and concurrency-based load shedding.
+
+    Both checks run as before_request handlers, so a rejected request never
+    opens a database connection.
+    """
+    if not app.config.get('RATELIMIT_ENABLED', False):
+        return
+    _check_rate_config(app.config)
+
+    backend = InMemoryRateLimitBackend()
+    max_concurrent = app.config.get('MAX_CONCURRENT_REQUESTS', 0)
+    limiter = ConcurrencyLimiter(max_concurrent) if max_concurrent > 0 else None
+    app.extensions['rate_limiter'] = backend
+
+    @app.before_request
+    def rate_limit():
+        """Reject the request with 429 once the caller's bucket is empty."""
+        if request.method == 'OPTIONS':
+            return None
+
+        key = _client_key()
+        # Batch sub-requests are charged to the same client (see rate_limit_sub_request)
+        request.environ['rate_limit.client_key'] = key
+        allowed, retry_after = backend.consume(*_bucket_for(key))
+        if not allowed:
+            app.logger.warning(
+                f"Rate limit exceeded for {key} on {request.method} {request.path}"
+            )
+            return _too_many("Too many requests. Please retry later.", 429, retry_after)
+
+        view = app.view_functions.get(request.endpoint)
+        if limiter is not None and not getattr(view, 'load_shedding_exempt', False):
+            if not limiter.try_acquire():
+                app.logger.warning(
+                    f"Load shedding {request.method} {request.path}: "
+                    f"{limiter.limit} requests already in flight"
+                )
+                return _too_many(
+                    "Server is busy. Please retry later.", 503,
+                    app.config.get('LOAD_SHED_RETRY_AFTER', 1)
+                )
+            # Stored on the request rather than g: batch sub-requests share g
+            request.environ['rate_limit.concurrency_slot'] = True
+        return None
+
+    if limiter is not None:
+        @app.teardown_request
+        def release_concurrency_slot(exc):
+            if request.environ.pop('rate_limit.concurrency_slot', False):
+                limiter.release()
+
+
+def rate_limit_sub_request():
+    """
+    Charge one batch sub-request to its own tier (default or expensive) for
+    the client that sent the batch, so a batch cannot run more full dumps
+    than the client could send on its own. Call inside the sub-request's
+    context; returns a 429 response, or None when it may run.
+    """
+    backend = current_app.extensions.get('rate_limiter')
+    key = request.environ.get('rate_limit.client_key')
+    if backend is None or key is None:
+        return None
+    allowed, retry_after = backend.consume(*_bucket_for(key))
+    if allowed:
+        return None
+    current_app.logger.warning(f"Rate limit exceeded for {key} on batch operation {request.method} {request.path}")
+    return _too_many("Too many requests. Please retry later.", 429, retry_after)
@@ -0,0 +1,50 @@
+# utils/startup.py
+import threading
+import time
+
+import click
+from sqlalchemy import text
+
+
+class StartupTimer:
+    """Records how long each step of create_app takes, in milliseconds."""
+
+    def __init__(self):
+        self.steps = []
+        self._last = time.perf_counter()
+
+    def mark(self, step):
+        now = time.perf_counter()
+        self.steps.append((step, (now - self._last) * 1000))
+        self._last = now
+
+
+def running_from_cli():
+    """True when the app is being created by the `flask` command (e.g. `flask db upgrade`)."""
+    return click.get_current_context(silent=True) is not None
+
+
+def prewarm_connections(app, engine, count):
+    """
+    Open `count` pooled connections in a background thread so the first
+    requests after a cold spawn do not pay for connecting. Returns the
+    thread; failures are logged and leave the pool to connect lazily.
+    """
+    def warm():
+        connections = []
+        try:
+            for _ in range(count):
+                connection = engine.connect()
+                connection.execute(text('SELECT 1'))
+                connections.append(connection)
+            app.logger.debug(f"Pre-warmed {len(connections)} database connections")
+        except Exception as e:
+            app.logger.warning(f"Connection pre-warm failed: {e}")
+        finally:
+            # Closing returns them to the pool, still open
+            for connection in connections:
+                connection.close()
+
+    thread = threading.Thread(target=warm, name='db-prewarm', daemon=True)
+    thread.start()
+    return thread
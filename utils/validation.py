@@ -0,0 +1,75 @@
+# utils/validation.py
+import functools
+from typing import List
+
+from flask import request, jsonify, current_app
+from pydantic import Field, TypeAdapter, ValidationError, create_model
+from typing_extensions import Annotated
+
+# Per-item errors beyond this many items are counted but not listed
+MAX_REPORTED_ITEMS = 100
+
+
+@functools.lru_cache(maxsize=None)
+def _bulk_adapter(envelope, items_field, item_model, max_items):
+    """
+    Build (once per model and limit) a TypeAdapter for the envelope with the
+    item list capped at `max_items`. Building the validator is the expensive
+    part, so it must not happen per request.
+    """
+    limited = create_model(
+        f'{envelope.__name__}Limited',
+        __base__=envelope,
+        **{items_field: (Annotated[List[item_model], Field(min_length=1, max_length=max_items)], ...)}
+    )
+    return TypeAdapter(limited)
+
+
+def _group_item_errors(errors, items_field):
+    """Split pydantic errors into per-item errors keyed by index and envelope errors."""
+    items, general = {}, []
+    for error in errors:
+        loc = error['loc']
+        detail = {"loc": list(loc[2:]), "msg": error['msg'], "type": error['type']}
+        if len(loc) >= 2 and loc[0] == items_field and isinstance(loc[1], int):
+            items.setdefault(loc[1], []).append(detail)
+        else:
+            general.append({"loc": list(loc), "msg": error['msg'], "type": error['type']})
+    return items, general
+
+
+def validate_bulk(envelope, items_field, item_model):
+    """
+    Validate a bulk JSON body straight from the raw request bytes.
+
+    Replaces flask_pydantic's `@validate()` for batch endpoints so that every
+    invalid item is reported (grouped by index) instead of only the first.
+    Throughput is about the same as `@validate()`: building one model per
+    item dominates either way (see benchmarks/bench_validation.py). The body
+    size is capped app-wide by MAX_CONTENT_LENGTH and the item count by
+    BULK_MAX_ITEMS. The validated envelope is passed to the view as `body`.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            max_items = current_app.config['BULK_MAX_ITEMS']
+            adapter = _bulk_adapter(envelope, items_field, item_model, max_items)
+            try:
+                body = adapter.validate_json(request.get_data())
+            except ValidationError as e:
+                errors = e.errors(include_url=False, include_context=False, include_input=False)
+                items, general = _group_item_errors(errors, items_field)
+                current_app.logger.warning(
+                    f"Bulk validation failed for {len(items)} items from {request.remote_addr}"
+                )
+                return jsonify({
+                    "error": "Validation failed",
+                    "details": general,
+                    "invalid_item_count": len(items),
+                    "items": {
+                        str(index): items[index] for index in sorted(items)[:MAX_REPORTED_ITEMS]
+                    }
+                }), 400
+            return view(*args, body=body, **kwargs)
+        return wrapper
+    return decorator